@@ -1,12 +1,41 @@
 #!/usr/bin/python
 # -*- coding: UTF-8 -*-
 
-import pygame
-import pandas as pd
-import queue as Q
-from pygame.locals import Rect
-from lib.ordered_set import OrderedSet
-from collections import deque
+import argparse
+import csv
+import json
+import sys
+import time
+from lib.compact_graph import CompactGraph
+from lib.heuristics import CoordinateHeuristic
+from lib.landmarks import LandmarkIndex
+from lib.contraction import ContractionHierarchy
+from lib.query_cache import QueryCache
+from lib.path_tree import PathTreeCache
+from lib.batch import (run_batch, read_queries, write_results, round_cost,
+                       result_dict)
+from lib.spatial import SpatialGrid, segment_box
+from lib.route import Route
+from lib.instrumentation import Probe, SearchMetrics
+# O grafo e as buscas ficam em lib.search, que não depende do pygame, e
+# continuam disponíveis a partir deste módulo (veja __all__):
+from lib.search import (Graph, edge_key, bfs, dfs, lim_dfs, deepening_dfs,
+                        bidir_bfs, bidir_uniform_cost_search,
+                        uniform_cost_search, astar_search, ch_search,
+                        search_methods)
+from os import path
+
+# Nomes públicos do módulo, inclusive as buscas de lib.search que eram
+# definidas aqui:
+__all__ = ['Graph', 'bfs', 'dfs', 'lim_dfs', 'deepening_dfs', 'bidir_bfs',
+           'uniform_cost_search', 'bidir_uniform_cost_search',
+           'astar_search', 'ch_search', 'search_methods', 'City', 'Edge',
+           'get_city_byname', 'get_edge', 'sync_map', 'load_graph',
+           'load_positions', 'load_landmarks', 'load_hierarchy',
+           'load_matrix', 'GraphIndexes', 'load_methods', 'run_interface',
+           'main', 'Config', 'SEARCH_METHODS', 'DEFAULT_METHODS',
+           'COLOR_BLACK', 'COLOR_GREEN', 'COLOR_RED', 'COLOR_WHITE',
+           'MOUSE_LEFT', 'MOUSE_RIGHT']
 
 ##############
 # CONSTANTES #
@@ -19,72 +48,21 @@ COLOR_WHITE = (255, 255, 255)   # Valores RGB da cor branca.
 MOUSE_LEFT = 1                  # Representa clique esquerdo do mouse.
 MOUSE_RIGHT = 3                 # Representa clique direito do mouse.
 
-#################
-# INICIALIZAÇÃO #
-#################
+# Nomes dos métodos aceitos pela linha de comando (chaves de search_methods):
+SEARCH_METHODS = ('bfs', 'dfs', 'lim_dfs', 'deepening_dfs', 'bidir_bfs',
+                  'uniform_cost_search', 'astar', 'alt', 'ch',
+                  'bidir_uniform_cost_search', 'matrix')
+# Métodos carregados quando nenhum é pedido. A matriz de distâncias ocupa
+# O(n^2) e só é carregada quando pedida explicitamente:
+DEFAULT_METHODS = tuple(name for name in SEARCH_METHODS if name != 'matrix')
 
 Config = __import__('config')  # Importa as configurações.
 
-pygame.init()   # Inicializa os módulos do pygame.
-
-pygame.display.set_caption(Config.WINDOW_TITLE)   # Altera o título da janela.
-
-# Altera as dimensões da janela.
-screen = pygame.display.set_mode(Config.SCREEN_SIZE)
-
-# Carregamos as fontes específicas do sistema que iremos utilizar na interface:
-sys_font = pygame.font.SysFont(Config.FONT_FAMILY, Config.FONT_SIZE)
-title_font = pygame.font.SysFont(Config.FONT_FAMILY, Config.FONT_SIZE+10)
-medium_font = pygame.font.SysFont(Config.FONT_FAMILY, Config.FONT_SIZE+2)
-
-# Carregamos e redimensionamos a imagem do mapa que será utilizada como imagem
-# de fundo da interface:
-map_image = pygame.image.load(Config.map_path)
-map_image_scaled = pygame.transform.scale(map_image, Config.SCREEN_SIZE)
-
 #####################
 # CLASSES E FUNÇÕES #
 #####################
 
 
-class Graph(dict):
-    """ Representa um grafo.
-
-    Esta classe é uma implementação de um dicionário,
-    ou seja, possui as mesmas funcionalidades de um
-    objeto do tipo dict().
-    """
-
-    def create_from_csv(self, path):
-        """ Lê um arquivo .csv e cria os vértices do grafo.
-
-        O arquivo deve conter 3 colunas separadas por vírgulas, onde:
-        - Primeira coluna: Identificador do vértice origem;
-        - Segunda coluna: Identificador do vértice vizinho;
-        - Terceira coluna: Distância entre os dois vértices.
-
-        Parâmetros:
-        - path : caminho do arquivo .csv
-        """
-        # Fazemos a leitura das distâncias entre os municípios, gerando uma
-        # tabela de 3 colunas:
-        data = pd.read_csv(path, sep=',', encoding='utf-8')
-        # Convertemos a tabela em uma matriz:
-        data_matrix = data.values
-        # Criamos um dicionário onde as chaves serão o nome dos municípios da
-        # primeira coluna e todas elas terão uma lista vazia como valor.
-        # Utilizamos listas do tipo set() pois elas possuem um acesso mais
-        # rápido e não aceitam objetos repetidos:
-        for row in data_matrix:
-            from_city = row[0]
-            self[from_city] = list()
-        # Agora adicionamos os vizinhos desses municípios, que são os
-        # municípios da segunda coluna. Note que por enquanto não estamos
-        # utilizando a coluna de distâncias:
-        for from_city, to_city, distance in data_matrix:
-            self[from_city].append([to_city, distance])
-
-
 class City:
     """ Representa um município no mapa 
 
@@ -94,12 +72,16 @@ class City:
     - rect : Retângulo de colisão do ponto do município.
     """
 
+    __slots__ = ('_name', '_pos', '_neighbours', '_rect')
+
     def __init__(self, name, pos):
         self._name = name
         self._pos = pos
         self._neighbours = set()
         rect_pos = (pos[0], pos[1])
         rect_dim = (Config.DOT_RADIUS+2, Config.DOT_RADIUS+2)
+        # O pygame só é carregado quando a interface cria os municípios:
+        from pygame.locals import Rect
         self._rect = Rect(rect_pos, rect_dim)
 
     @property
@@ -125,6 +107,9 @@ class City:
         else:
             self._neighbours.add(neighbour)
 
+    def remove_neighbour(self, neighbour):
+        self._neighbours.discard(neighbour)
+
 
 class Edge:
     """ Representa uma aresta.
@@ -136,6 +121,8 @@ class Edge:
     - dest_pos : Posição de destino.
     """
 
+    __slots__ = ('_origin', '_destiny', '_orig_pos', '_dest_pos')
+
     def __init__(self, origin, orig_pos, destiny, dest_pos):
         self._origin = origin
         self._destiny = destiny
@@ -158,6 +145,10 @@ class Edge:
     def destiny_pos(self):
         return self._dest_pos
 
+    @property
+    def key(self):
+        return edge_key(self._origin, self._destiny)
+
 
 def get_city_byname(cities, name):
     """ Retorna o município cujo o nome foi especificado.
@@ -165,236 +156,324 @@ def get_city_byname(cities, name):
     Retorna um objeto do tipo city ou None caso não seja encontrado.
 
     Parâmetros:
-    - cities : lista de municípios.
+    - cities : dicionário de municípios (nome -> município).
     - name : nome do município desejado.
     """
-    for city in cities:
-        if city.name == name:
-            return city
-    return None
+    return cities.get(name)
 
 
-def get_edge(edge_list, origin, destiny):
+def get_edge(edges, origin, destiny):
     """ Retorna a aresta com a origem e o destino especificados,
     não importando o sentido.
 
     Retorna um objeto do tipo Edge ou None caso não seja encontrado.
 
     Parâmetros:
-    - edge_list : Lista de arestas.
+    - edges : dicionário de arestas (edge_key -> aresta).
     - origin : Identificador da origem.
     - destiny : Identificador do destino.
     """
-    for edge in edge_list:
-        if edge.origin == origin and edge.destiny == destiny\
-                or edge.origin == destiny and edge.destiny == origin:
-            return edge
-    return None
-
+    return edges.get(edge_key(origin, destiny))
 
-#######################
-# MÉTODO DE AMPLITUDE #
-#######################
 
-def bfs(graph, origin, goal):
-    """ Visita todos os vizinhos partindo do vértice origin até encontrar o
-    vértice goal.
+def sync_map(graph, version, map_cities, map_edges, edge_index=None):
+    """ Aplica aos municípios e às arestas do mapa as alterações feitas nas
+    arestas do grafo depois da versão informada (Graph.changes_since).
 
-    Retorna uma tupla com os vértices visitados e o caminho mais curto em
-    forma de lista.
+    Caso as alterações não sejam conhecidas, as ligações são refeitas em uma
+    única passada pela vizinhança do grafo. Retorna a versão atual do grafo.
 
     Parâmetros:
-    - origin : vértice inicial
-    - goal : vértice objetivo
+    - graph : grafo com as informações de vizinhança.
+    - version : versão do grafo já refletida no mapa (-1 para nenhuma).
+    - map_cities : dicionário de municípios (nome -> município).
+    - map_edges : dicionário de arestas (edge_key -> aresta).
+    - edge_index : índice espacial (SpatialGrid) das arestas, opcional.
+    """
+    changes = graph.changes_since(version)
+    if changes is None:
+        for city in map_cities.values():
+            city.neighbours.clear()
+        map_edges.clear()
+        if edge_index is not None:
+            edge_index.clear()
+        for city_name, neighbours in graph.items():
+            city_object = map_cities.get(city_name)
+            if city_object is None:
+                continue    # Município sem posição no mapa.
+            for neighbour in neighbours:
+                neighbour_object = map_cities.get(neighbour[0])
+                if neighbour_object is not None:
+                    _link_cities(city_object, neighbour_object, map_edges,
+                                 edge_index)
+        return graph.version
+    for change in changes:
+        if change.old is not None and change.new is not None:
+            continue    # Apenas a distância mudou.
+        city_object = map_cities.get(change.origin)
+        neighbour_object = map_cities.get(change.destiny)
+        if city_object is None or neighbour_object is None:
+            continue    # Município sem posição no mapa.
+        if change.new is not None:
+            _link_cities(city_object, neighbour_object, map_edges, edge_index)
+            continue
+        city_object.remove_neighbour(neighbour_object)
+        # As arestas do mapa não têm sentido: ela só é apagada quando os
+        # dois sentidos deixam de existir:
+        key = edge_key(change.origin, change.destiny)
+        if key in map_edges and \
+                change.destiny not in graph.neighbours(change.origin) and \
+                change.origin not in graph.neighbours(change.destiny):
+            edge = map_edges.pop(key)
+            if edge_index is not None:
+                edge_index.remove(edge)
+    return graph.version
+
+
+def _link_cities(city, neighbour, map_edges, edge_index):
+    """ Liga um município ao vizinho e cria a aresta do mapa entre eles,
+    caso ela ainda não exista.
     """
-    queue = [(origin, [origin])]
-    visited = OrderedSet()
-    while queue:
-        vertex, path = queue.pop(0)
-        visited.add(vertex)
-        for neighbour in graph[vertex]:
-            if neighbour[0] == goal:
-                return (visited, path + [goal])
-            else:
-                if neighbour[0] not in visited:
-                    visited.add(neighbour[0])
-                    queue.append((neighbour[0], path + [neighbour[0]]))
-
-
-##########################
-# MÉTODO DE PROFUNDIDADE #
-##########################
-
-def dfs(graph, origin, goal):
-    """ Inicia no vértice origin, voltando até encontrar o vértice goal.
-
-    Retorna uma tupla com os vértices visitados e o caminho mais curto em
-    forma de lista.
+    city.add_neighbour(neighbour)
+    key = edge_key(city.name, neighbour.name)
+    if key not in map_edges:
+        edge = map_edges[key] = Edge(origin=city.name, orig_pos=city.pos,
+                                     destiny=neighbour.name,
+                                     dest_pos=neighbour.pos)
+        if edge_index is not None:
+            edge_index.insert(edge, segment_box(
+                edge.origin_pos, edge.destiny_pos, Config.LINE_WIDTH))
+
+
+#############################
+# CARREGAMENTO DOS ARQUIVOS #
+#############################
+
+def load_graph():
+    """ Carrega o grafo de distâncias no formato compacto, usado pelos modos
+    sem interface. O .csv só é lido na primeira carga; as seguintes mapeiam o
+    snapshot binário gravado ao lado dele.
+    """
+    return CompactGraph.load_csv(Config.distances_path, Config.snapshot_path)
+
+
+def load_positions(path):
+    """ Lê o arquivo .csv de municípios e retorna um dicionário com a posição
+    de cada município no mapa.
+
+    O arquivo deve conter um cabeçalho e 3 colunas separadas por vírgulas:
+    nome do município, posição x e posição y.
 
     Parâmetros:
-    - origin : vértice inicial
-    - goal : vértice objetivo
+    - path : caminho do arquivo .csv
+    """
+    with open(path, newline='', encoding='utf-8-sig') as csv_file:
+        reader = csv.reader(csv_file)
+        next(reader, None)  # Ignoramos o cabeçalho.
+        return {row[0]: (int(row[1]), int(row[2])) for row in reader if row}
+
+
+def _is_current(file_path):
+    """ Verifica se um arquivo pré-processado existe e é mais recente que o
+    arquivo de distâncias.
     """
-    stack = [(origin, [origin])]
-    visited = OrderedSet()
-    while stack:
-        vertex, path = stack.pop()
-        visited.add(vertex)
-        for neighbour in graph[vertex]:
-            if neighbour[0] == goal:
-                return (visited, path + [goal])
-            else:
-                if neighbour[0] not in visited:
-                    visited.add(neighbour[0])
-                    stack.append((neighbour[0], path + [neighbour[0]]))
-
-
-###################################
-# MÉTODO DE PROFUNDIDADE LIMITADA #
-###################################
-
-def lim_dfs(graph, origin, goal, lim):
-    """ Inicia no vértice origin, voltando até encontrar o vértice goal.
-
-    Muda o sentido da busca caso alcançe o limite de passos estabelecido.
-    Retorna uma tupla com os vértices visitados e o caminho mais curto em
-    forma de lista.
+    return path.exists(file_path) and \
+        path.getmtime(file_path) >= path.getmtime(Config.distances_path)
+
+
+def load_landmarks(graph):
+    """ Retorna o índice de landmarks do método ALT, já associado ao grafo.
+
+    O pré-processamento (um Dijkstra completo por landmark) é feito uma única
+    vez e gravado ao lado do arquivo de distâncias; ele é refeito apenas se o
+    arquivo mudar.
 
     Parâmetros:
-    - origin : vértice inicial
-    - goal : vértice objetivo
-    - lim : limite de passos em um determinado sentido
+    - graph : grafo em que as consultas serão feitas.
     """
-    stack = [(origin, [origin])]
-    visited = OrderedSet()
-    depth = 0
-    while stack:
-        if depth < lim:
-            vertex, path = stack.pop()
-            visited.add(vertex)
-            depth += 1
-            for neighbour in graph[vertex]:
-                if neighbour[0] == goal:
-                    return (visited, path + [goal])
-                else:
-                    if neighbour[0] not in visited:
-                        visited.add(neighbour[0])
-                        stack.append((neighbour[0], path + [neighbour[0]]))
-        else:
-            return (visited, None)
-    return (visited, None)
+    if _is_current(Config.landmarks_path):
+        landmarks = LandmarkIndex.load(Config.landmarks_path)
+    else:
+        landmarks = LandmarkIndex.build(graph, Config.LANDMARK_COUNT)
+        landmarks.save(Config.landmarks_path)
+    return landmarks.attach(graph)
 
 
-####################################
-# MÉTODO DE PROFUNDIDADE ITERATIVA #
-####################################
+def load_hierarchy(graph):
+    """ Retorna a hierarquia de contração do método CH, pré-processada e
+    gravada da mesma forma que o índice de landmarks.
 
-def deepening_dfs(graph, origin, goal, lim):
-    """ Inicia no vértice origin, voltando até encontrar o vértice goal.
+    Parâmetros:
+    - graph : grafo usado caso a hierarquia precise ser construída.
+    """
+    if _is_current(Config.hierarchy_path):
+        return ContractionHierarchy.load(Config.hierarchy_path)
+    hierarchy = ContractionHierarchy.build(graph)
+    hierarchy.save(Config.hierarchy_path)
+    return hierarchy
 
-    Muda o sentido da busca caso alcançe o limite de passos estabelecido.
-    Aumenta o limite de passos caso o objetivo não seja encontrado com o
-    limite estabelecido.
-    Retorna uma tupla com os vértices visitados e o caminho mais curto em
-    forma de lista.
+
+def load_matrix(graph):
+    """ Retorna a matriz de distâncias entre todos os pares do método
+    matrix, mapeada em memória. Ela é construída e gravada da mesma forma
+    que o índice de landmarks, e os processos das consultas em lote e do
+    servidor mapeiam os mesmos arquivos em vez de recalculá-la.
 
     Parâmetros:
-    - origin : vértice inicial
-    - goal : vértice objetivo
-    - lim : limite de passos em um determinado sentido
+    - graph : grafo usado caso a matriz precise ser construída.
     """
-    stack = [(origin, [origin])]
-    visited = OrderedSet()
-    depth = 0
-    while stack:
-        if depth < lim:
-            vertex, path = stack.pop()
-            visited.add(vertex)
-            depth += 1
-            for neighbour in graph[vertex]:
-                if neighbour[0] == goal:
-                    return (visited, path + [goal])
-                else:
-                    if neighbour[0] not in visited:
-                        visited.add(neighbour[0])
-                        stack.append((neighbour[0], path + [neighbour[0]]))
-        else:
-            if lim < len(graph)-1:
-                return deepening_dfs(graph, origin, goal, lim+1)
-            else:
-                return (visited, None)
-    return (visited, None)
-
-
-#####################################
-# MÉTODO DE AMPLITUDE BI-DIRECIONAL #
-#####################################
-
-def bidir_bfs(graph, origin, goal):
-    if origin == goal:
-        return [origin]
-
-    path_dict = {origin: [origin], goal: [goal]} # Dicionário para guardar o caminho.
-    visited = set()
-
-    while len(path_dict) > 0:
-        active_vertices = list(path_dict.keys()) # Cópia do dicionário.
-        for vertex in active_vertices:
-            path = path_dict[vertex] # Caminho atual.
-            origin = path[0]
-            current_neighbours = set([n[0] for n in graph[vertex]]) - visited # Vizinhos disponíveis.
-            # Verificamos se houve alguma intersecção entre os caminhos:
-            if len(current_neighbours.intersection(active_vertices)) > 0:
-                for meeting_vertex in current_neighbours.intersection(active_vertices):
-                    # Verificamos se os caminhos possuem origens distintas,
-                    # se sim então temos um resultado:
-                    if origin != path_dict[meeting_vertex][0]:
-                        # Invertemos a ordem de um dos caminhos:
-                        path_dict[meeting_vertex].reverse()
-                        # Retornamos a soma dos caminhos:
-                        return (visited, path_dict[vertex] + path_dict[meeting_vertex])
-
-            # Continuamos com a busca:
-            if len(set(current_neighbours) - visited - set(active_vertices)) == 0:
-                # Caso não exista mais vizinhos, removemos o caminho da lista:
-                path_dict.pop(vertex, None)
-                visited.add(vertex)
-            else:
-                # Caso contrário buscamos por novos vizinhos:
-                for neighbour_vertex in current_neighbours - visited - set(active_vertices):
-                    path_dict[neighbour_vertex] = path + [neighbour_vertex]
-                    active_vertices.append(neighbour_vertex)
-                path_dict.pop(vertex, None)
-                visited.add(vertex)
-    return None
-
-
-############################
-# MÉTODO DE CUSTO UNIFORME #
-############################
-
-def uniform_cost_search(graph, origin, goal):
-    queue = Q.PriorityQueue()
-    queue.put((0, [origin]))
-    while not queue.empty():
-        node = queue.get()
-        current = node[1][len(node[1]) - 1]
-        if goal in node[1]:
-            return ([node[0]], node[1])
-            break
-        cost = node[0]
-        for neighbor in graph[current]:
-            temp = node[1][:]
-            temp.append(neighbor[0])
-            queue.put((cost + neighbour[1], temp))
-    return ([], None)
+    # O NumPy só é importado quando a matriz é usada:
+    from lib.all_pairs import DistanceMatrix
+    if _is_current(Config.matrix_prefix + '.names'):
+        try:
+            return DistanceMatrix.load(Config.matrix_prefix)
+        except (OSError, ValueError):
+            pass    # Arquivos de um formato anterior: a matriz é refeita.
+    DistanceMatrix.build(graph).save(Config.matrix_prefix)
+    return DistanceMatrix.load(Config.matrix_prefix)
+
+
+class GraphIndexes:
+    """ Estruturas derivadas do grafo usadas pela interface, pelo modo
+    route, por load_methods e pelo lib.benchmark: o grafo invertido, a
+    heurística do A*, o índice de landmarks, a hierarquia de contração e a
+    matriz de distâncias.
+
+    Cada estrutura é construída na primeira vez em que é pedida e guardada
+    junto com a versão do grafo (graph.version), como em QueryCache e
+    sync_map: depois de set_edge_weight, add_edge ou remove_edge, todas são
+    descartadas e refeitas com as arestas atuais. Os arquivos
+    pré-processados só são usados na versão em que o grafo foi carregado, e
+    apenas com preprocessed. A duração de cada construção fica em
+    build_times.
 
+    Parâmetros:
+    - graph : grafo das consultas.
+    - positions : dicionário nome -> (x, y) usado pela heurística (None lê
+      o arquivo de municípios quando a heurística é construída).
+    - landmark_count : número de landmarks construídos em memória.
+    - preprocessed : usa os arquivos pré-processados ao lado do arquivo de
+      distâncias (falso para grafos que não vêm dele).
+    """
 
-###############
-# FUNÇÃO MAIN #
-###############
+    def __init__(self, graph, positions=None,
+                 landmark_count=Config.LANDMARK_COUNT, preprocessed=True):
+        self.graph = graph
+        self.positions = positions
+        self.landmark_count = landmark_count
+        self.preprocessed = preprocessed
+        self.build_times = dict()   # Estrutura -> duração em segundos.
+        self._loaded_version = graph.version
+        self._version = graph.version
+        self._indexes = dict()
+
+    def _get(self, name, build):
+        """ Retorna a estrutura name, construindo-a com build() caso ela
+        ainda não exista na versão atual do grafo.
+        """
+        if self.graph.version != self._version:
+            self._indexes.clear()
+            self._version = self.graph.version
+        index = self._indexes.get(name)
+        if index is None:
+            start = time.perf_counter()
+            index = self._indexes[name] = build()
+            self.build_times[name] = time.perf_counter() - start
+        return index
+
+    def _loaded(self):
+        """ Verifica se os arquivos pré-processados podem ser usados, isto
+        é, se o grafo ainda é o lido do arquivo de distâncias.
+        """
+        return self.preprocessed and \
+            self.graph.version == self._loaded_version
 
-if __name__ == "__main__":
+    @property
+    def reverse(self):
+        return self._get('reverse', self.graph.reversed)
+
+    @property
+    def landmarks(self):
+        return self._get('landmarks', lambda: load_landmarks(self.graph)
+                         if self._loaded() else LandmarkIndex.build(
+                             self.graph, self.landmark_count).attach(
+                                 self.graph))
+
+    @property
+    def heuristic(self):
+        if self.positions is None:
+            self.positions = load_positions(Config.positions_path)
+        landmarks = self.landmarks
+        return self._get('heuristic', lambda: CoordinateHeuristic(
+            self.graph, self.positions, landmarks))
+
+    @property
+    def hierarchy(self):
+        return self._get('hierarchy', lambda: load_hierarchy(self.graph)
+                         if self._loaded() else ContractionHierarchy.build(
+                             self.graph))
+
+    @property
+    def matrix(self):
+        def build():
+            from lib.all_pairs import DistanceMatrix
+            return DistanceMatrix.build(self.graph)
+        return self._get('matrix', lambda: load_matrix(self.graph)
+                         if self._loaded() else build())
+
+
+def load_methods(graph, lim=7, names=None, indexes=None):
+    """ Retorna as funções de busca de search_methods, carregando apenas as
+    estruturas auxiliares usadas pelos métodos pedidos.
+
+    Parâmetros:
+    - graph : grafo das consultas.
+    - lim : limite dos métodos de profundidade limitada e iterativa.
+    - names : nomes dos métodos desejados (None para DEFAULT_METHODS).
+    - indexes : GraphIndexes do grafo, para reaproveitar as estruturas em
+      outras consultas (por padrão, um novo).
+    """
+    names = DEFAULT_METHODS if names is None else names
+    indexes = GraphIndexes(graph) if indexes is None else indexes
+    reverse = indexes.reverse if 'bidir_bfs' in names or \
+        'bidir_uniform_cost_search' in names else None
+    landmarks = indexes.landmarks if 'alt' in names or \
+        'astar' in names else None
+    heuristic = indexes.heuristic if 'astar' in names else None
+    hierarchy = indexes.hierarchy if 'ch' in names else None
+    matrix = indexes.matrix if 'matrix' in names else None
+    return search_methods(lim, reverse, heuristic, landmarks, hierarchy,
+                          matrix)
+
+
+#############
+# INTERFACE #
+#############
+
+def run_interface():
+    """ Abre a janela do mapa e atende as consultas feitas com o mouse. """
+    # O pygame só é inicializado aqui, e não na importação do módulo:
+    import pygame
+    from pygame.locals import Rect
+    from lib.render import MapRenderer
+
+    pygame.init()   # Inicializa os módulos do pygame.
+
+    pygame.display.set_caption(Config.WINDOW_TITLE)   # Altera o título da janela.
+
+    # Altera as dimensões da janela.
+    screen = pygame.display.set_mode(Config.SCREEN_SIZE)
+
+    # Carregamos as fontes específicas do sistema que iremos utilizar na
+    # interface:
+    sys_font = pygame.font.SysFont(Config.FONT_FAMILY, Config.FONT_SIZE)
+    title_font = pygame.font.SysFont(Config.FONT_FAMILY, Config.FONT_SIZE+10)
+    medium_font = pygame.font.SysFont(Config.FONT_FAMILY, Config.FONT_SIZE+2)
+
+    # Carregamos e redimensionamos a imagem do mapa que será utilizada como
+    # imagem de fundo da interface:
+    map_image = pygame.image.load(Config.map_path)
+    map_image_scaled = pygame.transform.scale(map_image, Config.SCREEN_SIZE)
 
     # Instanciamos nosso grafo e geramos sua estrutura através da
     # função create_from_csv que lê um arquivo .csv e usa os dados
@@ -407,57 +486,74 @@ if __name__ == "__main__":
     # portanto teremos que criar os objetos que realmente guardarão
     # as informações de cada município, além das arestas do grafo.
 
-    # Fazemos a leitura das informações do mapa, gerando uma tabela
-    # de 3 colunas, depois convertemos esta tabela em uma matriz:
-    data = pd.read_csv(Config.positions_path, sep=',', encoding='utf-8')
-    data_matrix = data.values
-
-    map_cities = set()    # Lista de municípios.
-
-    # Para cada linha i da matriz criamos um novo objeto
-    # do tipo city e o adicionamos na lista:
-    for city_name, pos_x, pos_y in data_matrix:
-        new_city = City(name=city_name, pos=(pos_x, pos_y))
-        map_cities.add(new_city)
-
-    # Adicionamos os vizinhos desses municípios de acordo com o grafo
-    # que possui todas as informações de vizinhança:
-    for city, neighbours in graph.items():
-        for neighbour in neighbours:
-            city_object = get_city_byname(map_cities, city)
-            neighbour_object = get_city_byname(map_cities, neighbour[0])
-            # Adicionamos o vizinho ao município de origem:
-            city_object.add_neighbour(neighbour_object)
-
-    map_edges = set()   # Lista de arestas.
-
-    # Para cada vértice do grafo pegamos o nome e a lista
-    # de vizinhos e buscamos pelo objeto do tipo city
-    # para que possamos fazer as ligações:
-    for city, neighbours in graph.items():
-        for neighbour in neighbours:
-            # Verificamos se a aresta desses municípios já existe:
-            if get_edge(map_edges, city, neighbour[0]) is None:
-                city_object = get_city_byname(map_cities, city)
-                neighbour_object = get_city_byname(map_cities, neighbour[0])
-                # Criamos a aresta e a adicionamos na lista de arestas:
-                new_edge = Edge(origin=city, orig_pos=city_object.pos,
-                                destiny=neighbour[0], dest_pos=neighbour_object.pos)
-                map_edges.add(new_edge)
+    # Fazemos a leitura das posições de cada município no mapa:
+    positions = load_positions(Config.positions_path)
+
+    # Para cada município criamos um novo objeto do tipo city, indexado
+    # pelo nome:
+    map_cities = {city_name: City(name=city_name, pos=city_pos)
+                  for city_name, city_pos in positions.items()}
+
+    # Grafo invertido (usado pelas buscas que partem também do destino),
+    # heurística do A*, índice de landmarks do ALT e hierarquia de contração.
+    # Na versão lida do arquivo, o índice e a hierarquia vêm dos arquivos
+    # pré-processados; todas as estruturas são refeitas quando as arestas do
+    # grafo são alteradas:
+    indexes = GraphIndexes(graph, positions)
+
+    map_edges = dict()  # Arestas do mapa, indexadas por edge_key.
+
+    # Ligamos os municípios aos seus vizinhos e criamos as arestas do mapa
+    # de acordo com o grafo, que possui todas as informações de vizinhança.
+    # Alterações posteriores nas arestas do grafo são aplicadas no laço
+    # principal, a partir desta versão:
+    # As arestas também são registradas em um índice espacial, assim como os
+    # municípios abaixo, para que o desenho e a seleção com o mouse visitem
+    # apenas os elementos da área consultada:
+    edge_index = SpatialGrid(Config.GRID_CELL_SIZE)
+    map_version = sync_map(graph, -1, map_cities, map_edges, edge_index)
+
+    city_index = SpatialGrid(Config.GRID_CELL_SIZE)
+    for city in map_cities.values():
+        city_index.insert(city, city.rect)
+
+    # Desenho do mapa em camadas: a imagem e as arestas ficam em uma camada
+    # estática, e a cada quadro apenas as regiões alteradas são redesenhadas:
+    renderer = MapRenderer(screen, map_image_scaled, medium_font,
+                           map_cities.values(), edge_index, Config.LINE_WIDTH,
+                           Config.DOT_RADIUS, (COLOR_WHITE, COLOR_BLACK))
+    clock = pygame.time.Clock()
+
+    # Cache das consultas. Os métodos que retornam caminhos ótimos também
+    # podem responder a consulta no sentido inverso:
+    query_cache = QueryCache(Config.QUERY_CACHE_SIZE,
+                             symmetric=Config.SYMMETRIC_METHODS)
+
+    # Árvores de caminhos das últimas origens selecionadas:
+    path_trees = PathTreeCache()
 
     # Variáveis auxiliares:
     method_index = 0        # Índice do método de busca selecionado.
+    route = None            # Rota (Route) da última busca.
     found_path = None       # Caminho realizado pelo algoritmo.
     visited_cities = None   # Municípios visitados pelo algoritmo.
     from_city = None        # Município de origem.
     to_city = None          # Município de destino.
     draw_edges = False      # Determina se as arestas serão desenhadas.
+    edges_changed = True    # Determina se as cores das arestas mudaram.
     exit_ui = False         # Determina se o programa irá encerrar.
     dfs_lim = 7             # Limite de passos dos algoritmos que possuem limite.
 
     while not exit_ui:
         pygame.event.pump()  # Atualizamos os eventos do pygame.
 
+        # Refletimos no mapa as alterações feitas nas arestas do grafo:
+        if graph.version != map_version:
+            map_version = sync_map(graph, map_version, map_cities, map_edges,
+                                   edge_index)
+            renderer.invalidate()
+            edges_changed = True
+
         # Atualizamos a posição do ponteiro do mouse.
         mouse_pos = pygame.mouse.get_pos()
 
@@ -475,6 +571,7 @@ if __name__ == "__main__":
                 elif event.key == pygame.K_SPACE:
                     # Alternamos entre mostrar ou não as arestas na interface.
                     draw_edges = True if draw_edges is False else False
+                    edges_changed = True
                 elif event.key == pygame.K_LEFT:
                     # Alterna entre os métodos de busca.
                     method_index = method_index-1 if method_index > 0 \
@@ -487,9 +584,10 @@ if __name__ == "__main__":
                 elif event.key == pygame.K_DOWN:
                     dfs_lim -= 1 if dfs_lim > 0 else 0
             if event.type == pygame.MOUSEBUTTONUP:
-                for city in map_cities:
-                    # Verificamos se o retângulo do ponteiro colide com o
-                    # retângulo de algum ponto no mapa:
+                # Verificamos se o retângulo do ponteiro colide com o
+                # retângulo de algum ponto no mapa, consultando apenas os
+                # municípios próximos ao ponteiro:
+                for city in city_index.query(mouse_rect):
                     if city.rect.colliderect(mouse_rect):
                         # Os botões esquerdo e direito do mouse determinam,
                         # respectivamente, os municípios de origem e de
@@ -501,108 +599,375 @@ if __name__ == "__main__":
                 # Caso já tenhamos os municípios de origem e de destino
                 # selecionados, geramos a rota entre eles:
                 if (from_city and to_city) is not None:
-                    result = None
-                    # Verificamos qual método de busca está selecionado e
-                    # chamamos a função do mesmo:
-                    if method_index == 0:
-                        # Resultado do algoritmo de amplitude:
-                        result = bfs(graph, from_city.name, to_city.name)
-                    elif method_index == 1:
-                        # Resultado do algoritmo de profundidade:
-                        result = dfs(graph, from_city.name, to_city.name)
-                    elif method_index == 2:
-                        # Resultado do algoritmo de profundidade limitada:
-                        result = lim_dfs(graph, from_city.name,
-                                         to_city.name, dfs_lim)
-                    elif method_index == 3:
-                        result = deepening_dfs(
-                            graph, from_city.name, to_city.name, dfs_lim)
-                    elif method_index == 4:
-                        result = bidir_bfs(graph, from_city.name, to_city.name)
-                    else:
-                        result = uniform_cost_search(graph, from_city.name, to_city.name)
+                    # Consultas repetidas são respondidas pelo cache:
+                    result = query_cache.get(graph, method_index,
+                                             from_city.name, to_city.name,
+                                             dfs_lim)
+                    if result is None:
+                        # Sonda que mede a busca (as árvores de caminhos não
+                        # são medidas):
+                        probe = Probe()
+                        start = time.perf_counter()
+                        # Verificamos qual método de busca está selecionado e
+                        # chamamos a função do mesmo:
+                        if method_index == 0:
+                            # Resultado do algoritmo de amplitude, obtido da
+                            # árvore de amplitude da origem:
+                            result = path_trees.get(
+                                graph, from_city.name, weighted=False).result(
+                                to_city.name)
+                        elif method_index == 1:
+                            # Resultado do algoritmo de profundidade:
+                            result = dfs(graph, from_city.name, to_city.name,
+                                         probe=probe)
+                        elif method_index == 2:
+                            # Resultado do algoritmo de profundidade limitada:
+                            result = lim_dfs(graph, from_city.name,
+                                             to_city.name, dfs_lim,
+                                             probe=probe)
+                        elif method_index == 3:
+                            passes = list()  # Vértices expandidos por passada.
+                            result = deepening_dfs(
+                                graph, from_city.name, to_city.name, dfs_lim,
+                                passes=passes, probe=probe)
+                            print('\nVertices expandidos por passada: {}'.format(
+                                passes))
+                        elif method_index == 4:
+                            result = bidir_bfs(graph, from_city.name,
+                                               to_city.name, indexes.reverse,
+                                               probe=probe)
+                        elif method_index == 5:
+                            # A árvore de caminhos mínimos da origem responde
+                            # todos os destinos escolhidos em seguida:
+                            result = path_trees.get(
+                                graph, from_city.name).result(to_city.name)
+                        elif method_index == 6:
+                            result = astar_search(graph, from_city.name,
+                                                  to_city.name,
+                                                  indexes.heuristic,
+                                                  probe=probe)
+                        elif method_index == 7:
+                            # O ALT é o A* com a heurística dos landmarks:
+                            result = astar_search(graph, from_city.name,
+                                                  to_city.name,
+                                                  indexes.landmarks,
+                                                  probe=probe)
+                        elif method_index == 8:
+                            result = ch_search(indexes.hierarchy,
+                                               from_city.name, to_city.name,
+                                               probe=probe)
+                        else:
+                            result = bidir_uniform_cost_search(
+                                graph, from_city.name, to_city.name,
+                                indexes.reverse, probe=probe)
+                        if probe.expanded:
+                            print('\nVertices expandidos: {}, gerados: {}, '
+                                  'fronteira maxima: {}, tempo: {:.3f} ms'.format(
+                                      probe.expanded, probe.generated,
+                                      probe.max_frontier,
+                                      (time.perf_counter() - start) * 1000))
+                        query_cache.put(graph, method_index, from_city.name,
+                                        to_city.name, dfs_lim, result)
+                    # Rota com os conjuntos usados para destacar o mapa:
+                    route = Route(graph, result)
                     # Municípios que foram visitados pelo algoritmo.
-                    visited_cities = [city for city in result[0]]
+                    visited_cities = route.visited
                     # Caminho mais curto da origem até o destino.
-                    found_path = result[1]
+                    found_path = route.path
+                    edges_changed = True
 
                     # Imprimimos as informações no console:
                     if found_path is not None:
                         info_text = '\n\n# Rota: {} ate {}.\n\nCaminho encontrado: {} passos -> {}.\n\nMunicípios visitados: {} -> {}'
                         print(info_text.format(from_city.name, to_city.name, len(
                             found_path)-1, found_path, len(visited_cities), visited_cities))
+                        # Métodos com custo também informam a distância total:
+                        if len(result) > 2:
+                            print('\nDistancia total: {:.1f} km'.format(result[2]))
                     else:
                         info_text = '\n\n# Rota: {} ate {}.\n\nO objetivo nao foi encontrado dentro do limite estabelecido.\n\nMunicípios visitados: {} -> {}'
                         print(info_text.format(from_city.name, to_city.name, len(
                             visited_cities), visited_cities))
 
-        # Preenchemos o fundo da tela com uma cor específica.
-        screen.fill(COLOR_WHITE)
-        # Desenhamos a imagem do mapa na tela.
-        screen.blit(map_image_scaled, (0, 0))
-
-        # Renderizamos as arestas por pares de vértices:
-        for edge in map_edges:
-            # Verificamos se a origem e o destino da aresta coincide com o
-            # caminho resultante:
-            is_path_edge = (found_path is not None) and (
-                edge.origin in found_path and edge.destiny in found_path)
-            is_visited_edge = (found_path is not None) and (
-                edge.origin in found_path and edge.destiny in visited_cities)
-            # Desenha as arestas que não fazem parte do caminho:
-            if draw_edges is True:
-                pygame.draw.line(screen, COLOR_BLACK, edge.origin_pos,
-                                 edge.destiny_pos, Config.LINE_WIDTH)
-                # Desenha as arestas que fazem parte dos visitados:
-                if is_visited_edge:
-                    pygame.draw.line(
-                        screen, COLOR_RED, edge.origin_pos, edge.destiny_pos, Config.LINE_WIDTH)
-            # Desenha as arestas que fazem parte do caminho:
-            if is_path_edge:
-                pygame.draw.line(screen, COLOR_GREEN, edge.origin_pos,
-                                 edge.destiny_pos, Config.LINE_WIDTH)
-
-        # Caso já tenhamos a rota:
+        # As cores das arestas só são recalculadas quando o resultado, a
+        # visibilidade das arestas ou o grafo mudam:
+        if edges_changed:
+            edges_changed = False
+            renderer.show_edges(draw_edges)
+            edge_colors = dict()
+            if found_path is not None:
+                # Arestas que fazem parte dos visitados (apenas quando as
+                # arestas estão sendo mostradas) e, por cima delas, as
+                # arestas do caminho:
+                if draw_edges is True:
+                    for key in route.visited_edges:
+                        edge = map_edges.get(key)
+                        if edge is not None:
+                            edge_colors[edge] = COLOR_RED
+                for key in route.path_edges:
+                    edge = map_edges.get(key)
+                    if edge is not None:
+                        edge_colors[edge] = COLOR_GREEN
+            renderer.set_edge_colors(edge_colors)
+
+        # Definimos a cor verde para os municípios de origem e destino da
+        # rota e para os municípios nos quais o ponteiro colide:
+        city_colors = dict.fromkeys(city_index.query(mouse_rect), COLOR_GREEN)
+        if found_path is not None:
+            city_colors[from_city] = city_colors[to_city] = COLOR_GREEN
+        renderer.set_city_colors(city_colors)
+
+        texts = list()
+        # Caso já tenhamos a rota, mostramos um texto informativo acima do
+        # mapa, com a posição adaptada de acordo com o nome do município:
         if found_path is not None:
-            # Renderizamos um texto informativo acima do mapa:
             info_text = 'De {} até {}. Passos: {}.'.format(
-                from_city.name, to_city.name, len(found_path)-1 if found_path is not None else len(visited_cities))
-            # Criamos uma superfície renderizável:
-            text_surface = title_font.render(info_text, True, COLOR_BLACK)
-            # Adaptamos a posição do texto de acordo com o nome do município:
+                from_city.name, to_city.name, len(found_path)-1)
             text_position = (
                 Config.SCREEN_SIZE[0]/4 - 9 * len(from_city.name) + len(to_city.name), 0)
-            # Renderizamos a superfície do texto:
-            screen.blit(text_surface, text_position)
-
-        # Desenhamos o texto do método selecionado:
+            texts.append((title_font, info_text, COLOR_BLACK, text_position))
+        # Texto do método selecionado:
         method_text = 'Método de busca: ' + \
             Config.METHOD_NAMES[method_index] + \
             '. Limite de passos: %s' % dfs_lim
-        method_surface = title_font.render(method_text, True, COLOR_BLACK)
         method_position = (Config.SCREEN_SIZE[0]/4, Config.SCREEN_SIZE[1]-24)
-        screen.blit(method_surface, method_position)
-
-        # Definimos as cores de destaque e renderizamos os municípios no mapa:
-        for city in map_cities:
-            paint_color = COLOR_BLACK  # Cor padrão (município sem destaque).
-
-            # Definimos a cor verde para os municípios de origem e destino
-            # e definimos a cor branca para os municípios que fazem parte da
-            # rota:
-            if (found_path is not None) and (city.name == from_city or city.name == to_city):
-                paint_color = COLOR_GREEN
-
-            # Definimos a cor verde para os municípios nos quais o ponteiro
-            # colide:
-            pointer_collides = city.rect.colliderect(mouse_rect)
-            if pointer_collides:
-                paint_color = COLOR_GREEN
-
-            # Desenhamos o ponto e o nome dos municípios no mapa:
-            pygame.draw.circle(screen, paint_color,
-                               city.pos, Config.DOT_RADIUS)
-            name_text = medium_font.render(city.name, True, paint_color)
-            screen.blit(name_text, (city.pos[0]-len(city.name)*3, city.pos[1]))
-
-        pygame.display.flip()   # Atualizamos a janela da interface.
+        texts.append((title_font, method_text, COLOR_BLACK, method_position))
+        renderer.set_texts(texts)
+
+        # Redesenhamos apenas as regiões alteradas e atualizamos somente elas
+        # na janela. Sem alterações, o laço roda a uma taxa menor:
+        dirty_rects = renderer.draw()
+        pygame.display.update(dirty_rects)
+        clock.tick(Config.MAX_FPS if dirty_rects else Config.IDLE_FPS)
+
+
+####################
+# LINHA DE COMANDO #
+####################
+
+def route(args):
+    """ Subcomando route: executa uma única consulta, sem a interface.
+
+    Com --alternatives N, mostra também até N rotas (a mais curta e as
+    alternativas) calculadas por lib.k_paths.alternative_routes.
+    """
+    # Os módulos usados só pelos subcomandos não são carregados pela
+    # interface:
+    from lib.k_paths import ALTERNATIVE_METHODS, alternative_routes
+    if args.alternatives_method not in ALTERNATIVE_METHODS:
+        print('Método de alternativas desconhecido: {}'.format(
+            args.alternatives_method), file=sys.stderr)
+        return 2
+    graph = load_graph()
+    # O grafo invertido é construído uma única vez, para a busca e para as
+    # rotas alternativas:
+    indexes = GraphIndexes(graph)
+    methods = load_methods(graph, args.lim, [args.method], indexes)
+    metrics = SearchMetrics() if args.metrics else None
+    result = next(run_batch(graph, [(args.origin, args.goal, args.method)],
+                            methods, workers=1, metrics=metrics))
+    if metrics is not None:
+        metrics.write_prometheus(args.metrics)
+    alternatives = None
+    if args.alternatives and result.error is None:
+        alternatives = alternative_routes(
+            graph, args.origin, args.goal, args.alternatives,
+            args.alternatives_method, indexes.reverse)
+    if args.json:
+        output = result_dict(result)
+        if alternatives is not None:
+            output['alternatives'] = [
+                {'path': route_path, 'cost': round_cost(cost)}
+                for route_path, cost in alternatives]
+        print(json.dumps(output, ensure_ascii=False))
+    elif result.error is not None:
+        print('Consulta invalida: {}'.format(result.error))
+    elif result.path is not None:
+        info_text = '# Rota: {} ate {}.\n\nCaminho encontrado: {} passos -> {}.\n\nMunicípios visitados: {}'
+        print(info_text.format(result.origin, result.goal,
+                               len(result.path)-1, result.path,
+                               result.visited))
+        if result.cost is not None:
+            print('\nDistancia total: {:.1f} km'.format(result.cost))
+    else:
+        info_text = '# Rota: {} ate {}.\n\nO objetivo nao foi encontrado dentro do limite estabelecido.\n\nMunicípios visitados: {}'
+        print(info_text.format(result.origin, result.goal, result.visited))
+    if alternatives and not args.json:
+        print('\n# Rotas alternativas:')
+        for number, (route_path, cost) in enumerate(alternatives, 1):
+            print('\n{}. {:.1f} km -> {}'.format(number, cost, route_path))
+    return 0 if result.error is None else 1
+
+
+def batch(args):
+    """ Subcomando batch: lê consultas em JSON da entrada padrão, uma por
+    linha, e escreve um resultado em JSON por linha, na mesma ordem.
+
+    Cada consulta é um objeto com as chaves origin, goal e, opcionalmente,
+    method. Com um único processo, cada resposta é escrita assim que a
+    consulta é lida, permitindo usar o programa como serviço.
+
+    Com --input, as consultas são lidas de um arquivo .csv (origem, destino,
+    método), e com --output os resultados são gravados em um .csv
+    (lib.batch.read_queries e write_results).
+
+    Com --metrics, as métricas acumuladas são gravadas no formato do
+    Prometheus a cada --metrics-interval segundos e ao final da entrada.
+    """
+    graph = load_graph()
+    methods = load_methods(graph, args.lim, args.methods)
+    chunksize = 1 if args.workers == 1 else args.chunksize
+    if args.input is not None:
+        queries = read_queries(args.input, args.method)
+    else:
+        queries = _read_json_queries(sys.stdin, args.method)
+    metrics = SearchMetrics() if args.metrics else None
+
+    def results():
+        written = time.monotonic()
+        for result in run_batch(graph, queries, methods, args.workers,
+                                chunksize, metrics):
+            yield result
+            if metrics is not None and \
+                    time.monotonic() - written >= args.metrics_interval:
+                metrics.write_prometheus(args.metrics)
+                written = time.monotonic()
+    if args.output is not None:
+        write_results(args.output, results())
+    else:
+        for result in results():
+            sys.stdout.write(json.dumps(result_dict(result),
+                                        ensure_ascii=False))
+            sys.stdout.write('\n')
+            if args.workers == 1:
+                sys.stdout.flush()
+    if metrics is not None:
+        metrics.write_prometheus(args.metrics)
+    return 0
+
+
+def serve(args):
+    """ Subcomando serve: atende consultas por HTTP/JSON (lib.server). O
+    grafo é carregado novamente, sem interromper o atendimento, a cada
+    POST /reload.
+    """
+    from lib.server import run_server
+
+    def loader():
+        graph = load_graph()
+        return graph, load_methods(graph, args.lim, args.methods)
+    return run_server(loader, args.host, args.port, args.workers or None,
+                      args.threads, args.timeout)
+
+
+def _read_json_queries(lines, method):
+    """ Converte as linhas JSON da entrada em tuplas (origem, destino,
+    método), ignorando (com um aviso) as linhas inválidas.
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            query = json.loads(line)
+            yield (query['origin'], query['goal'],
+                   query.get('method', method))
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            print('Linha {} ignorada: {!r}'.format(number, error),
+                  file=sys.stderr)
+
+
+def main(argv=None):
+    """ Interpreta a linha de comando. Sem subcomando, abre a interface.
+
+    Parâmetros:
+    - argv : argumentos da linha de comando (None usa sys.argv).
+    """
+    parser = argparse.ArgumentParser(
+        prog='busca_grafos',
+        description='Busca de rotas entre os municípios do mapa.')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('ui', help='abre a interface (padrão)')
+
+    route_parser = commands.add_parser(
+        'route', help='executa uma consulta sem abrir a interface')
+    route_parser.add_argument('--from', dest='origin', required=True,
+                              help='município de origem')
+    route_parser.add_argument('--to', dest='goal', required=True,
+                              help='município de destino')
+    route_parser.add_argument('--method', default='uniform_cost_search',
+                              choices=SEARCH_METHODS,
+                              help='método de busca')
+    route_parser.add_argument('--lim', type=int, default=7,
+                              help='limite de passos dos métodos limitados')
+    route_parser.add_argument('--json', action='store_true',
+                              help='imprime o resultado em JSON')
+    route_parser.add_argument('--metrics', metavar='ARQUIVO',
+                              help='grava as métricas da consulta no formato '
+                              'do Prometheus')
+    route_parser.add_argument('--alternatives', type=int, default=0,
+                              metavar='N',
+                              help='mostra até N rotas alternativas')
+    route_parser.add_argument('--alternatives-method', default='penalty',
+                              metavar='METODO',
+                              help='método das rotas alternativas: penalty '
+                              '(padrão), plateau ou yen')
+
+    batch_parser = commands.add_parser(
+        'batch', help='executa consultas em lote (JSON ou .csv)')
+    batch_parser.add_argument('--method', default='uniform_cost_search',
+                              help='método das consultas que não o informam')
+    batch_parser.add_argument('--methods', nargs='+', choices=SEARCH_METHODS,
+                              help='métodos a carregar (padrão: todos, exceto '
+                              'matrix)')
+    batch_parser.add_argument('--input', metavar='ARQUIVO',
+                              help='lê as consultas de um .csv (origem, '
+                              'destino, método) em vez da entrada padrão')
+    batch_parser.add_argument('--output', metavar='ARQUIVO',
+                              help='grava os resultados em um .csv em vez '
+                              'da saída padrão')
+    batch_parser.add_argument('--lim', type=int, default=7,
+                              help='limite de passos dos métodos limitados')
+    batch_parser.add_argument('--workers', type=int, default=1,
+                              help='número de processos (0 usa todos)')
+    batch_parser.add_argument('--chunksize', type=int, default=256,
+                              help='consultas por bloco com vários processos')
+    batch_parser.add_argument('--metrics', metavar='ARQUIVO',
+                              help='grava as métricas das consultas no '
+                              'formato do Prometheus')
+    batch_parser.add_argument('--metrics-interval', type=float, default=10,
+                              help='segundos entre gravações das métricas')
+
+    serve_parser = commands.add_parser(
+        'serve', help='atende consultas por HTTP/JSON')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8080)
+    serve_parser.add_argument('--methods', nargs='+', choices=SEARCH_METHODS,
+                              help='métodos a carregar (padrão: todos, exceto '
+                              'matrix)')
+    serve_parser.add_argument('--lim', type=int, default=7,
+                              help='limite de passos dos métodos limitados')
+    serve_parser.add_argument('--workers', type=int, default=0,
+                              help='número de processos (0 usa todos)')
+    serve_parser.add_argument('--threads', action='store_true',
+                              help='usa threads em vez de processos')
+    serve_parser.add_argument('--timeout', type=float, default=10,
+                              help='prazo máximo de cada consulta, em '
+                              'segundos')
+
+    args = parser.parse_args(argv)
+    if args.command == 'route':
+        return route(args)
+    if args.command == 'batch':
+        return batch(args)
+    if args.command == 'serve':
+        return serve(args)
+    run_interface()
+    return 0
+
+
+###############
+# FUNÇÃO MAIN #
+###############
+
+if __name__ == "__main__":
+    sys.exit(main())
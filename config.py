@@ -8,17 +8,34 @@ SCREEN_SIZE = (800, 600)            # Dimensões da janela.
 FONT_SIZE = 14                      # Tamanho da fonte a ser utilizada.
 DOT_RADIUS = 4                      # Raio dos pontos do mapa.
 LINE_WIDTH = 2                      # Espessura das linhas de rota.
+GRID_CELL_SIZE = 32                 # Lado das células do índice espacial.
+MAX_FPS = 60                        # Quadros por segundo com a tela mudando.
+IDLE_FPS = 15                       # Quadros por segundo sem alterações.
 FONT_FAMILY = 'Consolas'            # Nome da fonte.
 ARQ_MAPA = 'mapa_vale.png'          # Nome do arquivo do mapa.
 ARQ_DISTANCIAS = 'distancias.csv'   # Nome do arquivo de distâncias.
 ARQ_MUNICIPIOS = 'municipios.csv'   # Nome do arquivo de municípios.
+ARQ_LANDMARKS = 'distancias.alt'    # Nome do arquivo de índice do ALT.
+LANDMARK_COUNT = 8                  # Número de landmarks do método ALT.
+ARQ_HIERARQUIA = 'distancias.ch'    # Nome do arquivo da hierarquia (CH).
+QUERY_CACHE_SIZE = 256              # Resultados guardados no cache (LRU).
+ARQ_MATRIZ = 'distancias'           # Prefixo dos arquivos da matriz de pares.
+ARQ_SNAPSHOT = 'distancias.csr'     # Nome do snapshot binário do grafo.
 
 METHOD_NAMES = ['Amplitude',
                 'Profundidade',
                 'Profundidade Limitada',
                 'Profundidade Interativa',
                 'Bi-direcional',
-                'Custo Uniforme']
+                'Custo Uniforme',
+                'A*',
+                'ALT (Landmarks)',
+                'Contraction Hierarchies',
+                'Custo Uniforme Bi-direcional']
+
+# Índices (em METHOD_NAMES) dos métodos que retornam caminhos ótimos, cujo
+# resultado invertido responde a consulta no sentido contrário:
+SYMMETRIC_METHODS = [0, 4, 5, 6, 7, 8, 9]
 
 # Diretório raiz do projeto:
 root_dir = path.dirname(path.abspath(__file__))
@@ -28,3 +45,12 @@ map_path = path.join(root_dir, 'res/' + ARQ_MAPA)
 distances_path = path.join(root_dir, 'res/' + ARQ_DISTANCIAS)
 # Diretório do arquivo de posições:
 positions_path = path.join(root_dir, 'res/' + ARQ_MUNICIPIOS)
+# Diretório do índice de landmarks (gerado ao lado do arquivo de distâncias):
+landmarks_path = path.join(root_dir, 'res/' + ARQ_LANDMARKS)
+# Diretório da hierarquia de contração (gerada ao lado do arquivo de distâncias):
+hierarchy_path = path.join(root_dir, 'res/' + ARQ_HIERARQUIA)
+# Prefixo da matriz de distâncias entre todos os pares (.names, .dist.npy e
+# .next.npy):
+matrix_prefix = path.join(root_dir, 'res/' + ARQ_MATRIZ)
+# Diretório do snapshot binário do grafo (gerado ao lado do arquivo de distâncias):
+snapshot_path = path.join(root_dir, 'res/' + ARQ_SNAPSHOT)
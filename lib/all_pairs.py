@@ -0,0 +1,308 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import os
+import time
+import numpy as np
+from array import array
+from os import cpu_count
+from concurrent.futures import ProcessPoolExecutor
+from lib.compact_graph import CompactGraph
+from lib.dijkstra import dijkstra
+
+# Acima deste número de vértices a matriz é construída com um Dijkstra por
+# origem em paralelo, em vez do Floyd-Warshall (O(n^3)).
+FLOYD_WARSHALL_LIMIT = 400
+
+_LOAD_ATTEMPTS = 3      # Leituras da geração durante gravações simultâneas.
+
+_worker_graph = None    # Grafo compartilhado com cada processo auxiliar.
+
+
+class DistanceMatrix:
+    """ Matriz de distâncias e de próximos passos entre todos os pares de
+    vértices.
+
+    distances[i, j] é a menor distância de i até j (inf se inalcançável) e
+    next_hop[i, j] é o vértice seguinte a i no caminho mínimo até j (-1 se
+    inalcançável). Uma rota é montada seguindo next_hop, em tempo
+    proporcional ao tamanho do caminho, sem nenhuma busca.
+
+    A matriz também é usada como método de busca ('matrix' em
+    lib.search.search_methods): cada consulta é uma leitura da matriz.
+    Quando lida de arquivos mapeados em memória, apenas os nomes dos
+    arquivos são enviados aos processos auxiliares, que os mapeiam em vez de
+    receber (ou recalcular) uma cópia das matrizes.
+
+    Parâmetros:
+    - names : nomes dos vértices, na ordem das linhas e colunas.
+    - distances : matriz n x n de distâncias (float64).
+    - next_hop : matriz n x n de próximos passos (int32).
+    """
+
+    def __init__(self, names, distances, next_hop):
+        self.names = names
+        self.ids = {name: index for index, name in enumerate(names)}
+        self.distances = distances
+        self.next_hop = next_hop
+        self._files = None      # Arquivos mapeados (distâncias, passos).
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getstate__(self):
+        # Matrizes mapeadas são enviadas a outro processo apenas pelos nomes
+        # dos arquivos, que são mapeados novamente do outro lado:
+        if self._files is None:
+            return self.__dict__
+        return {'names': self.names, '_files': self._files}
+
+    def __setstate__(self, state):
+        if 'distances' in state:
+            self.__dict__.update(state)
+            return
+        self.__init__(state['names'],
+                      *(np.load(name, mmap_mode='r')
+                        for name in state['_files']))
+        self._files = state['_files']
+
+    def vertex_id(self, name):
+        return self.ids[name]
+
+    def vertex_name(self, vertex):
+        return self.names[vertex]
+
+    @classmethod
+    def build(cls, graph, workers=None):
+        """ Constrói a matriz escolhendo o método pelo tamanho do grafo.
+
+        Parâmetros:
+        - graph : grafo com a interface de vizinhança.
+        - workers : número de processos do Dijkstra paralelo.
+        """
+        if len(graph) <= FLOYD_WARSHALL_LIMIT:
+            return cls.floyd_warshall(graph)
+        return cls.parallel_dijkstra(graph, workers)
+
+    @classmethod
+    def floyd_warshall(cls, graph):
+        """ Floyd-Warshall vetorizado com NumPy: cada vértice intermediário k
+        atualiza a matriz inteira de uma só vez.
+
+        Parâmetros:
+        - graph : grafo com a interface de vizinhança.
+        """
+        compact = _as_compact(graph)
+        count = len(compact)
+        distances = np.full((count, count), np.inf)
+        next_hop = np.full((count, count), -1, dtype=np.int32)
+        for source in range(count):
+            for target, weight in compact.arcs(source):
+                if weight < distances[source, target]:
+                    distances[source, target] = weight
+                    next_hop[source, target] = target
+        np.fill_diagonal(distances, 0.0)
+        np.fill_diagonal(next_hop, np.arange(count, dtype=np.int32))
+        # A linha e a coluna k não mudam durante a iteração k, então as
+        # matrizes podem ser atualizadas no lugar, reaproveitando os buffers:
+        through = np.empty_like(distances)
+        better = np.empty((count, count), dtype=bool)
+        for k in range(count):
+            np.add(distances[:, k, None], distances[None, k, :], out=through)
+            np.less(through, distances, out=better)
+            np.copyto(distances, through, where=better)
+            np.copyto(next_hop, next_hop[:, k, None], where=better)
+        return cls(list(compact.names), distances, next_hop)
+
+    @classmethod
+    def parallel_dijkstra(cls, graph, workers=None):
+        """ Um Dijkstra completo por origem, distribuído entre processos.
+
+        O grafo é convertido para CompactGraph e enviado uma única vez para
+        cada processo; cada tarefa retorna apenas uma linha das matrizes.
+
+        Parâmetros:
+        - graph : grafo com a interface de vizinhança.
+        - workers : número de processos (None usa todos os núcleos; 1 executa
+          no próprio processo).
+        """
+        compact = _as_compact(graph)
+        count = len(compact)
+        distances = np.empty((count, count))
+        next_hop = np.empty((count, count), dtype=np.int32)
+        if workers == 1:
+            _init_worker(compact)
+            rows = map(_source_rows, range(count))
+            for source, distance_row, hop_row in rows:
+                distances[source] = distance_row
+                next_hop[source] = hop_row
+        else:
+            workers = workers or cpu_count() or 1
+            chunk = max(1, count // (64 * workers))
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(compact,)) as executor:
+                for source, distance_row, hop_row in executor.map(
+                        _source_rows, range(count), chunksize=chunk):
+                    distances[source] = distance_row
+                    next_hop[source] = hop_row
+        return cls(list(compact.names), distances, next_hop)
+
+    def save(self, prefix):
+        """ Grava as matrizes em prefix.<geração>.dist.npy e
+        prefix.<geração>.next.npy, e os nomes dos vértices em prefix.names
+        (a geração na primeira linha, seguida de um nome por linha).
+
+        As matrizes de cada gravação têm nomes novos, e o arquivo de nomes,
+        gravado com outro nome e renomeado por último, é o que as torna
+        válidas: um leitor nunca combina matrizes novas com nomes antigos, e
+        uma falha durante a gravação mantém a matriz anterior. Os arquivos
+        da geração anterior são removidos ao final.
+
+        Parâmetros:
+        - prefix : caminho dos arquivos, sem extensão.
+        """
+        previous = _read_generation(prefix)
+        generation = '%d-%d' % (os.getpid(), time.time_ns())
+        for name, matrix in zip(_matrix_files(prefix, generation),
+                                (self.distances, self.next_hop)):
+            with open(name, 'wb') as matrix_file:
+                np.save(matrix_file, matrix)
+        temporary = '%s.names.%d.tmp' % (prefix, os.getpid())
+        with open(temporary, 'w', encoding='utf-8') as names_file:
+            names_file.write('\n'.join([generation] + list(self.names)))
+        os.replace(temporary, prefix + '.names')
+        if previous is not None and previous[0] != generation:
+            for name in _matrix_files(prefix, previous[0]):
+                try:
+                    os.remove(name)
+                except OSError:
+                    pass    # Já removido, ou ainda aberto (Windows).
+
+    @classmethod
+    def load(cls, prefix, mmap=True):
+        """ Lê as matrizes gravadas por save(). Com mmap, os arquivos são
+        mapeados em memória e compartilhados entre processos, sem cópia.
+
+        Parâmetros:
+        - prefix : caminho dos arquivos, sem extensão.
+        - mmap : mapeia os arquivos em vez de lê-los.
+        """
+        mode = 'r' if mmap else None
+        # Uma gravação simultânea pode remover a geração lida do arquivo de
+        # nomes antes que as matrizes sejam abertas; lemos a nova geração:
+        for attempt in range(_LOAD_ATTEMPTS):
+            stored = _read_generation(prefix)
+            if stored is None:
+                raise ValueError('Matriz de distâncias inválida: %s' % prefix)
+            generation, names = stored
+            files = _matrix_files(prefix, generation)
+            try:
+                distances, next_hop = (np.load(name, mmap_mode=mode)
+                                       for name in files)
+                break
+            except FileNotFoundError:
+                if attempt == _LOAD_ATTEMPTS - 1:
+                    raise
+        if len(names) != len(distances) or \
+                distances.shape != next_hop.shape:
+            raise ValueError('Matriz de distâncias inválida: %s' % prefix)
+        matrix = cls(names, distances, next_hop)
+        if mmap:
+            matrix._files = files
+        return matrix
+
+    def distance(self, origin, goal):
+        """ Retorna a menor distância entre dois vértices (inf se
+        inalcançável).
+        """
+        return float(self.distances[self.ids[origin], self.ids[goal]])
+
+    def query(self, origin, goal):
+        """ Retorna uma tupla (custo, caminho) entre dois vértices, pelos
+        identificadores, seguindo a matriz de próximos passos. O caminho é
+        None (e o custo, inf) caso goal seja inalcançável.
+
+        Parâmetros:
+        - origin : identificador do vértice inicial.
+        - goal : identificador do vértice objetivo.
+        """
+        vertex = origin
+        if self.next_hop[vertex, goal] < 0:
+            return (float('inf'), None)
+        path = [vertex]
+        while vertex != goal:
+            vertex = int(self.next_hop[vertex, goal])
+            path.append(vertex)
+        return (float(self.distances[origin, goal]), path)
+
+    def route(self, origin, goal):
+        """ Retorna o caminho mínimo entre dois vértices seguindo a matriz de
+        próximos passos, ou None caso goal seja inalcançável.
+
+        Parâmetros:
+        - origin : nome do vértice inicial.
+        - goal : nome do vértice objetivo.
+        """
+        path = self.query(self.ids[origin], self.ids[goal])[1]
+        if path is None:
+            return None
+        return [self.names[index] for index in path]
+
+
+def _as_compact(graph):
+    """ Retorna o grafo em formato CompactGraph, convertendo se preciso. """
+    if isinstance(graph, CompactGraph):
+        return graph
+    return CompactGraph.from_graph(graph)
+
+
+def _matrix_files(prefix, generation):
+    """ Nomes dos arquivos de distâncias e de próximos passos de uma
+    geração.
+    """
+    return ('%s.%s.dist.npy' % (prefix, generation),
+            '%s.%s.next.npy' % (prefix, generation))
+
+
+def _read_generation(prefix):
+    """ Lê prefix.names e retorna (geração, nomes), ou None caso o arquivo
+    não exista ou esteja vazio.
+    """
+    try:
+        with open(prefix + '.names', encoding='utf-8') as names_file:
+            lines = names_file.read().split('\n')
+    except FileNotFoundError:
+        return None
+    if not lines[0]:
+        return None
+    return (lines[0], lines[1:])
+
+
+def _init_worker(graph):
+    """ Guarda o grafo recebido no processo auxiliar. """
+    global _worker_graph
+    _worker_graph = graph
+
+
+def _source_rows(source):
+    """ Calcula as linhas de distâncias e de próximos passos de uma origem.
+
+    O próximo passo de cada vértice é herdado do seu predecessor, na ordem
+    em que os vértices foram fixados pelo Dijkstra.
+    """
+    distances, predecessors, settled = dijkstra(_worker_graph, source)
+    first_hop = array('i', [-1]) * len(_worker_graph)
+    first_hop[source] = source
+    for vertex in settled[1:]:
+        parent = predecessors[vertex]
+        first_hop[vertex] = vertex if parent == source else first_hop[parent]
+    return (source, array('d', distances), first_hop)
+
+
+if __name__ == '__main__':
+    # Pré-processamento offline: python -m lib.all_pairs
+    Config = __import__('config')
+    graph = CompactGraph()
+    graph.create_from_csv(Config.distances_path)
+    DistanceMatrix.build(graph).save(Config.matrix_prefix)
+    print('Matriz de distâncias gravada em', Config.matrix_prefix + '.*')
@@ -0,0 +1,197 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import csv
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import get_all_start_methods, get_context
+from os import cpu_count
+from lib.instrumentation import run_query
+
+# Resultado de uma consulta em lote. cost é None para os métodos que não
+# calculam custo, e error guarda a mensagem caso a consulta tenha falhado.
+BatchResult = namedtuple('BatchResult', ['origin', 'goal', 'method', 'path',
+                                         'cost', 'visited', 'error'])
+
+# Algarismos significativos dos custos gravados: os pesos são guardados em
+# float32, e a soma deles em float64 carrega o erro dessa conversão
+# (297.6999990940094 em vez de 297.7).
+COST_DIGITS = 7
+
+_worker_graph = None    # Grafo do processo auxiliar.
+_worker_methods = None  # Funções de busca do processo auxiliar.
+
+
+def run_batch(graph, queries, methods, workers=None, chunksize=256,
+              metrics=None):
+    """ Executa muitas consultas (origem, destino, método) em paralelo.
+
+    O grafo e as funções de busca são entregues a cada processo uma única
+    vez, na criação do processo: com o método 'fork' eles são herdados da
+    memória do processo pai, sem serialização. As consultas são enviadas em
+    blocos, com um número limitado de blocos em andamento, e os resultados
+    são produzidos na mesma ordem das consultas, à medida que ficam prontos.
+
+    Parâmetros:
+    - graph : grafo das consultas.
+    - queries : iterável de tuplas (origem, destino, método).
+    - methods : dicionário nome -> função(graph, origin, goal).
+    - workers : número de processos (None usa todos os núcleos; 1 executa
+      no próprio processo).
+    - chunksize : número de consultas por bloco.
+    - metrics : SearchMetrics que acumula as medidas de cada consulta
+      (lib.instrumentation); as medidas feitas nos processos auxiliares
+      voltam junto com os resultados.
+    """
+    queries = iter(queries)
+    workers = workers or cpu_count() or 1
+    instrumented = metrics is not None
+    if workers == 1:
+        _init_worker(graph, methods)
+        while True:
+            chunk = list(islice(queries, chunksize))
+            if not chunk:
+                return
+            yield from _collect(_run_chunk(chunk, instrumented), metrics)
+
+    context = get_context('fork') if 'fork' in get_all_start_methods() \
+        else None
+    with ProcessPoolExecutor(workers, mp_context=context,
+                             initializer=_init_worker,
+                             initargs=(graph, methods)) as executor:
+        pending = deque()
+        while True:
+            chunk = list(islice(queries, chunksize))
+            if chunk:
+                pending.append(executor.submit(_run_chunk, chunk,
+                                               instrumented))
+            # Mantemos alguns blocos por processo em andamento e devolvemos
+            # sempre o bloco mais antigo, preservando a ordem de entrada:
+            while pending and (not chunk or len(pending) >= 4 * workers):
+                yield from _collect(pending.popleft().result(), metrics)
+            if not chunk:
+                return
+
+
+def read_queries(path, method=None):
+    """ Lê um arquivo .csv de consultas em lote.
+
+    O arquivo deve conter um cabeçalho e 3 colunas separadas por vírgulas:
+    origem, destino e nome do método. O método pode ser omitido nas linhas
+    em que o padrão deve ser usado.
+
+    Parâmetros:
+    - path : caminho do arquivo .csv
+    - method : método das linhas que não o informam.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as csv_file:
+        reader = csv.reader(csv_file)
+        next(reader, None)  # Ignoramos o cabeçalho.
+        for row in reader:
+            if row:
+                yield (row[0], row[1],
+                       row[2] if len(row) > 2 and row[2] else method)
+
+
+def write_results(path, results):
+    """ Grava os resultados de run_batch em um arquivo .csv, à medida que
+    são produzidos. O caminho é gravado com os vértices separados por '|'.
+
+    Parâmetros:
+    - path : caminho do arquivo .csv
+    - results : iterável de BatchResult.
+    """
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(BatchResult._fields)
+        for result in results:
+            path = '|'.join(result.path) if result.path is not None else ''
+            writer.writerow(result._replace(path=path,
+                                            cost=round_cost(result.cost)))
+
+
+def round_cost(cost):
+    """ Arredonda um custo para COST_DIGITS algarismos significativos,
+    retornando None para consultas sem custo.
+
+    Parâmetros:
+    - cost : custo calculado pela busca.
+    """
+    return None if cost is None else float('%.*g' % (COST_DIGITS, cost))
+
+
+def result_dict(result):
+    """ Converte um BatchResult em dicionário para a saída em JSON, com o
+    custo arredondado por round_cost.
+
+    Parâmetros:
+    - result : BatchResult da consulta.
+    """
+    output = result._asdict()
+    output['cost'] = round_cost(result.cost)
+    return output
+
+
+def _init_worker(graph, methods):
+    """ Guarda o grafo e as funções de busca no processo auxiliar. """
+    global _worker_graph, _worker_methods
+    _worker_graph, _worker_methods = graph, methods
+
+
+def _run_chunk(chunk, instrumented=False):
+    """ Executa um bloco de consultas, retornando apenas os dados que
+    precisam voltar ao processo pai (caminho, custo e total de visitados).
+    Com instrumented, cada resultado vem acompanhado do seu QueryStats.
+    """
+    results = []
+    for origin, goal, method in chunk:
+        stats = None
+        unknown = _unknown_name(origin, goal, method)
+        if unknown is not None:
+            result = BatchResult(origin, goal, method, None, None, 0,
+                                 'desconhecido: %r' % (unknown,))
+            results.append((result, stats) if instrumented else result)
+            continue
+        try:
+            if instrumented:
+                result, stats = run_query(_worker_methods[method],
+                                          _worker_graph, origin, goal, method)
+            else:
+                result = _worker_methods[method](_worker_graph, origin, goal)
+        except Exception as error:
+            # Uma consulta com erro não interrompe as demais do bloco:
+            result = BatchResult(origin, goal, method, None, None, 0,
+                                 'erro: %r' % error)
+        else:
+            cost = result[2] if len(result) > 2 else None
+            result = BatchResult(origin, goal, method, result[1], cost,
+                                 len(result[0]), None)
+        results.append((result, stats) if instrumented else result)
+    return results
+
+
+def _unknown_name(origin, goal, method):
+    """ Retorna o primeiro vértice ou método da consulta que não existe no
+    processo auxiliar, ou None se todos existem.
+    """
+    for name, known in ((origin, _worker_graph), (goal, _worker_graph),
+                        (method, _worker_methods)):
+        try:
+            if name not in known:
+                return name
+        except TypeError:   # Nome que não pode ser chave (lista, dict...).
+            return name
+    return None
+
+
+def _collect(results, metrics):
+    """ Acumula em metrics as medidas que acompanham os resultados de um
+    bloco e retorna apenas os resultados.
+    """
+    if metrics is None:
+        return results
+    for result, stats in results:
+        if stats is not None:
+            metrics.observe(stats)
+    return [result for result, _ in results]
@@ -0,0 +1,341 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from busca_grafos import Config, GraphIndexes, load_methods, load_positions
+from lib.compact_graph import CompactGraph
+from lib.generators import GENERATORS, generate, write_csv
+from lib.instrumentation import Probe
+from lib.search import Graph
+
+# Métodos medidos por padrão (chaves de search_methods):
+DEFAULT_METHODS = ('bfs', 'dfs', 'lim_dfs', 'deepening_dfs', 'bidir_bfs',
+                   'uniform_cost_search')
+PERCENTILES = (50, 90, 99)
+
+
+def make_queries(graph, count, seed=0):
+    """ Sorteia pares (origem, destino) distintos e ligados entre si: o
+    destino é sempre sorteado no mesmo componente conexo da origem, já que
+    consultas sem resposta fazem os métodos iterativos percorrerem o
+    componente inteiro a cada passada. A mesma semente gera sempre as mesmas
+    consultas.
+
+    Parâmetros:
+    - graph : grafo das consultas.
+    - count : número de consultas.
+    - seed : semente do gerador de números aleatórios.
+    """
+    rng = random.Random(seed)
+    components = [component for component in _components(graph)
+                  if len(component) > 1]
+    origins = [(vertex, component) for component in components
+               for vertex in component]
+    if not origins:
+        return []
+    queries = []
+    for _ in range(count):
+        origin, component = rng.choice(origins)
+        goal = origin
+        while goal == origin:
+            goal = rng.choice(component)
+        queries.append((origin, goal))
+    return queries
+
+
+def _components(graph):
+    """ Retorna os componentes conexos do grafo (ignorando o sentido das
+    arestas) como listas ordenadas de nomes de vértices.
+    """
+    parent = {name: name for name in graph}
+
+    def find(vertex):
+        while parent[vertex] != vertex:
+            parent[vertex] = parent[parent[vertex]]
+            vertex = parent[vertex]
+        return vertex
+
+    for name in graph:
+        vertex = graph.vertex_id(name)
+        for neighbour in graph.neighbours(vertex):
+            first, second = find(name), find(graph.vertex_name(neighbour))
+            if first != second:
+                parent[first] = second
+    components = dict()
+    for name in sorted(graph):
+        components.setdefault(find(name), list()).append(name)
+    return list(components.values())
+
+
+def percentile(values, percent):
+    """ Retorna o percentil de uma lista de valores, interpolando entre os
+    dois valores mais próximos.
+
+    Parâmetros:
+    - values : valores medidos.
+    - percent : percentil desejado (0 a 100).
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * \
+        (position - lower)
+
+
+def benchmark_method(graph, method, queries, repeat=1):
+    """ Mede um método de busca sobre uma lista de consultas.
+
+    Cada consulta é executada repeat vezes e a menor duração é a usada. Os
+    vértices expandidos são contados por uma sonda (Probe) e o pico de
+    memória é medido com tracemalloc, cada um em uma passada separada, para
+    que nem a sonda nem o rastreamento interfiram nos tempos.
+
+    Retorna um dicionário com os percentis de latência (ms), o número de
+    vértices expandidos, o pico de memória (bytes) e quantas rotas foram
+    encontradas.
+
+    Parâmetros:
+    - graph : grafo das consultas.
+    - method : função(graph, origin, goal, probe=None) de search_methods.
+    - queries : lista de pares (origem, destino).
+    - repeat : execuções de cada consulta.
+    """
+    latencies, expanded, found = [], [], 0
+    for origin, goal in queries:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            method(graph, origin, goal)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        latencies.append(best * 1000)
+
+    for origin, goal in queries:
+        probe = Probe()
+        result = method(graph, origin, goal, probe=probe)
+        expanded.append(probe.expanded)
+        found += result[1] is not None
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for origin, goal in queries:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            method(graph, origin, goal)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    report = {'queries': len(queries), 'found': found}
+    report['latency_ms'] = _summary(latencies)
+    report['expanded'] = _summary(expanded)
+    report['peak_memory'] = _summary(peaks)
+    return report
+
+
+def run_benchmark(graph, queries, methods, names=DEFAULT_METHODS, repeat=1):
+    """ Mede os métodos pedidos, na ordem informada, sobre as mesmas
+    consultas. Retorna um dicionário nome -> relatório (benchmark_method).
+
+    Parâmetros:
+    - graph : grafo das consultas.
+    - queries : lista de pares (origem, destino).
+    - methods : dicionário nome -> função (search_methods).
+    - names : nomes dos métodos medidos.
+    - repeat : execuções de cada consulta.
+    """
+    return {name: benchmark_method(graph, methods[name], queries, repeat)
+            for name in names}
+
+
+def compare(old, new, threshold=0.2, key='p50'):
+    """ Compara dois relatórios gravados em JSON e retorna a lista de
+    métodos cuja latência piorou mais que threshold (fração).
+
+    Parâmetros:
+    - old : relatório de referência.
+    - new : relatório a ser verificado.
+    - threshold : piora relativa tolerada.
+    - key : estatística de latência comparada.
+    """
+    regressions = []
+    for name, report in new['methods'].items():
+        reference = old['methods'].get(name)
+        if reference is None:
+            continue
+        before = reference['latency_ms'][key]
+        after = report['latency_ms'][key]
+        if before and after > before * (1 + threshold):
+            regressions.append((name, before, after))
+    return regressions
+
+
+def _summary(values):
+    """ Resume uma lista de medidas em média, máximo e percentis. """
+    summary = {'mean': sum(values) / len(values) if values else None,
+               'max': max(values) if values else None}
+    for percent in PERCENTILES:
+        summary['p%d' % percent] = percentile(values, percent)
+    return summary
+
+
+def _commit():
+    """ Retorna o commit atual do repositório, se disponível. """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _load(distances_path, compact):
+    if compact:
+        graph = CompactGraph()
+    else:
+        graph = Graph()
+    graph.create_from_csv(distances_path)
+    return graph
+
+
+def load_graph_methods(graph, names, lim=7, positions=None,
+                       landmark_count=Config.LANDMARK_COUNT):
+    """ Retorna as funções de busca pedidas com busca_grafos.load_methods,
+    as mesmas usadas pela linha de comando, mas com as estruturas
+    auxiliares construídas em memória (GraphIndexes sem os arquivos
+    pré-processados, que são do mapa e não do grafo medido).
+
+    Retorna uma tupla (métodos, pré-processamento), onde pré-processamento
+    é um dicionário estrutura -> duração da construção em segundos.
+
+    Parâmetros:
+    - graph : grafo das consultas.
+    - names : nomes dos métodos medidos.
+    - lim : limite dos métodos de profundidade limitada e iterativa.
+    - positions : dicionário nome -> (x, y), necessário para o A*.
+    - landmark_count : número de landmarks do ALT.
+    """
+    indexes = GraphIndexes(graph, positions, landmark_count,
+                           preprocessed=False)
+    methods = load_methods(graph, lim, names, indexes)
+    return (methods, indexes.build_times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m lib.benchmark',
+        description='Mede os métodos de busca em grafos sintéticos.')
+    parser.add_argument('--graph', choices=sorted(GENERATORS), default='grid',
+                        help='tipo de grafo gerado (padrão: grid)')
+    parser.add_argument('--vertices', type=int, default=2500,
+                        help='número aproximado de vértices')
+    parser.add_argument('--csv', metavar='DISTANCIAS',
+                        help='mede um arquivo de distâncias existente em vez '
+                        'de gerar um grafo')
+    parser.add_argument('--positions', metavar='MUNICIPIOS',
+                        help='posições dos vértices de --csv, usadas pelo A* '
+                        '(padrão: municipios.csv ao lado do arquivo)')
+    parser.add_argument('--save-csv', metavar='DIR',
+                        help='grava o grafo gerado (distancias.csv e '
+                        'municipios.csv) neste diretório')
+    parser.add_argument('--compact', action='store_true',
+                        help='usa o formato CompactGraph em vez de Graph')
+    parser.add_argument('--methods', default=','.join(DEFAULT_METHODS),
+                        help='métodos separados por vírgulas')
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='execuções de cada consulta (vale a menor)')
+    parser.add_argument('--lim', type=int, default=7)
+    parser.add_argument('--landmarks', type=int,
+                        default=Config.LANDMARK_COUNT,
+                        help='número de landmarks do ALT e do A*')
+    parser.add_argument('--output', help='arquivo JSON do relatório')
+    parser.add_argument('--compare', metavar='JSON',
+                        help='relatório anterior; termina com erro se algum '
+                        'método ficar mais lento que --threshold')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    names = [name for name in args.methods.split(',') if name]
+    if args.csv is not None:
+        source = {'csv': os.path.abspath(args.csv)}
+        graph = _load(args.csv, args.compact)
+        positions_path = args.positions or os.path.join(
+            os.path.dirname(os.path.abspath(args.csv)), 'municipios.csv')
+        positions = load_positions(positions_path) \
+            if os.path.exists(positions_path) else None
+    else:
+        source = {'generator': args.graph, 'vertices': args.vertices,
+                  'seed': args.seed}
+        edges, positions = generate(args.graph, args.vertices, args.seed)
+        with tempfile.TemporaryDirectory() as directory:
+            directory = args.save_csv or directory
+            distances_path = os.path.join(directory, 'distancias.csv')
+            write_csv(edges, positions, distances_path,
+                      os.path.join(directory, 'municipios.csv'))
+            graph = _load(distances_path, args.compact)
+    if 'astar' in names and positions is None:
+        parser.error('o A* precisa das posições dos vértices (--positions)')
+    methods, preprocessing = load_graph_methods(graph, names, args.lim,
+                                                positions, args.landmarks)
+    unknown = [name for name in names if name not in methods]
+    if unknown:
+        parser.error('métodos desconhecidos: %s' % ', '.join(unknown))
+
+    queries = make_queries(graph, args.queries, args.seed)
+    report = {'graph': dict(source, vertex_count=len(graph),
+                            edge_count=sum(len(graph.neighbours(
+                                graph.vertex_id(name))) for name in graph),
+                            format='compact' if args.compact else 'dict'),
+              'queries': args.queries, 'seed': args.seed,
+              'repeat': args.repeat, 'lim': args.lim,
+              'preprocessing_s': preprocessing,
+              'python': platform.python_version(), 'commit': _commit(),
+              'methods': run_benchmark(graph, queries, methods, names,
+                                       args.repeat)}
+
+    for name, result in report['methods'].items():
+        if not result['queries']:
+            continue
+        latency, expanded = result['latency_ms'], result['expanded']
+        print('{:<28} p50 {:9.3f} ms  p90 {:9.3f} ms  p99 {:9.3f} ms  '
+              'expandidos {:9.1f}  memória {:9.0f} B  rotas {}/{}'.format(
+                  name, latency['p50'], latency['p90'], latency['p99'],
+                  expanded['mean'], result['peak_memory']['max'],
+                  result['found'], result['queries']), file=sys.stderr)
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as report_file:
+            report_file.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as report_file:
+            regressions = compare(json.load(report_file), report,
+                                  args.threshold)
+        for name, before, after in regressions:
+            print('Regressão em {}: {:.3f} ms -> {:.3f} ms'.format(
+                name, before, after), file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    # Medição: python -m lib.benchmark [--graph grid|geometric|scale_free]
+    sys.exit(main())
@@ -0,0 +1,331 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import csv
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+from array import array
+
+# Snapshot binário do grafo: identificação e versão do formato, contagens,
+# tamanho dos nomes e a chave do arquivo .csv de origem (mtime em
+# nanossegundos, tamanho e SHA-256).
+_MAGIC = b'CSR1'
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sIIIqqq32s')
+
+
+class CompactGraph:
+    """ Representa um grafo em formato CSR (Compressed Sparse Row).
+
+    Os nomes dos vértices são convertidos em identificadores inteiros
+    densos (0..n-1) e a vizinhança é guardada em três vetores contíguos:
+    - offsets : os vizinhos do vértice v ocupam as posições
+      offsets[v]..offsets[v+1]-1 dos vetores abaixo;
+    - targets : identificador do vértice vizinho;
+    - weights : distância até o vizinho (float32).
+
+    Cada aresta ocupa apenas 8 bytes, contra as centenas de bytes de uma
+    lista [vizinho, distância] dentro de um dict, e as buscas percorrem os
+    vizinhos como inteiros, sem criar uma lista por vizinho.
+    """
+
+    version = 0     # Incrementado a cada vez que o grafo é (re)criado.
+
+    def __init__(self):
+        self.names = list()         # Identificador -> nome.
+        self.ids = dict()           # Nome -> identificador.
+        self.offsets = array('q', [0])
+        self.targets = array('i')
+        self.weights = array('f')
+
+    def create_from_csv(self, path):
+        """ Lê um arquivo .csv e cria os vértices do grafo.
+
+        O arquivo deve ter o mesmo formato aceito por Graph.create_from_csv:
+        origem, vizinho e distância, separados por vírgulas e com cabeçalho.
+
+        Parâmetros:
+        - path : caminho do arquivo .csv
+        """
+        with open(path, newline='', encoding='utf-8-sig') as csv_file:
+            reader = csv.reader(csv_file)
+            next(reader, None)  # Ignoramos o cabeçalho.
+            rows = [(row[0], row[1], float(row[2])) for row in reader if row]
+        self._build(rows)
+
+    @classmethod
+    def load_csv(cls, path, snapshot_path):
+        """ Carrega o grafo de um arquivo .csv usando um snapshot binário.
+
+        Na primeira carga o .csv é lido e o snapshot é gravado em
+        snapshot_path; nas seguintes, enquanto o .csv não mudar, o snapshot é
+        mapeado em memória e nenhum texto é interpretado. O .csv é
+        considerado o mesmo se tiver o mesmo mtime e tamanho ou, caso apenas
+        o mtime tenha mudado, o mesmo SHA-256.
+
+        Parâmetros:
+        - path : caminho do arquivo .csv
+        - snapshot_path : caminho do snapshot binário.
+        """
+        key = _source_key(path)
+        stored = _read_key(snapshot_path)
+        if stored is not None and stored[:2] == key:
+            return cls.load(snapshot_path)
+        digest = _source_digest(path)
+        if stored is not None and stored[1:] == (key[1], digest):
+            # O arquivo foi apenas tocado ou copiado: atualizamos a chave do
+            # snapshot para evitar recalcular o SHA-256 na próxima carga.
+            _write_key(snapshot_path, key + (digest,))
+            return cls.load(snapshot_path)
+        graph = cls()
+        graph.create_from_csv(path)
+        graph.save(snapshot_path, key + (digest,))
+        return graph
+
+    def save(self, path, source_key=(0, 0, bytes(32))):
+        """ Grava o grafo em um snapshot binário.
+
+        Formato: cabeçalho, nomes em UTF-8 separados por quebras de linha e
+        os vetores offsets (int64), targets (int32) e weights (float32), cada
+        um alinhado em 8 bytes para poder ser mapeado diretamente. O arquivo
+        é gravado com outro nome e renomeado ao final, para que processos
+        lendo o snapshot ao mesmo tempo nunca vejam um arquivo incompleto.
+
+        Parâmetros:
+        - path : caminho do snapshot.
+        - source_key : (mtime, tamanho, SHA-256) do arquivo de origem.
+        """
+        names = '\n'.join(self.names).encode('utf-8')
+        temporary = '%s.%d.tmp' % (path, os.getpid())
+        with open(temporary, 'wb') as output:
+            output.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION,
+                                      len(self.names), len(names),
+                                      len(self.targets), *source_key))
+            output.write(names)
+            for table in (self.offsets, self.targets, self.weights):
+                output.write(bytes(-output.tell() % 8))
+                output.write(memoryview(table).cast('B'))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """ Mapeia em memória um snapshot gravado por save().
+
+        Os vetores passam a ser visões (memoryview) somente leitura do
+        arquivo: apenas as páginas usadas pelas buscas são lidas do disco, e
+        processos que abrem o mesmo snapshot compartilham essas páginas.
+
+        Parâmetros:
+        - path : caminho do snapshot.
+        """
+        with open(path, 'rb') as snapshot:
+            data = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, vertex_count, names_size, edge_count = \
+            _HEADER.unpack_from(data)[:5]
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError('Snapshot de grafo inválido: %s' % path)
+        graph = cls()
+        position = _HEADER.size
+        names = data[position:position + names_size].decode('utf-8')
+        graph.names = names.split('\n') if vertex_count else []
+        graph.ids = {name: vertex for vertex, name in enumerate(graph.names)}
+        position += names_size
+        view = memoryview(data)
+        tables = []
+        for code, size, count in (('q', 8, vertex_count + 1),
+                                  ('i', 4, edge_count), ('f', 4, edge_count)):
+            position += -position % 8
+            tables.append(view[position:position + size * count].cast(code))
+            position += size * count
+        graph.offsets, graph.targets, graph.weights = tables
+        graph.version += 1
+        return graph
+
+    def __getstate__(self):
+        # Visões de um snapshot mapeado não podem ser serializadas; elas são
+        # copiadas para vetores comuns quando o grafo é enviado a outro
+        # processo.
+        state = dict(self.__dict__)
+        for name, code in (('offsets', 'q'), ('targets', 'i'),
+                           ('weights', 'f')):
+            if isinstance(state[name], memoryview):
+                state[name] = array(code, state[name])
+        return state
+
+    @classmethod
+    def from_graph(cls, graph):
+        """ Cria um grafo compacto a partir de um Graph já carregado.
+
+        Todas as chaves de graph viram vértices, inclusive as que não têm
+        mais nenhuma aresta (por exemplo, após Graph.remove_edge).
+
+        Parâmetros:
+        - graph : grafo no formato dict de nome -> [[vizinho, distância]]
+        """
+        compact = cls()
+        compact._build(((from_city, to_city, distance)
+                        for from_city, neighbours in graph.items()
+                        for to_city, distance in neighbours), graph)
+        return compact
+
+    def _build(self, rows, vertices=()):
+        """ Monta os vetores CSR a partir de triplas (origem, destino, peso),
+        preservando a ordem original dos vizinhos de cada vértice.
+
+        Parâmetros:
+        - rows : triplas (origem, destino, peso).
+        - vertices : nomes que recebem os primeiros identificadores, mesmo
+          sem arestas.
+        """
+        rows = list(rows)
+        self.version += 1
+        for name in vertices:
+            self._intern(name)
+        # Os vértices de origem recebem os primeiros identificadores, na
+        # ordem em que aparecem, assim como as chaves de Graph:
+        for from_city, _, _ in rows:
+            self._intern(from_city)
+        sources = array('i', [self.ids[row[0]] for row in rows])
+        destinations = array('i', [self._intern(row[1]) for row in rows])
+
+        # Contamos o grau de saída de cada vértice e acumulamos os offsets:
+        vertex_count = len(self.names)
+        degree = array('q', bytes(8 * (vertex_count + 1)))
+        for source in sources:
+            degree[source + 1] += 1
+        for vertex in range(vertex_count):
+            degree[vertex + 1] += degree[vertex]
+        self.offsets = array('q', degree)
+
+        # Distribuímos as arestas nas suas posições (counting sort estável):
+        self.targets = array('i', bytes(4 * len(rows)))
+        self.weights = array('f', bytes(4 * len(rows)))
+        cursor = degree
+        for index, source in enumerate(sources):
+            position = cursor[source]
+            self.targets[position] = destinations[index]
+            self.weights[position] = rows[index][2]
+            cursor[source] += 1
+
+    def reversed(self):
+        """ Retorna um novo grafo compacto com o sentido de todas as arestas
+        invertido, mantendo os mesmos identificadores de vértices.
+        """
+        graph = CompactGraph()
+        graph.names, graph.ids = self.names, self.ids
+        vertex_count = len(self.names)
+        degree = array('q', bytes(8 * (vertex_count + 1)))
+        for target in self.targets:
+            degree[target + 1] += 1
+        for vertex in range(vertex_count):
+            degree[vertex + 1] += degree[vertex]
+        graph.offsets = array('q', degree)
+        graph.targets = array('i', bytes(4 * len(self.targets)))
+        graph.weights = array('f', bytes(4 * len(self.targets)))
+        cursor = degree
+        for source in range(vertex_count):
+            for position in range(self.offsets[source],
+                                  self.offsets[source + 1]):
+                target = self.targets[position]
+                graph.targets[cursor[target]] = source
+                graph.weights[cursor[target]] = self.weights[position]
+                cursor[target] += 1
+        return graph
+
+    def _intern(self, name):
+        """ Retorna o identificador do nome, criando um novo se necessário. """
+        vertex = self.ids.get(name)
+        if vertex is None:
+            vertex = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return vertex
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def __iter__(self):
+        return iter(self.names)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def vertex_id(self, name):
+        """ Converte o nome de um vértice no seu identificador interno. """
+        return self.ids[name]
+
+    def vertex_name(self, vertex):
+        """ Converte o identificador interno de um vértice no seu nome. """
+        return self.names[vertex]
+
+    def neighbours(self, vertex):
+        """ Retorna os identificadores dos vizinhos do vértice. """
+        return self.targets[self.offsets[vertex]:self.offsets[vertex + 1]]
+
+    def arcs(self, vertex):
+        """ Retorna pares (vizinho, distância) partindo do vértice. """
+        start, end = self.offsets[vertex], self.offsets[vertex + 1]
+        return zip(self.targets[start:end], self.weights[start:end])
+
+    def items(self):
+        """ Percorre o grafo no mesmo formato de Graph.items(), traduzindo os
+        identificadores de volta para nomes. Útil apenas para a interface.
+        """
+        names = self.names
+        for vertex, name in enumerate(names):
+            yield name, [[names[to], distance]
+                         for to, distance in self.arcs(vertex)]
+
+
+def _source_key(path):
+    """ Retorna (mtime em nanossegundos, tamanho) de um arquivo. """
+    status = os.stat(path)
+    return (status.st_mtime_ns, status.st_size)
+
+
+def _source_digest(path):
+    """ Calcula o SHA-256 de um arquivo, lendo-o em blocos. """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def _read_key(path):
+    """ Retorna a chave (mtime, tamanho, SHA-256) guardada no cabeçalho de um
+    snapshot, ou None caso ele não exista ou seja de outro formato.
+    """
+    try:
+        with open(path, 'rb') as snapshot:
+            header = snapshot.read(_HEADER.size)
+    except OSError:
+        return None
+    if len(header) < _HEADER.size:
+        return None
+    fields = _HEADER.unpack(header)
+    if fields[0] != _MAGIC or fields[1] != _FORMAT_VERSION:
+        return None
+    return fields[5:]
+
+
+def _write_key(path, key):
+    """ Substitui a chave do arquivo de origem no cabeçalho de um snapshot.
+
+    O snapshot não é alterado no lugar, pois outros processos podem tê-lo
+    mapeado em memória e veriam um cabeçalho pela metade: uma cópia com o
+    novo cabeçalho é gravada com outro nome e renomeada ao final, como em
+    CompactGraph.save.
+    """
+    temporary = '%s.%d.tmp' % (path, os.getpid())
+    with open(path, 'rb') as snapshot, open(temporary, 'wb') as output:
+        fields = _HEADER.unpack(snapshot.read(_HEADER.size))
+        output.write(_HEADER.pack(*(fields[:5] + tuple(key))))
+        shutil.copyfileobj(snapshot, output, 1 << 20)
+    os.replace(temporary, path)
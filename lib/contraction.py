@@ -0,0 +1,387 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import os
+import struct
+from array import array
+from heapq import heapify, heappush, heappop
+from lib.dijkstra import INFINITY
+
+# Cabeçalho do arquivo da hierarquia: assinatura, número de vértices, número
+# de arestas ascendentes, número de arestas descendentes e tamanho (em bytes)
+# da lista de nomes.
+_MAGIC = b'CH01'
+_HEADER = struct.Struct('<4sIIII')
+
+# Número máximo de vértices fixados por busca de testemunha. Interromper a
+# busca mais cedo apenas cria atalhos desnecessários, nunca atalhos errados.
+WITNESS_SETTLE_LIMIT = 500
+
+
+class _UpwardGraph:
+    """ Arestas da hierarquia em formato CSR, todas apontando para vértices
+    de maior prioridade. Cada aresta guarda também o vértice intermediário
+    do atalho (-1 para arestas originais).
+    """
+
+    def __init__(self, offsets, targets, weights, middles):
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.middles = middles
+
+    @classmethod
+    def from_lists(cls, lists):
+        offsets, targets = array('q', [0]), array('i')
+        weights, middles = array('d'), array('i')
+        for edges in lists:
+            for target, weight, middle in edges:
+                targets.append(target)
+                weights.append(weight)
+                middles.append(middle)
+            offsets.append(len(targets))
+        return cls(offsets, targets, weights, middles)
+
+    def arcs(self, vertex):
+        start, end = self.offsets[vertex], self.offsets[vertex + 1]
+        return zip(self.targets[start:end], self.weights[start:end])
+
+    def middle(self, vertex, target):
+        for position in range(self.offsets[vertex], self.offsets[vertex + 1]):
+            if self.targets[position] == target:
+                return self.middles[position]
+        raise KeyError((vertex, target))
+
+    def write(self, output):
+        for table in (self.offsets, self.targets, self.weights, self.middles):
+            table.tofile(output)
+
+    @classmethod
+    def read(cls, source, vertex_count, edge_count):
+        tables = []
+        for typecode, size in (('q', vertex_count + 1), ('i', edge_count),
+                               ('d', edge_count), ('i', edge_count)):
+            table = array(typecode)
+            table.fromfile(source, size)
+            tables.append(table)
+        return cls(*tables)
+
+
+class ContractionHierarchy:
+    """ Hierarquia de contração (Contraction Hierarchies) de um grafo.
+
+    Os vértices são contraídos um a um, do menos para o mais importante.
+    Ao contrair v, cada caminho u -> v -> w que não possua um caminho
+    alternativo (testemunha) de custo menor ou igual vira um atalho u -> w.
+    A consulta é um Dijkstra bidirecional que só sobe na hierarquia: a busca
+    da origem usa as arestas ascendentes (up) e a do destino as arestas
+    descendentes invertidas (down), ambas em direção aos vértices de maior
+    prioridade.
+
+    Parâmetros:
+    - names : nomes dos vértices, na ordem dos identificadores.
+    - rank : posição de cada vértice na ordem de contração.
+    - up : arestas u -> w com rank[u] < rank[w], guardadas em u.
+    - down : arestas u -> w com rank[u] > rank[w], guardadas em w com
+      destino u.
+    """
+
+    def __init__(self, names, rank, up, down):
+        self.names = names
+        self.ids = {name: vertex for vertex, name in enumerate(names)}
+        self.rank = rank
+        self.up = up
+        self.down = down
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def vertex_id(self, name):
+        return self.ids[name]
+
+    def vertex_name(self, vertex):
+        return self.names[vertex]
+
+    @classmethod
+    def build(cls, graph, witness_limit=WITNESS_SETTLE_LIMIT):
+        """ Ordena e contrai todos os vértices do grafo.
+
+        A ordem de contração é dada pela diferença de arestas (atalhos
+        criados menos arestas removidas) somada ao número de vizinhos já
+        contraídos, com atualização preguiçosa das prioridades.
+
+        Parâmetros:
+        - graph : grafo com a interface de vizinhança.
+        - witness_limit : máximo de vértices fixados por busca de testemunha.
+        """
+        names, ids = [], {}
+        for name in graph:
+            ids[name] = len(names)
+            names.append(name)
+        outgoing = [dict() for _ in names]
+        incoming = [dict() for _ in names]
+        for name in list(names):
+            source = ids[name]
+            for neighbour, distance in graph.arcs(graph.vertex_id(name)):
+                neighbour = graph.vertex_name(neighbour)
+                if neighbour not in ids:
+                    ids[neighbour] = len(names)
+                    names.append(neighbour)
+                    outgoing.append(dict())
+                    incoming.append(dict())
+                target = ids[neighbour]
+                if target != source and distance < \
+                        outgoing[source].get(target, (INFINITY,))[0]:
+                    outgoing[source][target] = (distance, -1)
+                    incoming[target][source] = (distance, -1)
+
+        contraction = _Contraction(outgoing, incoming, witness_limit)
+        vertex_count = len(names)
+        rank = array('I', bytes(4 * vertex_count))
+        up = [list() for _ in names]
+        down = [list() for _ in names]
+        heap = [(contraction.priority(vertex)[0], vertex)
+                for vertex in range(vertex_count)]
+        heapify(heap)
+        order = 0
+        while heap:
+            _, vertex = heappop(heap)
+            # Atualização preguiçosa: se a prioridade piorou desde que o
+            # vértice entrou no heap, ele volta para a fila.
+            priority, shortcuts = contraction.priority(vertex)
+            if heap and priority > heap[0][0]:
+                heappush(heap, (priority, vertex))
+                continue
+            rank[vertex] = order
+            order += 1
+            for target, (weight, middle) in outgoing[vertex].items():
+                up[vertex].append((target, weight, middle))
+            for source, (weight, middle) in incoming[vertex].items():
+                down[vertex].append((source, weight, middle))
+            contraction.contract(vertex, shortcuts)
+        return cls(names, rank, _UpwardGraph.from_lists(up),
+                   _UpwardGraph.from_lists(down))
+
+    def query(self, origin, goal, probe=None):
+        """ Dijkstra bidirecional ascendente entre dois vértices.
+
+        Cada lado para quando o menor valor do seu heap não pode mais
+        melhorar o melhor ponto de encontro já conhecido.
+
+        Retorna uma tupla (custo, caminho, fixados), onde o caminho já está
+        desempacotado na sequência original de vértices (ou None caso o
+        destino seja inalcançável) e fixados é a lista de vértices
+        expandidos pelas duas buscas.
+
+        Parâmetros:
+        - origin : identificador do vértice inicial.
+        - goal : identificador do vértice objetivo.
+        - probe : sonda de instrumentação (lib.instrumentation.Probe),
+          opcional.
+        """
+        distances = ({origin: 0.0}, {goal: 0.0})
+        parents = ({origin: None}, {goal: None})
+        heaps = ([(0.0, origin)], [(0.0, goal)])
+        graphs = (self.up, self.down)
+        best, meeting = INFINITY, None
+        settled = []
+        while heaps[0] or heaps[1]:
+            # Expandimos o lado cujo heap possui a menor distância:
+            if not heaps[1] or (heaps[0] and heaps[0][0][0] <= heaps[1][0][0]):
+                side = 0
+            else:
+                side = 1
+            if heaps[side][0][0] >= best:
+                break
+            distance, vertex = heappop(heaps[side])
+            if distance > distances[side][vertex]:
+                continue    # Entrada obsoleta.
+            settled.append(vertex)
+            if probe is not None:
+                probe.expand(vertex)
+            other = distances[1 - side].get(vertex)
+            if other is not None and distance + other < best:
+                best, meeting = distance + other, vertex
+            own_distances, own_parents = distances[side], parents[side]
+            for neighbour, weight in graphs[side].arcs(vertex):
+                new_distance = distance + weight
+                if new_distance < own_distances.get(neighbour, INFINITY):
+                    own_distances[neighbour] = new_distance
+                    own_parents[neighbour] = vertex
+                    heappush(heaps[side], (new_distance, neighbour))
+                    if probe is not None:
+                        probe.push(neighbour, len(heaps[0]) + len(heaps[1]))
+        if meeting is None:
+            return (INFINITY, None, settled)
+        if probe is not None:
+            probe.goal(goal)
+
+        # Caminho na hierarquia: origem -> encontro -> destino.
+        hierarchy_path = []
+        vertex = meeting
+        while vertex is not None:
+            hierarchy_path.append(vertex)
+            vertex = parents[0][vertex]
+        hierarchy_path.reverse()
+        vertex = parents[1][meeting]
+        while vertex is not None:
+            hierarchy_path.append(vertex)
+            vertex = parents[1][vertex]
+        return (best, self.unpack(hierarchy_path), settled)
+
+    def unpack(self, hierarchy_path):
+        """ Substitui cada atalho do caminho pelos vértices que ele
+        representa, retornando a sequência de vértices do grafo original.
+
+        Parâmetros:
+        - hierarchy_path : caminho com arestas da hierarquia.
+        """
+        path = hierarchy_path[:1]
+        for source, target in zip(hierarchy_path, hierarchy_path[1:]):
+            stack = [(source, target)]
+            while stack:
+                source, target = stack.pop()
+                if self.rank[source] < self.rank[target]:
+                    middle = self.up.middle(source, target)
+                else:
+                    middle = self.down.middle(target, source)
+                if middle < 0:
+                    path.append(target)
+                else:
+                    stack.append((middle, target))
+                    stack.append((source, middle))
+        return path
+
+    def save(self, path):
+        """ Grava a hierarquia em um arquivo binário.
+
+        O arquivo é gravado com outro nome e renomeado ao final, para que
+        uma falha durante a gravação nunca deixe uma hierarquia incompleta.
+
+        Parâmetros:
+        - path : caminho do arquivo.
+        """
+        names = '\n'.join(self.names).encode('utf-8')
+        temporary = '%s.%d.tmp' % (path, os.getpid())
+        with open(temporary, 'wb') as output:
+            output.write(_HEADER.pack(_MAGIC, len(self.names),
+                                      len(self.up.targets),
+                                      len(self.down.targets), len(names)))
+            output.write(names)
+            self.rank.tofile(output)
+            self.up.write(output)
+            self.down.write(output)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """ Lê uma hierarquia gravada por save().
+
+        Parâmetros:
+        - path : caminho do arquivo.
+        """
+        with open(path, 'rb') as source:
+            magic, vertex_count, up_count, down_count, names_size = \
+                _HEADER.unpack(source.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError('Arquivo de hierarquia inválido: %s' % path)
+            names = source.read(names_size).decode('utf-8')
+            names = names.split('\n') if vertex_count else []
+            rank = array('I')
+            rank.fromfile(source, vertex_count)
+            up = _UpwardGraph.read(source, vertex_count, up_count)
+            down = _UpwardGraph.read(source, vertex_count, down_count)
+        return cls(names, rank, up, down)
+
+
+class _Contraction:
+    """ Estado do grafo restante durante a contração.
+
+    Parâmetros:
+    - outgoing : por vértice, dicionário destino -> (peso, intermediário).
+    - incoming : por vértice, dicionário origem -> (peso, intermediário).
+    - witness_limit : máximo de vértices fixados por busca de testemunha.
+    """
+
+    def __init__(self, outgoing, incoming, witness_limit):
+        self.outgoing = outgoing
+        self.incoming = incoming
+        self.witness_limit = witness_limit
+        self.deleted = [0] * len(outgoing)
+
+    def shortcuts(self, vertex):
+        """ Retorna os atalhos (origem, destino, peso) necessários para
+        contrair o vértice.
+        """
+        outgoing = self.outgoing[vertex]
+        shortcuts = []
+        for source, (in_weight, _) in self.incoming[vertex].items():
+            targets = {target: in_weight + out_weight
+                       for target, (out_weight, _) in outgoing.items()
+                       if target != source}
+            if not targets:
+                continue
+            witness = self._witness_search(source, vertex, targets)
+            for target, weight in targets.items():
+                if witness.get(target, INFINITY) > weight:
+                    shortcuts.append((source, target, weight))
+        return shortcuts
+
+    def _witness_search(self, source, skipped, targets):
+        """ Dijkstra local a partir de source, sem passar por skipped,
+        limitado ao maior custo de atalho e a witness_limit vértices.
+        """
+        limit = max(targets.values())
+        distances = {source: 0.0}
+        heap = [(0.0, source)]
+        settled = 0
+        remaining = len(targets)
+        while heap and settled < self.witness_limit and remaining:
+            distance, vertex = heappop(heap)
+            if distance > distances[vertex]:
+                continue
+            if distance > limit:
+                break
+            settled += 1
+            if vertex in targets:
+                remaining -= 1
+            for neighbour, (weight, _) in self.outgoing[vertex].items():
+                if neighbour == skipped:
+                    continue
+                new_distance = distance + weight
+                if new_distance < distances.get(neighbour, INFINITY):
+                    distances[neighbour] = new_distance
+                    heappush(heap, (new_distance, neighbour))
+        return distances
+
+    def priority(self, vertex):
+        """ Retorna a prioridade do vértice e os atalhos que ele exigiria. """
+        shortcuts = self.shortcuts(vertex)
+        removed = len(self.outgoing[vertex]) + len(self.incoming[vertex])
+        return (len(shortcuts) - removed + self.deleted[vertex], shortcuts)
+
+    def contract(self, vertex, shortcuts):
+        """ Remove o vértice do grafo restante e insere os atalhos. """
+        for target in self.outgoing[vertex]:
+            del self.incoming[target][vertex]
+            self.deleted[target] += 1
+        for source in self.incoming[vertex]:
+            del self.outgoing[source][vertex]
+            self.deleted[source] += 1
+        for source, target, weight in shortcuts:
+            if weight < self.outgoing[source].get(target, (INFINITY,))[0]:
+                self.outgoing[source][target] = (weight, vertex)
+                self.incoming[target][source] = (weight, vertex)
+
+
+if __name__ == '__main__':
+    # Pré-processamento offline: python -m lib.contraction
+    from lib.compact_graph import CompactGraph
+    Config = __import__('config')
+    graph = CompactGraph()
+    graph.create_from_csv(Config.distances_path)
+    ContractionHierarchy.build(graph).save(Config.hierarchy_path)
+    print('Hierarquia de contração gravada em', Config.hierarchy_path)
@@ -0,0 +1,245 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+from heapq import heappush, heappop
+from lib.compact_graph import CompactGraph
+
+INFINITY = float('inf')
+
+
+class _VertexTable(dict):
+    """ Dicionário que retorna um valor padrão para vértices ausentes,
+    sem inseri-los, fazendo o papel de um vetor indexado por nome.
+    """
+    __slots__ = ('default',)
+
+    def __missing__(self, vertex):
+        return self.default
+
+
+def vertex_table(graph, default):
+    """ Cria uma tabela indexada pelos vértices do grafo.
+
+    Em um CompactGraph a tabela é uma lista indexada pelos identificadores
+    inteiros; em um Graph é um dicionário que retorna default para os
+    vértices ainda não preenchidos.
+
+    Parâmetros:
+    - graph : grafo cujos vértices indexam a tabela.
+    - default : valor inicial de cada vértice.
+    """
+    if isinstance(graph, CompactGraph):
+        return [default] * len(graph)
+    table = _VertexTable()
+    table.default = default
+    return table
+
+
+def vertex_marks(graph):
+    """ Cria as marcas de visitação dos vértices do grafo, lidas e escritas
+    como marks[vertex] (0 ou 1).
+
+    Em um CompactGraph as marcas são um bytearray com um byte por vértice
+    (o mesmo formato de BitSet.marks); em um Graph são uma tabela de
+    vertex_table com valor padrão 0.
+
+    Parâmetros:
+    - graph : grafo cujos vértices são marcados.
+    """
+    if isinstance(graph, CompactGraph):
+        return bytearray(len(graph))
+    return vertex_table(graph, 0)
+
+
+def dijkstra(graph, origin, goal=None, probe=None, limit=INFINITY):
+    """ Algoritmo de Dijkstra com heap binário e remoção preguiçosa.
+
+    Cada vértice é fixado (settled) uma única vez; entradas do heap com
+    distância maior do que a já conhecida são simplesmente descartadas.
+    A busca termina assim que goal é fixado, ou percorre todo o componente
+    quando goal é None.
+
+    Retorna uma tupla (distances, predecessors, settled), onde settled é a
+    lista de vértices na ordem em que foram fixados.
+
+    Parâmetros:
+    - graph : grafo com a interface arcs(vertex).
+    - origin : identificador interno do vértice inicial.
+    - goal : identificador interno do vértice objetivo (opcional).
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional.
+    - limit : distância a partir da qual a busca para; os vértices mais
+      distantes não são fixados.
+    """
+    distances = vertex_table(graph, INFINITY)
+    predecessors = vertex_table(graph, None)
+    done = vertex_table(graph, False)
+    settled = []
+    distances[origin] = 0.0
+    heap = [(0.0, origin)]
+    push = heappush
+    if probe is not None:
+        def push(heap, entry):
+            heappush(heap, entry)
+            probe.push(entry[1], len(heap))
+    while heap:
+        distance, vertex = heappop(heap)
+        if done[vertex]:
+            continue    # Entrada obsoleta (remoção preguiçosa).
+        if distance > limit:
+            break
+        done[vertex] = True
+        settled.append(vertex)
+        if vertex == goal:
+            if probe is not None:
+                probe.goal(vertex)
+            break
+        if probe is not None:
+            probe.expand(vertex)
+        for neighbour, weight in graph.arcs(vertex):
+            new_distance = distance + weight
+            if new_distance < distances[neighbour]:
+                distances[neighbour] = new_distance
+                predecessors[neighbour] = vertex
+                push(heap, (new_distance, neighbour))
+    return (distances, predecessors, settled)
+
+
+def astar(graph, origin, goal, heuristic, probe=None):
+    """ Algoritmo A*: Dijkstra guiado por uma estimativa da distância
+    restante até o objetivo.
+
+    A heurística deve ser consistente (como CoordinateHeuristic), o que
+    garante que cada vértice é fixado uma única vez com a distância correta.
+
+    Retorna uma tupla (distances, predecessors, settled), como dijkstra().
+
+    Parâmetros:
+    - graph : grafo com a interface arcs(vertex).
+    - origin : identificador interno do vértice inicial.
+    - goal : identificador interno do vértice objetivo.
+    - heuristic : função h(vertex) que estima a distância até goal.
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional.
+    """
+    distances = vertex_table(graph, INFINITY)
+    predecessors = vertex_table(graph, None)
+    done = vertex_table(graph, False)
+    settled = []
+    distances[origin] = 0.0
+    heap = [(heuristic(origin), origin)]
+    push = heappush
+    if probe is not None:
+        def push(heap, entry):
+            heappush(heap, entry)
+            probe.push(entry[1], len(heap))
+    while heap:
+        _, vertex = heappop(heap)
+        if done[vertex]:
+            continue
+        done[vertex] = True
+        settled.append(vertex)
+        if vertex == goal:
+            if probe is not None:
+                probe.goal(vertex)
+            break
+        if probe is not None:
+            probe.expand(vertex)
+        distance = distances[vertex]
+        for neighbour, weight in graph.arcs(vertex):
+            new_distance = distance + weight
+            if new_distance < distances[neighbour]:
+                distances[neighbour] = new_distance
+                predecessors[neighbour] = vertex
+                push(heap, (new_distance + heuristic(neighbour), neighbour))
+    return (distances, predecessors, settled)
+
+
+def bidirectional_dijkstra(graph, reverse, origin, goal, probe=None):
+    """ Dijkstra bidirecional: uma busca parte de origin no grafo e outra
+    parte de goal no grafo invertido, expandindo sempre o lado com a menor
+    distância no topo do heap.
+
+    A busca termina quando a soma dos topos dos dois heaps alcança o custo
+    do melhor caminho já encontrado, pois nenhum caminho ainda não
+    descoberto pode ser mais curto.
+
+    Retorna uma tupla (custo, caminho, fixados), com caminho None (e custo
+    infinito) caso goal seja inalcançável.
+
+    Parâmetros:
+    - graph : grafo com a interface arcs(vertex).
+    - reverse : grafo com as arestas invertidas (o próprio graph caso todas
+      as arestas sejam de mão dupla).
+    - origin : identificador interno do vértice inicial.
+    - goal : identificador interno do vértice objetivo.
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional.
+    """
+    if origin == goal:
+        if probe is not None:
+            probe.goal(goal)
+        return (0.0, [origin], [origin])
+    graphs = (graph, reverse)
+    distances = (vertex_table(graph, INFINITY), vertex_table(graph, INFINITY))
+    predecessors = (vertex_table(graph, None), vertex_table(graph, None))
+    done = (vertex_table(graph, False), vertex_table(graph, False))
+    heaps = ([(0.0, origin)], [(0.0, goal)])
+    distances[0][origin] = distances[1][goal] = 0.0
+    best, meeting = INFINITY, None
+    settled = []
+    push = heappush
+    if probe is not None:
+        def push(heap, entry):
+            heappush(heap, entry)
+            probe.push(entry[1], len(heaps[0]) + len(heaps[1]))
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        distance, vertex = heappop(heaps[side])
+        own_done = done[side]
+        if own_done[vertex]:
+            continue
+        own_done[vertex] = True
+        settled.append(vertex)
+        if probe is not None:
+            probe.expand(vertex)
+        own, other = distances[side], distances[1 - side]
+        for neighbour, weight in graphs[side].arcs(vertex):
+            new_distance = distance + weight
+            if new_distance < own[neighbour]:
+                own[neighbour] = new_distance
+                predecessors[side][neighbour] = vertex
+                push(heaps[side], (new_distance, neighbour))
+                # Verificamos se as duas buscas se encontraram neste vértice:
+                if new_distance + other[neighbour] < best:
+                    best, meeting = new_distance + other[neighbour], neighbour
+    if meeting is None:
+        return (INFINITY, None, settled)
+    if probe is not None:
+        probe.goal(goal)
+    path = build_path(predecessors[0], origin, meeting)
+    vertex = meeting
+    while vertex != goal:
+        vertex = predecessors[1][vertex]
+        path.append(vertex)
+    return (best, path, settled)
+
+
+def build_path(predecessors, origin, goal):
+    """ Reconstrói o caminho de origin até goal seguindo os predecessores.
+
+    Retorna uma lista de vértices ou None caso goal não seja alcançável.
+
+    Parâmetros:
+    - predecessors : tabela de predecessores gerada pela busca.
+    - origin : vértice inicial.
+    - goal : vértice objetivo.
+    """
+    path = [goal]
+    vertex = goal
+    while vertex != origin:
+        vertex = predecessors[vertex]
+        if vertex is None:
+            return None
+        path.append(vertex)
+    path.reverse()
+    return path
@@ -0,0 +1,171 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import csv
+import math
+import os
+import random
+
+# Os geradores abaixo retornam uma tupla (arestas, posições):
+# - arestas : lista de triplas (origem, destino, distância), com os dois
+#   sentidos de cada ligação, como em distancias.csv;
+# - posições : dicionário nome -> (x, y) inteiros, como em municipios.csv.
+# A distância de cada aresta é o comprimento do segmento entre as posições
+# das pontas, arredondado em uma casa decimal. Com a mesma semente, o mesmo
+# grafo é gerado.
+
+
+def grid_graph(rows, columns, spacing=20, jitter=0.3, seed=0):
+    """ Gera uma malha viária: vértices em grade, cada um ligado aos vizinhos
+    da esquerda, da direita, de cima e de baixo.
+
+    Parâmetros:
+    - rows : número de linhas da grade.
+    - columns : número de colunas da grade.
+    - spacing : distância entre vértices vizinhos, em pixels.
+    - jitter : deslocamento aleatório das posições (fração de spacing).
+    - seed : semente do gerador de números aleatórios.
+    """
+    rng = random.Random(seed)
+    positions = dict()
+    for row in range(rows):
+        for column in range(columns):
+            positions[_name(row * columns + column)] = (
+                round((column + 1 + rng.uniform(-jitter, jitter)) * spacing),
+                round((row + 1 + rng.uniform(-jitter, jitter)) * spacing))
+    links = []
+    for row in range(rows):
+        for column in range(columns):
+            vertex = row * columns + column
+            if column + 1 < columns:
+                links.append((vertex, vertex + 1))
+            if row + 1 < rows:
+                links.append((vertex, vertex + columns))
+    return _edges(links, positions), positions
+
+
+def geometric_graph(count, degree=6, size=(800, 600), seed=0):
+    """ Gera um grafo geométrico aleatório: pontos sorteados em uma área,
+    ligados a todos os pontos a menos de um raio de distância.
+
+    O raio é escolhido para que cada vértice tenha, em média, o grau
+    informado. Os pares próximos são encontrados com uma grade de células
+    do tamanho do raio, sem comparar todos os pares.
+
+    Parâmetros:
+    - count : número de vértices.
+    - degree : grau médio desejado.
+    - size : dimensões (largura, altura) da área.
+    - seed : semente do gerador de números aleatórios.
+    """
+    rng = random.Random(seed)
+    width, height = size
+    radius = math.sqrt(degree * width * height / (math.pi * max(count, 1)))
+    points = [(rng.uniform(0, width), rng.uniform(0, height))
+              for _ in range(count)]
+    cells = dict()
+    for vertex, (x, y) in enumerate(points):
+        cells.setdefault((int(x // radius), int(y // radius)),
+                         list()).append(vertex)
+    links = []
+    for vertex, (x, y) in enumerate(points):
+        column, row = int(x // radius), int(y // radius)
+        for cell in ((column + dx, row + dy) for dx in (-1, 0, 1)
+                     for dy in (-1, 0, 1)):
+            for other in cells.get(cell, ()):
+                if other > vertex and math.hypot(
+                        points[other][0] - x, points[other][1] - y) < radius:
+                    links.append((vertex, other))
+    positions = {_name(vertex): (round(x), round(y))
+                 for vertex, (x, y) in enumerate(points)}
+    return _edges(links, positions), positions
+
+
+def scale_free_graph(count, links_per_vertex=2, size=(800, 600), seed=0):
+    """ Gera um grafo livre de escala pelo modelo de Barabási-Albert: cada
+    novo vértice se liga a vértices já existentes escolhidos com
+    probabilidade proporcional ao grau, formando poucos vértices com muitas
+    ligações. As posições são sorteadas na área informada.
+
+    Parâmetros:
+    - count : número de vértices.
+    - links_per_vertex : ligações criadas por vértice novo.
+    - size : dimensões (largura, altura) da área.
+    - seed : semente do gerador de números aleatórios.
+    """
+    rng = random.Random(seed)
+    positions = {_name(vertex): (rng.randrange(size[0]),
+                                 rng.randrange(size[1]))
+                 for vertex in range(count)}
+    links = []
+    # Cada vértice aparece nesta lista uma vez por ligação, de modo que um
+    # sorteio uniforme nela escolhe vértices proporcionalmente ao grau:
+    ends = list(range(min(links_per_vertex, count)))
+    for vertex in range(len(ends), count):
+        targets = set()
+        while len(targets) < min(links_per_vertex, vertex):
+            targets.add(rng.choice(ends))
+        for target in sorted(targets):
+            links.append((target, vertex))
+            ends.extend((target, vertex))
+    return _edges(links, positions), positions
+
+
+def write_csv(edges, positions, distances_path, positions_path):
+    """ Grava um grafo gerado nos formatos de distancias.csv e
+    municipios.csv.
+
+    Parâmetros:
+    - edges : triplas (origem, destino, distância).
+    - positions : dicionário nome -> (x, y).
+    - distances_path : caminho do arquivo de distâncias.
+    - positions_path : caminho do arquivo de posições.
+    """
+    for path in (distances_path, positions_path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+    with open(distances_path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(('From', 'To', 'Distance'))
+        writer.writerows(edges)
+    with open(positions_path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(('Name', 'X', 'Y'))
+        writer.writerows((name, x, y) for name, (x, y) in positions.items())
+
+
+# Geradores disponíveis, indexados pelo nome usado na linha de comando.
+GENERATORS = {'grid': grid_graph,
+              'geometric': geometric_graph,
+              'scale_free': scale_free_graph}
+
+
+def generate(kind, vertices, seed=0):
+    """ Gera um grafo do tipo informado com aproximadamente o número de
+    vértices pedido (a malha usa a grade quadrada mais próxima).
+
+    Parâmetros:
+    - kind : nome do gerador (chave de GENERATORS).
+    - vertices : número de vértices desejado.
+    - seed : semente do gerador de números aleatórios.
+    """
+    if kind == 'grid':
+        side = max(1, round(math.sqrt(vertices)))
+        return grid_graph(side, side, seed=seed)
+    return GENERATORS[kind](vertices, seed=seed)
+
+
+def _name(vertex):
+    return 'v%d' % vertex
+
+
+def _edges(links, positions):
+    """ Converte pares de vértices em arestas nos dois sentidos. """
+    edges = []
+    for origin, destiny in links:
+        origin, destiny = _name(origin), _name(destiny)
+        (x1, y1), (x2, y2) = positions[origin], positions[destiny]
+        distance = round(max(math.hypot(x2 - x1, y2 - y1), 0.1), 1)
+        edges.append((origin, destiny, distance))
+        edges.append((destiny, origin, distance))
+    return edges
@@ -0,0 +1,179 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+from math import hypot
+from lib.dijkstra import vertex_table
+
+# Fração das arestas que a calibração pode tratar como atípicas, e o limite
+# absoluto dessa quantidade (cada aresta atípica vira um atalho avaliado em
+# todas as estimativas):
+OUTLIER_FRACTION = 0.05
+MAX_OUTLIERS = 32
+
+# Pequena folga para que erros de arredondamento não façam a estimativa
+# superar a distância de alguma aresta:
+_ROUNDING_SLACK = 1e-9
+
+
+class CoordinateHeuristic:
+    """ Heurística admissível baseada nas coordenadas dos vértices no mapa.
+
+    As posições estão em pixels, então a escala pixel -> km é calibrada
+    com as próprias arestas do grafo. A menor razão distância / comprimento
+    em pixels entre todas as arestas seria sempre segura, mas uma única
+    aresta curta com posições imprecisas (Roseira-Potim tem 1,4 km e 43
+    pixels) reduz a escala a ponto de o A* expandir tantos vértices quanto o
+    custo uniforme. Por isso a escala é a razão no percentil
+    outlier_fraction, e as arestas com razão menor (as atípicas) são
+    tratadas como atalhos: a estimativa é a escala vezes a menor distância
+    até o objetivo em um mapa em que se anda em linha reta ou se usa um
+    atalho, com comprimento distância / escala. Essa métrica nunca supera
+    nenhuma aresta, de modo que a heurística continua admissível e
+    consistente.
+
+    Quando um índice de landmarks é informado, a estimativa é o maior dos
+    dois limites, o que também preserva a consistência.
+
+    Se algum vértice do grafo não tem posição, as coordenadas não são usadas
+    (a estimativa é a dos landmarks, ou zero): estimar zero só para esse
+    vértice manteria a heurística admissível, mas não consistente, e o A*
+    (lib.dijkstra.astar) não reabre vértices já fixados.
+
+    Parâmetros:
+    - graph : grafo com a interface de vizinhança (Graph ou CompactGraph).
+    - positions : dicionário nome -> (x, y).
+    - landmarks : LandmarkIndex já associado ao grafo (attach), opcional.
+    - outlier_fraction : fração máxima das arestas tratadas como atípicas.
+    - max_outliers : quantidade máxima de arestas atípicas.
+    """
+
+    def __init__(self, graph, positions, landmarks=None,
+                 outlier_fraction=OUTLIER_FRACTION,
+                 max_outliers=MAX_OUTLIERS):
+        self._coords = vertex_table(graph, None)
+        for name, pos in positions.items():
+            if name in graph:
+                self._coords[graph.vertex_id(name)] = pos
+        self._complete = all(name in positions for name in graph)
+        self._landmarks = landmarks
+        self._scale, self._shortcuts = self._calibrate(
+            graph, outlier_fraction, max_outliers)
+
+    @property
+    def scale(self):
+        return self._scale
+
+    @property
+    def shortcuts(self):
+        """ Arestas atípicas (origem, destino, distância), tratadas como
+        atalhos pela estimativa.
+        """
+        return self._shortcuts
+
+    def _calibrate(self, graph, outlier_fraction, max_outliers):
+        """ Retorna a escala e a lista de arestas atípicas, isto é, as que
+        a escala superestimaria.
+        """
+        coords = self._coords
+        ratios = []
+        for name in graph:
+            vertex = graph.vertex_id(name)
+            if coords[vertex] is None:
+                continue
+            x, y = coords[vertex]
+            for neighbour, distance in graph.arcs(vertex):
+                if coords[neighbour] is None:
+                    continue
+                # Vértices na mesma posição têm a mesma estimativa, e a
+                # aresta entre eles nunca é superestimada:
+                length = hypot(coords[neighbour][0] - x,
+                               coords[neighbour][1] - y)
+                if length > 0:
+                    ratios.append((distance / length, vertex, neighbour,
+                                   distance))
+        if not ratios:
+            return (0.0, [])
+        ratios.sort(key=lambda ratio: ratio[0])
+        outliers = min(int(len(ratios) * outlier_fraction), max_outliers)
+        scale = ratios[outliers][0] * (1 - _ROUNDING_SLACK)
+        shortcuts = [(vertex, neighbour, distance)
+                     for ratio, vertex, neighbour, distance
+                     in ratios[:outliers] if ratio < scale]
+        return (scale, shortcuts)
+
+    def _portals(self, goal):
+        """ Retorna as entradas de atalhos que encurtam o caminho até goal,
+        como tuplas (x, y, restante), onde restante é a menor distância (em
+        pixels da métrica com atalhos) da entrada até goal.
+
+        As distâncias são calculadas por um Dijkstra a partir de goal no
+        grafo completo formado pelas extremidades dos atalhos.
+
+        Parâmetros:
+        - goal : identificador interno do vértice objetivo.
+        """
+        coords, scale = self._coords, self._scale
+        goal_x, goal_y = coords[goal]
+        entries = dict()    # Saída do atalho -> [(entrada, comprimento)].
+        for vertex, neighbour, distance in self._shortcuts:
+            entries.setdefault(neighbour, []).append(
+                (vertex, distance / scale * (1 - _ROUNDING_SLACK)))
+        remaining = dict()
+        for vertex, neighbour, _ in self._shortcuts:
+            for end in (vertex, neighbour):
+                remaining[end] = hypot(coords[end][0] - goal_x,
+                                       coords[end][1] - goal_y)
+        straight = dict(remaining)
+        pending = set(remaining)
+        while pending:
+            end = min(pending, key=remaining.__getitem__)
+            pending.discard(end)
+            x, y = coords[end]
+            for other in pending:
+                via = remaining[end] + hypot(coords[other][0] - x,
+                                             coords[other][1] - y)
+                if via < remaining[other]:
+                    remaining[other] = via
+            for entry, length in entries.get(end, ()):
+                if entry in pending and remaining[end] + length < \
+                        remaining[entry]:
+                    remaining[entry] = remaining[end] + length
+        # Só as entradas mais próximas de goal pelo atalho do que em linha
+        # reta podem diminuir alguma estimativa:
+        return [coords[entry] + (remaining[entry],)
+                for entry in dict.fromkeys(vertex for vertex, _, _
+                                           in self._shortcuts)
+                if remaining[entry] < straight[entry]]
+
+    def bound(self, goal):
+        """ Retorna a função h(vertex) que estima a distância até goal.
+
+        Quando falta a posição de algum vértice, retorna apenas o limite dos
+        landmarks (ou zero), que continua consistente.
+
+        Parâmetros:
+        - goal : identificador interno do vértice objetivo.
+        """
+        coords, scale = self._coords, self._scale
+        landmarks = None
+        if self._landmarks is not None:
+            landmarks = self._landmarks.bound(goal)
+        if not self._complete:
+            return landmarks if landmarks is not None else lambda vertex: 0.0
+        goal_x, goal_y = coords[goal]
+        portals = self._portals(goal) if self._shortcuts else []
+
+        def estimate(vertex):
+            pos = coords[vertex]
+            best = hypot(pos[0] - goal_x, pos[1] - goal_y)
+            for x, y, remaining in portals:
+                via = hypot(pos[0] - x, pos[1] - y) + remaining
+                if via < best:
+                    best = via
+            best *= scale
+            if landmarks is not None:
+                other = landmarks(vertex)
+                if other > best:
+                    return other
+            return best
+        return estimate
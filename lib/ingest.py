@@ -0,0 +1,248 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import csv
+import gzip
+import heapq
+import os
+import struct
+import tempfile
+from array import array
+from itertools import islice
+from operator import itemgetter
+from lib.compact_graph import (CompactGraph, _HEADER, _MAGIC,
+                               _FORMAT_VERSION, _source_key, _source_digest)
+
+CHUNK_ROWS = 1000000    # Arestas ordenadas em memória por vez.
+MERGE_FAN_IN = 128      # Máximo de blocos ordenados intercalados por vez.
+
+_RECORD = struct.Struct('<iif')     # Aresta: origem, destino e peso.
+_BLOCK_RECORDS = 65536              # Arestas lidas/gravadas por operação.
+
+
+def ingest_csv(path, snapshot_path, chunk_rows=CHUNK_ROWS, temp_dir=None):
+    """ Converte uma lista de arestas em um snapshot de CompactGraph sem
+    carregá-la inteira na memória.
+
+    O arquivo (.csv ou .csv.gz, no formato de CompactGraph.create_from_csv)
+    é lido em blocos de chunk_rows arestas. Os identificadores dos vértices
+    são atribuídos à medida que os nomes aparecem, e cada bloco é ordenado
+    pela origem e gravado em um arquivo temporário. Os blocos são então
+    intercalados (ordenação externa) diretamente nas posições finais do
+    snapshot, que pode ser mapeado em memória com CompactGraph.load.
+
+    Apenas os nomes, o grau e a posição de cada vértice e um bloco de
+    arestas ficam em memória. A ordenação é estável: os vizinhos de cada
+    vértice mantêm a ordem do arquivo. Os identificadores seguem a mesma
+    ordem de create_from_csv (as origens na ordem em que aparecem, depois
+    os demais vértices), de modo que o snapshot é idêntico, byte a byte, ao
+    gravado por CompactGraph.load_csv para o mesmo arquivo.
+
+    Retorna o grafo mapeado a partir do snapshot gravado.
+
+    Parâmetros:
+    - path : caminho do arquivo de arestas (.csv ou .csv.gz).
+    - snapshot_path : caminho do snapshot a ser gravado.
+    - chunk_rows : número de arestas ordenadas em memória por vez.
+    - temp_dir : diretório dos blocos temporários (padrão: o do snapshot).
+    """
+    source_key = _source_key(path) + (_source_digest(path),)
+    directory = temp_dir or os.path.dirname(os.path.abspath(snapshot_path))
+    with tempfile.TemporaryDirectory(dir=directory) as work_dir:
+        names, ids, degree, ranks = [], {}, array('q'), array('i')
+        runs = []
+        for sources, targets, weights in _read_chunks(path, chunk_rows, ids,
+                                                      names, degree, ranks):
+            runs.append(_write_run(work_dir, len(runs), sources, targets,
+                                   weights))
+        runs = _reduce_runs(work_dir, runs)
+        names, degree, final = _final_order(names, degree, ranks)
+        _write_snapshot(snapshot_path, names, degree, final, runs,
+                        source_key)
+    return CompactGraph.load(snapshot_path)
+
+
+def _open_text(path):
+    """ Abre um arquivo de texto, descompactando-o se terminar em .gz. """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', newline='', encoding='utf-8-sig')
+    return open(path, newline='', encoding='utf-8-sig')
+
+
+def _read_chunks(path, chunk_rows, ids, names, degree, ranks):
+    """ Lê as arestas em blocos de vetores (origens, destinos, pesos),
+    atribuindo identificadores provisórios aos nomes novos, na ordem em que
+    aparecem, e contando o grau de saída de cada vértice.
+
+    Cada vértice recebe também, na primeira vez em que aparece como origem,
+    a sua posição entre as origens (ranks, -1 para os demais), que já é o
+    identificador final. As origens dos blocos são gravadas com essa
+    posição, e os destinos com o identificador provisório.
+    """
+    def intern(name):
+        vertex = ids.get(name)
+        if vertex is None:
+            vertex = ids[name] = len(names)
+            names.append(name)
+            degree.append(0)
+            ranks.append(-1)
+        return vertex
+
+    source_count = 0
+
+    with _open_text(path) as csv_file:
+        reader = csv.reader(csv_file)
+        next(reader, None)  # Ignoramos o cabeçalho.
+        rows = (row for row in reader if row)
+        while True:
+            chunk = list(islice(rows, chunk_rows))
+            if not chunk:
+                return
+            sources, targets = array('i'), array('i')
+            weights = array('f')
+            for row in chunk:
+                source = intern(row[0])
+                degree[source] += 1
+                if ranks[source] < 0:
+                    ranks[source] = source_count
+                    source_count += 1
+                sources.append(ranks[source])
+                targets.append(intern(row[1]))
+                weights.append(float(row[2]))
+            yield sources, targets, weights
+
+
+def _write_run(work_dir, number, sources, targets, weights):
+    """ Ordena um bloco de arestas pela origem (de forma estável) e o grava
+    em um arquivo temporário, retornando o caminho do arquivo.
+    """
+    order = sorted(range(len(sources)), key=sources.__getitem__)
+    run_path = os.path.join(work_dir, 'run%06d' % number)
+    pack = _RECORD.pack
+    with open(run_path, 'wb') as run:
+        for start in range(0, len(order), _BLOCK_RECORDS):
+            run.write(b''.join(
+                pack(sources[index], targets[index], weights[index])
+                for index in order[start:start + _BLOCK_RECORDS]))
+    return run_path
+
+
+def _read_run(run_path):
+    """ Percorre as arestas (origem, destino, peso) de um bloco ordenado. """
+    with open(run_path, 'rb') as run:
+        while True:
+            data = run.read(_RECORD.size * _BLOCK_RECORDS)
+            if not data:
+                return
+            yield from _RECORD.iter_unpack(data)
+
+
+def _merge(runs):
+    """ Intercala blocos ordenados pela origem. Em caso de empate vem antes
+    o bloco lido primeiro, o que mantém a ordem do arquivo original.
+    """
+    return heapq.merge(*map(_read_run, runs), key=itemgetter(0))
+
+
+def _reduce_runs(work_dir, runs):
+    """ Intercala grupos de blocos consecutivos até restarem no máximo
+    MERGE_FAN_IN blocos, limitando o número de arquivos abertos.
+    """
+    level = 0
+    while len(runs) > MERGE_FAN_IN:
+        level += 1
+        merged = []
+        for start in range(0, len(runs), MERGE_FAN_IN):
+            group = runs[start:start + MERGE_FAN_IN]
+            run_path = os.path.join(work_dir, 'merge%02d_%06d' % (level,
+                                                                  start))
+            with open(run_path, 'wb') as run:
+                for block in _batched(_merge(group)):
+                    run.write(b''.join(_RECORD.pack(*edge) for edge in block))
+            for old_run in group:
+                os.remove(old_run)
+            merged.append(run_path)
+        runs = merged
+    return runs
+
+
+def _batched(edges):
+    """ Agrupa as arestas em listas de até _BLOCK_RECORDS elementos. """
+    while True:
+        block = list(islice(edges, _BLOCK_RECORDS))
+        if not block:
+            return
+        yield block
+
+
+def _final_order(names, degree, ranks):
+    """ Converte os vértices da ordem de aparição para a ordem final: as
+    origens na posição dada por ranks, seguidas dos vértices que só
+    aparecem como destino, na ordem em que aparecem.
+
+    Retorna os nomes e os graus na ordem final e o vetor identificador
+    provisório -> identificador final.
+    """
+    final = array('i', ranks)
+    position = sum(1 for rank in ranks if rank >= 0)
+    for vertex, rank in enumerate(ranks):
+        if rank < 0:
+            final[vertex] = position
+            position += 1
+    ordered_names = [None] * len(names)
+    ordered_degree = array('q', bytes(8 * len(degree)))
+    for vertex, target in enumerate(final):
+        ordered_names[target] = names[vertex]
+        ordered_degree[target] = degree[vertex]
+    return (ordered_names, ordered_degree, final)
+
+
+def _write_snapshot(snapshot_path, names, degree, final, runs, source_key):
+    """ Grava o snapshot no formato de CompactGraph.save: os offsets vêm dos
+    graus contados na leitura, e a intercalação final dos blocos preenche os
+    vetores de destinos (convertidos pelo vetor final) e de pesos, já na
+    ordem das origens.
+    """
+    encoded = '\n'.join(names).encode('utf-8')
+    edge_count = sum(degree)
+    offsets = array('q', [0])
+    for count in degree:
+        offsets.append(offsets[-1] + count)
+    # Posições das seções, alinhadas em 8 bytes como em CompactGraph.save:
+    offsets_at = _aligned(_HEADER.size + len(encoded))
+    targets_at = _aligned(offsets_at + 8 * len(offsets))
+    weights_at = _aligned(targets_at + 4 * edge_count)
+
+    temporary = '%s.%d.tmp' % (snapshot_path, os.getpid())
+    with open(temporary, 'wb') as output:
+        output.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, len(names),
+                                  len(encoded), edge_count, *source_key))
+        output.write(encoded)
+        output.write(bytes(offsets_at - output.tell()))
+        offsets.tofile(output)
+        output.truncate(weights_at + 4 * edge_count)
+    with open(temporary, 'r+b') as targets_file, \
+            open(temporary, 'r+b') as weights_file:
+        targets_file.seek(targets_at)
+        weights_file.seek(weights_at)
+        for block in _batched(_merge(runs)):
+            array('i', [final[edge[1]] for edge in block]).tofile(
+                targets_file)
+            array('f', map(itemgetter(2), block)).tofile(weights_file)
+    os.replace(temporary, snapshot_path)
+
+
+def _aligned(position):
+    """ Arredonda uma posição do arquivo para o próximo múltiplo de 8. """
+    return position + (-position % 8)
+
+
+if __name__ == '__main__':
+    # Ingestão offline: python -m lib.ingest [arestas.csv[.gz] [snapshot]]
+    import sys
+    Config = __import__('config')
+    source = sys.argv[1] if len(sys.argv) > 1 else Config.distances_path
+    snapshot = sys.argv[2] if len(sys.argv) > 2 else Config.snapshot_path
+    graph = ingest_csv(source, snapshot)
+    print('Snapshot gravado em', snapshot, '-', len(graph), 'vértices,',
+          graph.edge_count, 'arestas')
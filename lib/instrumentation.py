@@ -0,0 +1,292 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import os
+import time
+from collections import namedtuple
+
+# Medidas de uma consulta: vértices expandidos e gerados (inseridos na
+# fronteira), maior tamanho da fronteira, caminhos alocados, duração em
+# segundos e se o destino foi alcançado.
+QueryStats = namedtuple('QueryStats', ['method', 'expanded', 'generated',
+                                       'max_frontier', 'path_allocations',
+                                       'wall_time', 'found'])
+
+# Limites (em segundos) dos intervalos do histograma de duração e (em
+# vértices) do histograma de vértices expandidos:
+DURATION_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0,
+                    5.0)
+EXPANDED_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000)
+
+_PREFIX = 'busca_grafos_'
+
+
+class Probe:
+    """ Coleta as medidas de uma única consulta.
+
+    As buscas recebem a sonda no parâmetro probe e, quando ele não é None,
+    chamam expand() ao expandir um vértice, push() ao inserir um vértice na
+    fronteira, goal() ao alcançar o destino e allocate_path() uma vez para o
+    caminho retornado (em lib.search.search_result). Sem sonda, o único custo
+    nas buscas é a verificação probe is not None.
+
+    As funções on_expand, on_push e on_goal, quando informadas, são chamadas
+    com o vértice, no identificador interno do grafo (o próprio nome em um
+    Graph; use graph.vertex_name em um CompactGraph).
+
+    Parâmetros:
+    - on_expand : função chamada a cada vértice expandido.
+    - on_push : função chamada a cada vértice inserido na fronteira.
+    - on_goal : função chamada quando o destino é alcançado.
+    """
+
+    __slots__ = ('expanded', 'generated', 'max_frontier', 'path_allocations',
+                 'on_expand', 'on_push', 'on_goal')
+
+    def __init__(self, on_expand=None, on_push=None, on_goal=None):
+        self.expanded = 0
+        self.generated = 0
+        self.max_frontier = 0
+        self.path_allocations = 0
+        self.on_expand = on_expand
+        self.on_push = on_push
+        self.on_goal = on_goal
+
+    def expand(self, vertex):
+        self.expanded += 1
+        if self.on_expand is not None:
+            self.on_expand(vertex)
+
+    def push(self, vertex, frontier_size):
+        self.generated += 1
+        if frontier_size > self.max_frontier:
+            self.max_frontier = frontier_size
+        if self.on_push is not None:
+            self.on_push(vertex)
+
+    def goal(self, vertex):
+        if self.on_goal is not None:
+            self.on_goal(vertex)
+
+    def allocate_path(self):
+        self.path_allocations += 1
+
+    def stats(self, method, wall_time, found):
+        """ Retorna as medidas coletadas como um QueryStats. """
+        return QueryStats(method, self.expanded, self.generated,
+                          self.max_frontier, self.path_allocations,
+                          wall_time, found)
+
+
+class DeadlineExceeded(Exception):
+    """ Lançada por DeadlineProbe quando o prazo da consulta termina. """
+
+
+class DeadlineProbe(Probe):
+    """ Sonda que interrompe a busca quando o prazo termina.
+
+    O relógio é consultado a cada check_interval vértices expandidos, e a
+    busca é interrompida com DeadlineExceeded, lançada de dentro de
+    expand(). Como todas as buscas chamam expand(), inclusive as passadas da
+    profundidade iterativa, qualquer método pode ser cancelado assim.
+
+    Parâmetros:
+    - deadline : instante limite, em segundos de time.time() (o mesmo
+      relógio em todos os processos).
+    - check_interval : vértices expandidos entre consultas ao relógio.
+    - on_expand, on_push, on_goal : como em Probe.
+    """
+
+    __slots__ = ('deadline', 'check_interval', '_countdown')
+
+    def __init__(self, deadline, check_interval=256, on_expand=None,
+                 on_push=None, on_goal=None):
+        Probe.__init__(self, on_expand, on_push, on_goal)
+        self.deadline = deadline
+        self.check_interval = check_interval
+        self._countdown = check_interval
+
+    def expand(self, vertex):
+        Probe.expand(self, vertex)
+        self._countdown -= 1
+        if self._countdown <= 0:
+            self._countdown = self.check_interval
+            if time.time() >= self.deadline:
+                raise DeadlineExceeded(vertex)
+
+
+def run_query(function, graph, origin, goal, method=None, probe=None,
+              metrics=None):
+    """ Executa uma busca com uma sonda, medindo a sua duração.
+
+    Retorna uma tupla (resultado da busca, QueryStats). As medidas também
+    são acumuladas em metrics, quando informado.
+
+    Parâmetros:
+    - function : função de busca (graph, origin, goal, probe=...).
+    - graph : grafo da consulta.
+    - origin : vértice inicial.
+    - goal : vértice objetivo.
+    - method : nome do método, usado nas métricas.
+    - probe : sonda da consulta (por padrão, uma nova Probe sem funções).
+    - metrics : SearchMetrics que acumula as medidas.
+    """
+    probe = Probe() if probe is None else probe
+    start = time.perf_counter()
+    result = function(graph, origin, goal, probe=probe)
+    stats = probe.stats(method, time.perf_counter() - start,
+                        result[1] is not None)
+    if metrics is not None:
+        metrics.observe(stats)
+    return result, stats
+
+
+def instrument(methods, metrics, on_expand=None, on_push=None,
+               on_goal=None):
+    """ Envolve as funções de search_methods para que cada consulta seja
+    medida e acumulada em metrics. As funções retornadas mantêm a
+    assinatura (graph, origin, goal) e o mesmo resultado.
+
+    Parâmetros:
+    - methods : dicionário nome -> função de busca.
+    - metrics : SearchMetrics que acumula as medidas.
+    - on_expand, on_push, on_goal : funções repassadas a cada Probe.
+    """
+    def wrap(name, function):
+        def instrumented(graph, origin, goal):
+            probe = Probe(on_expand, on_push, on_goal)
+            return run_query(function, graph, origin, goal, name, probe,
+                             metrics)[0]
+        return instrumented
+    return {name: wrap(name, function) for name, function in methods.items()}
+
+
+class SearchMetrics:
+    """ Acumula as medidas das consultas por método e as exporta no formato
+    de texto do Prometheus.
+
+    Para cada método são mantidos contadores de consultas (separadas por
+    destino encontrado ou não), de vértices expandidos e gerados e de
+    caminhos alocados, o maior tamanho de fronteira observado e histogramas
+    da duração e dos vértices expandidos por consulta. Os histogramas
+    permitem separar consultas lentas por expandirem muitos vértices (forma
+    do grafo) de consultas lentas por vértice expandido (escolha do método).
+    """
+
+    def __init__(self, duration_buckets=DURATION_BUCKETS,
+                 expanded_buckets=EXPANDED_BUCKETS):
+        self.duration_buckets = tuple(duration_buckets)
+        self.expanded_buckets = tuple(expanded_buckets)
+        self._methods = dict()  # Método -> medidas acumuladas.
+
+    def observe(self, stats):
+        """ Acumula as medidas de uma consulta.
+
+        Parâmetros:
+        - stats : QueryStats da consulta.
+        """
+        totals = self._methods.get(stats.method)
+        if totals is None:
+            totals = self._methods[stats.method] = {
+                'found': 0, 'not_found': 0, 'expanded': 0, 'generated': 0,
+                'path_allocations': 0, 'max_frontier': 0, 'duration': 0.0,
+                'duration_buckets': [0] * len(self.duration_buckets),
+                'expanded_buckets': [0] * len(self.expanded_buckets)}
+        totals['found' if stats.found else 'not_found'] += 1
+        totals['expanded'] += stats.expanded
+        totals['generated'] += stats.generated
+        totals['path_allocations'] += stats.path_allocations
+        totals['max_frontier'] = max(totals['max_frontier'],
+                                     stats.max_frontier)
+        totals['duration'] += stats.wall_time
+        _count(totals['duration_buckets'], self.duration_buckets,
+               stats.wall_time)
+        _count(totals['expanded_buckets'], self.expanded_buckets,
+               stats.expanded)
+
+    def to_prometheus(self):
+        """ Retorna as métricas no formato de texto do Prometheus. """
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append('# HELP %s%s %s' % (_PREFIX, name, help_text))
+            lines.append('# TYPE %s%s %s' % (_PREFIX, name, kind))
+
+        def sample(name, value, **labels):
+            text = ','.join('%s="%s"' % (key, _escape(str(labels[key])))
+                            for key in labels)
+            lines.append('%s%s{%s} %s' % (_PREFIX, name, text,
+                                          _number(value)))
+
+        methods = sorted(self._methods.items(), key=lambda item: str(item[0]))
+        family('queries_total', 'counter', 'Consultas executadas.')
+        for method, totals in methods:
+            sample('queries_total', totals['found'], method=method,
+                   found='true')
+            sample('queries_total', totals['not_found'], method=method,
+                   found='false')
+        for name, key, help_text in (
+                ('expanded_vertices_total', 'expanded',
+                 'Vértices expandidos.'),
+                ('generated_vertices_total', 'generated',
+                 'Vértices inseridos na fronteira.'),
+                ('path_allocations_total', 'path_allocations',
+                 'Listas de caminho alocadas.')):
+            family(name, 'counter', help_text)
+            for method, totals in methods:
+                sample(name, totals[key], method=method)
+        family('max_frontier_size', 'gauge',
+               'Maior fronteira observada em uma consulta.')
+        for method, totals in methods:
+            sample('max_frontier_size', totals['max_frontier'],
+                   method=method)
+        for name, buckets, key, total, help_text in (
+                ('query_duration_seconds', self.duration_buckets,
+                 'duration_buckets', 'duration',
+                 'Duração das consultas, em segundos.'),
+                ('query_expanded_vertices', self.expanded_buckets,
+                 'expanded_buckets', 'expanded',
+                 'Vértices expandidos por consulta.')):
+            family(name, 'histogram', help_text)
+            for method, totals in methods:
+                count = totals['found'] + totals['not_found']
+                cumulative = 0
+                for bound, hits in zip(buckets, totals[key]):
+                    cumulative += hits
+                    sample(name + '_bucket', cumulative, method=method,
+                           le=_number(bound))
+                sample(name + '_bucket', count, method=method, le='+Inf')
+                sample(name + '_sum', totals[total], method=method)
+                sample(name + '_count', count, method=method)
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """ Grava as métricas em um arquivo (por exemplo, para o textfile
+        collector do node_exporter). O arquivo é gravado com outro nome e
+        renomeado ao final, para que nunca seja lido incompleto.
+
+        Parâmetros:
+        - path : caminho do arquivo .prom
+        """
+        temporary = '%s.%d.tmp' % (path, os.getpid())
+        with open(temporary, 'w', encoding='utf-8') as output:
+            output.write(self.to_prometheus())
+        os.replace(temporary, path)
+
+
+def _count(hits, buckets, value):
+    """ Conta um valor no primeiro intervalo do histograma que o contém. """
+    for index, bound in enumerate(buckets):
+        if value <= bound:
+            hits[index] += 1
+            return
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value) if value != int(value) else '%d.0' % value
+    return str(value)
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
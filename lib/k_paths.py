@@ -0,0 +1,368 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+from heapq import heappush, heappop
+from lib.dijkstra import dijkstra, vertex_marks, vertex_table, INFINITY
+
+# Métodos de rotas alternativas aceitos por alternative_routes:
+ALTERNATIVE_METHODS = ('penalty', 'plateau', 'yen')
+
+
+def k_shortest_paths(graph, origin, goal, k, reverse=None, probe=None):
+    """ Retorna os k menores caminhos sem repetição de vértices (algoritmo
+    de Yen), do mais curto ao mais longo, como uma lista de tuplas
+    (caminho, custo).
+
+    Uma única busca a partir de goal, no grafo invertido e até alcançar
+    origin, calcula a distância até o objetivo dos vértices mais próximos
+    dele que a origem e a árvore de menores caminhos até ele. Essa árvore é
+    reaproveitada em cada desvio (spur):
+    quando o caminho da árvore a partir do vértice de desvio não usa nenhum
+    vértice ou aresta proibidos, ele já é o menor desvio e nenhuma busca é
+    feita; caso contrário, o desvio é buscado com A*, usando as distâncias
+    até o objetivo como estimativa. Os candidatos ficam em um heap, e
+    cada caminho só gera desvios a partir do ponto em que se separou do
+    caminho que o originou (modificação de Lawler).
+
+    Parâmetros:
+    - graph : grafo das consultas (Graph ou CompactGraph).
+    - origin : nome do vértice inicial.
+    - goal : nome do vértice objetivo.
+    - k : número máximo de caminhos.
+    - reverse : grafo com as arestas invertidas (por padrão,
+      graph.reversed(), construído a cada chamada).
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional.
+    """
+    origin, goal = graph.vertex_id(origin), graph.vertex_id(goal)
+    tree = _GoalTree(graph, reverse, goal, origin, probe=probe)
+    if k <= 0 or tree.best == INFINITY:
+        return []
+    first = tree.path(origin)
+    found = [(first, _prefix_costs(graph, first))]
+    deviations = [0]    # Posição em que cada caminho deixou o seu pai.
+    candidates = []     # Heap de (custo, caminho, posição do desvio).
+    seen = {tuple(first)}
+    while len(found) < k:
+        path, costs = found[-1]
+        for index in range(deviations[-1], len(path) - 1):
+            spur, root = path[index], path[:index + 1]
+            banned_edges = {(other[index], other[index + 1])
+                            for other, _ in found
+                            if len(other) > index + 1 and
+                            other[:index + 1] == root}
+            spur_path, spur_cost = tree.spur(spur, set(root[:-1]),
+                                             banned_edges)
+            if spur_path is None:
+                continue
+            candidate = root[:-1] + spur_path
+            key = tuple(candidate)
+            if key not in seen:
+                seen.add(key)
+                heappush(candidates, (costs[index] + spur_cost, candidate,
+                                      index))
+        if not candidates:
+            break
+        _, path, index = heappop(candidates)
+        found.append((path, _prefix_costs(graph, path)))
+        deviations.append(index)
+    return [(_names(graph, path), costs[-1]) for path, costs in found]
+
+
+def alternative_routes(graph, origin, goal, count=3, method='penalty',
+                       reverse=None, max_stretch=1.4, max_overlap=0.8,
+                       penalty=1.4, probe=None):
+    """ Retorna até count rotas entre origin e goal, a primeira sendo a
+    mais curta e as demais alternativas suficientemente diferentes dela,
+    como uma lista de tuplas (caminho, custo) em ordem de custo.
+
+    Uma alternativa é aceita quando não é mais longa que max_stretch vezes a
+    rota mais curta e quando a parte que compartilha com as rotas já
+    escolhidas (em distância) não passa de max_overlap do seu comprimento.
+    Métodos:
+    - 'penalty' : repete a busca (A* com as distâncias até o objetivo
+      como estimativa) multiplicando por penalty o peso das arestas das
+      rotas já encontradas, até obter count rotas ou esgotar as tentativas
+      (o mais rápido);
+    - 'plateau' : duas buscas completas, uma a partir da origem e outra a
+      partir do destino. Os trechos em comum entre as duas árvores de
+      menores caminhos (platôs) dão origem a rotas localmente ótimas; as de
+      platôs mais longos são escolhidas primeiro;
+    - 'yen' : filtra os menores caminhos de k_shortest_paths (mais lento,
+      mas encontra as alternativas mais curtas).
+
+    Parâmetros:
+    - graph : grafo das consultas (Graph ou CompactGraph).
+    - origin : nome do vértice inicial.
+    - goal : nome do vértice objetivo.
+    - count : número máximo de rotas.
+    - method : 'penalty', 'plateau' ou 'yen'.
+    - reverse : grafo com as arestas invertidas (por padrão,
+      graph.reversed(), construído a cada chamada).
+    - max_stretch : maior razão aceita entre o custo de uma alternativa e o
+      da rota mais curta.
+    - max_overlap : maior fração do comprimento de uma alternativa que pode
+      ser compartilhada com as rotas já escolhidas.
+    - penalty : fator aplicado às arestas usadas (método 'penalty').
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional.
+    """
+    if method not in ALTERNATIVE_METHODS:
+        raise ValueError('método de alternativas desconhecido: %s' % method)
+    if method == 'yen':
+        # Os k menores caminhos costumam diferir em poucas arestas; pedimos
+        # alguns a mais para que sobrem alternativas após o filtro:
+        paths = [[graph.vertex_id(name) for name in path]
+                 for path, _ in k_shortest_paths(graph, origin, goal,
+                                                  4 * count, reverse, probe)]
+        if count <= 0 or not paths:
+            return []
+        selector = _RouteSelector(graph, paths[0], count, max_stretch,
+                                  max_overlap)
+        for path in paths[1:]:
+            selector.offer(path)
+        return selector.routes()
+    origin, goal = graph.vertex_id(origin), graph.vertex_id(goal)
+    # Os platôs dependem da árvore completa até o objetivo:
+    tree = _GoalTree(graph, reverse, goal, origin, method == 'plateau',
+                     probe)
+    if count <= 0 or tree.best == INFINITY:
+        return []
+    selector = _RouteSelector(graph, tree.path(origin), count, max_stretch,
+                              max_overlap)
+    if method == 'plateau':
+        _plateau_routes(graph, origin, tree, selector, probe)
+    else:
+        _penalty_routes(graph, origin, tree, selector, penalty, probe)
+    return selector.routes()
+
+
+class _GoalTree:
+    """ Árvore de menores caminhos até o objetivo, calculada a partir de
+    goal no grafo invertido.
+
+    Sem complete, a busca para ao fixar origin: só os vértices fixados
+    (exact) têm a distância exata em potential e o próximo vértice do menor
+    caminho em successors; os demais recebem em potential a distância da
+    origem (best), que não supera a distância real deles até goal e mantém
+    a estimativa consistente.
+    """
+
+    def __init__(self, graph, reverse, goal, origin, complete=False,
+                 probe=None):
+        self.graph = graph
+        self.goal = goal
+        self.probe = probe
+        distances, self.successors, settled = dijkstra(
+            graph.reversed() if reverse is None else reverse, goal,
+            None if complete else origin, probe)
+        self.best = distances[origin]
+        self.exact = vertex_marks(graph)
+        for vertex in settled:
+            self.exact[vertex] = 1
+        if complete or self.best == INFINITY:
+            self.potential = distances
+        else:
+            self.potential = vertex_table(graph, self.best)
+            for vertex in settled:
+                self.potential[vertex] = distances[vertex]
+
+    def path(self, vertex):
+        """ Caminho da árvore de vertex até o objetivo. """
+        path = [vertex]
+        while vertex != self.goal:
+            vertex = self.successors[vertex]
+            path.append(vertex)
+        return path
+
+    def spur(self, origin, banned_vertices, banned_edges):
+        """ Menor caminho de origin até o objetivo que não passa pelos
+        vértices nem pelas arestas proibidos. Retorna (caminho, custo) ou
+        (None, INFINITY).
+        """
+        if self.potential[origin] == INFINITY:
+            return (None, INFINITY)
+        if self.exact[origin]:
+            # Reaproveitamos o caminho da árvore quando ele é permitido:
+            path, vertex = [origin], origin
+            while vertex != self.goal:
+                following = self.successors[vertex]
+                if following in banned_vertices or \
+                        (vertex, following) in banned_edges:
+                    break
+                path.append(following)
+                vertex = following
+            else:
+                return (path, self.potential[origin])
+        return _astar(self.graph, origin, self.goal, self.potential,
+                      banned_vertices, banned_edges, None, self.probe)
+
+
+def _astar(graph, origin, goal, potential, banned_vertices=(),
+           banned_edges=(), penalties=None, probe=None):
+    """ A* com a distância exata até o objetivo (no grafo sem restrições)
+    como estimativa, evitando vértices e arestas proibidos e multiplicando
+    os pesos das arestas penalizadas. Como as restrições e as penalidades
+    só aumentam as distâncias, a estimativa continua admissível e
+    consistente.
+
+    Retorna (caminho, custo), com o custo já penalizado, ou
+    (None, INFINITY).
+    """
+    distances = vertex_table(graph, INFINITY)
+    predecessors = vertex_table(graph, None)
+    done = vertex_table(graph, False)
+    distances[origin] = 0.0
+    heap = [(potential[origin], origin)]
+    while heap:
+        _, vertex = heappop(heap)
+        if done[vertex]:
+            continue
+        done[vertex] = True
+        if vertex == goal:
+            if probe is not None:
+                probe.goal(vertex)
+            path = [vertex]
+            while vertex != origin:
+                vertex = predecessors[vertex]
+                path.append(vertex)
+            path.reverse()
+            return (path, distances[goal])
+        if probe is not None:
+            probe.expand(vertex)
+        distance = distances[vertex]
+        for neighbour, weight in graph.arcs(vertex):
+            if neighbour in banned_vertices or \
+                    (vertex, neighbour) in banned_edges:
+                continue
+            if penalties is not None:
+                weight *= penalties.get((vertex, neighbour), 1)
+            new_distance = distance + weight
+            if new_distance < distances[neighbour]:
+                distances[neighbour] = new_distance
+                predecessors[neighbour] = vertex
+                heappush(heap, (new_distance + potential[neighbour],
+                                neighbour))
+                if probe is not None:
+                    probe.push(neighbour, len(heap))
+    return (None, INFINITY)
+
+
+def _plateau_routes(graph, origin, tree, selector, probe=None):
+    """ Oferece ao selector as rotas formadas pelos platôs (arestas
+    presentes nas árvores de menores caminhos a partir da origem e até o
+    objetivo), do platô mais longo ao mais curto.
+    """
+    limit = selector.limit
+    forward, parents, settled = dijkstra(graph, origin, probe=probe,
+                                         limit=limit)
+    successors, to_goal = tree.successors, tree.potential
+    plateaus = []
+    for start in settled:
+        following = successors[start]
+        if following is None or parents[following] != start:
+            continue    # A aresta de start não está nas duas árvores.
+        previous = parents[start]
+        if previous is not None and successors[previous] == start:
+            continue    # start está no meio de um platô.
+        end = following
+        while successors[end] is not None and \
+                parents[successors[end]] == end:
+            end = successors[end]
+        if forward[start] + to_goal[start] <= limit:
+            plateaus.append((to_goal[start] - to_goal[end], start))
+    plateaus.sort(key=lambda plateau: -plateau[0])
+    for _, start in plateaus:
+        if selector.full:
+            break
+        head = [start]
+        while head[-1] != origin:
+            head.append(parents[head[-1]])
+        head.reverse()
+        # O platô faz parte da árvore até o objetivo, que o percorre:
+        selector.offer(head + tree.path(start)[1:])
+
+
+def _penalty_routes(graph, origin, tree, selector, penalty, probe=None):
+    """ Oferece ao selector as rotas obtidas penalizando, a cada busca, as
+    arestas da rota anterior (nos dois sentidos), até que ele esteja
+    completo ou até 3 * count tentativas.
+    """
+    path = tree.path(origin)
+    penalties = dict()
+    for _ in range(3 * selector.count):
+        for vertex, following in zip(path, path[1:]):
+            for edge in ((vertex, following), (following, vertex)):
+                penalties[edge] = penalties.get(edge, 1) * penalty
+        path, _ = _astar(graph, origin, tree.goal, tree.potential,
+                         penalties=penalties, probe=probe)
+        if path is None:
+            break
+        selector.offer(path)
+        if selector.full:
+            break
+
+
+class _RouteSelector:
+    """ Escolhe, na ordem em que são oferecidas, as rotas sem ciclos que
+    respeitam os limites de custo e de sobreposição com as rotas já
+    escolhidas, começando pela rota mais curta.
+    """
+
+    def __init__(self, graph, shortest, count, max_stretch, max_overlap):
+        self.graph = graph
+        self.count = count
+        self.max_overlap = max_overlap
+        cost = _prefix_costs(graph, shortest)[-1]
+        self.limit = cost * max_stretch
+        self.chosen = [(shortest, cost)]
+        self.used = _edge_weights(graph, shortest)
+
+    @property
+    def full(self):
+        return len(self.chosen) >= self.count
+
+    def offer(self, path):
+        """ Escolhe a rota caso ela seja aceitável. """
+        if self.full or len(set(path)) != len(path) or \
+                any(path == other for other, _ in self.chosen):
+            return
+        cost = _prefix_costs(self.graph, path)[-1]
+        if cost > self.limit:
+            return
+        edges = _edge_weights(self.graph, path)
+        shared = sum(weight for edge, weight in edges.items()
+                     if edge in self.used)
+        if cost > 0 and shared > self.max_overlap * cost:
+            return
+        self.chosen.append((path, cost))
+        self.used.update(edges)
+
+    def routes(self):
+        """ Rotas escolhidas, em ordem de custo, com os nomes dos vértices.
+        """
+        chosen = sorted(self.chosen, key=lambda route: route[1])
+        return [(_names(self.graph, path), cost) for path, cost in chosen]
+
+
+def _arc_weight(graph, origin, destiny):
+    """ Menor peso entre as arestas origin -> destiny. """
+    return min(weight for neighbour, weight in graph.arcs(origin)
+               if neighbour == destiny)
+
+
+def _prefix_costs(graph, path):
+    """ Custo acumulado até cada vértice do caminho. """
+    costs = [0.0]
+    for origin, destiny in zip(path, path[1:]):
+        costs.append(costs[-1] + _arc_weight(graph, origin, destiny))
+    return costs
+
+
+def _edge_weights(graph, path):
+    """ Dicionário aresta (sem sentido) -> peso das arestas do caminho. """
+    return {(min(origin, destiny), max(origin, destiny)):
+            _arc_weight(graph, origin, destiny)
+            for origin, destiny in zip(path, path[1:])}
+
+
+def _names(graph, path):
+    return [graph.vertex_name(vertex) for vertex in path]
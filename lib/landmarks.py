@@ -0,0 +1,234 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import os
+import struct
+from array import array
+from lib.dijkstra import dijkstra, vertex_table, INFINITY
+
+# Cabeçalho do arquivo de índice: assinatura, número de vértices, número de
+# landmarks e tamanho (em bytes) da lista de nomes.
+_MAGIC = b'ALT1'
+_HEADER = struct.Struct('<4sIII')
+
+# As tabelas são gravadas em float32. Para que o arredondamento nunca
+# produza uma estimativa maior do que a distância real, descontamos de cada
+# limite uma folga proporcional às distâncias envolvidas (o erro relativo
+# de um float32 é de no máximo 2^-24).
+_ROUNDING_SLACK = 2.0 ** -22
+
+
+class LandmarkIndex:
+    """ Índice do método ALT (A*, Landmarks e desigualdade Triangular).
+
+    Para cada landmark L guardamos d(L, v) e d(v, L) para todo vértice v.
+    Pela desigualdade triangular, para quaisquer vértices v e t:
+    - d(v, t) >= d(L, t) - d(L, v)
+    - d(v, t) >= d(v, L) - d(t, L)
+    O maior desses limites entre todos os landmarks é uma heurística
+    admissível e consistente para o A*, com a mesma interface de
+    CoordinateHeuristic.
+
+    Parâmetros:
+    - names : nomes dos vértices, na ordem das tabelas.
+    - landmarks : posições (em names) dos vértices escolhidos.
+    - forward : uma tabela d(L, v) por landmark, na ordem de names.
+    - backward : uma tabela d(v, L) por landmark, na ordem de names.
+    """
+
+    def __init__(self, names, landmarks, forward, backward):
+        self.names = names
+        self.landmarks = landmarks
+        self.forward = forward
+        self.backward = backward
+        self._forward = self._backward = None
+
+    @classmethod
+    def build(cls, graph, count):
+        """ Escolhe os landmarks e calcula suas tabelas de distâncias.
+
+        Os landmarks são escolhidos pelo critério do ponto mais distante:
+        o primeiro é o vértice mais distante de um vértice arbitrário e cada
+        novo landmark é o vértice cuja distância ao landmark mais próximo é
+        a maior possível. Em um grafo desconexo, os vértices que nenhum
+        landmark alcança têm prioridade, de modo que nenhum landmark é
+        escolhido duas vezes. Cada landmark custa um Dijkstra completo no
+        grafo e outro no grafo invertido.
+
+        Parâmetros:
+        - graph : grafo com a interface de vizinhança.
+        - count : número de landmarks desejado.
+        """
+        names = list(graph)
+        vertices = [graph.vertex_id(name) for name in names]
+        reverse = graph.reversed()
+        count = min(count, len(vertices))
+
+        landmarks, forward, backward = [], [], []
+        nearest = [INFINITY] * len(vertices)
+        while len(landmarks) < count:
+            candidate = _next_landmark(graph, vertices, nearest, landmarks)
+            if candidate is None:
+                break
+            landmarks.append(candidate)
+            source = vertices[candidate]
+            distances = dijkstra(graph, source)[0]
+            forward.append(array('f', [distances[v] for v in vertices]))
+            distances = dijkstra(reverse, source)[0]
+            backward.append(array('f', [distances[v] for v in vertices]))
+            for index, distance in enumerate(forward[-1]):
+                if distance < nearest[index]:
+                    nearest[index] = distance
+        return cls(names, landmarks, forward, backward)
+
+    def save(self, path):
+        """ Grava o índice em um arquivo binário.
+
+        Formato: cabeçalho, nomes em UTF-8 separados por quebras de linha,
+        posições dos landmarks (uint32) e as tabelas em float32. O arquivo é
+        gravado com outro nome e renomeado ao final, para que uma falha
+        durante a gravação nunca deixe um índice incompleto.
+
+        Parâmetros:
+        - path : caminho do arquivo de índice.
+        """
+        names = '\n'.join(self.names).encode('utf-8')
+        temporary = '%s.%d.tmp' % (path, os.getpid())
+        with open(temporary, 'wb') as index_file:
+            index_file.write(_HEADER.pack(_MAGIC, len(self.names),
+                                          len(self.landmarks), len(names)))
+            index_file.write(names)
+            array('I', self.landmarks).tofile(index_file)
+            for table in self.forward + self.backward:
+                table.tofile(index_file)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """ Lê um índice gravado por save().
+
+        Parâmetros:
+        - path : caminho do arquivo de índice.
+        """
+        with open(path, 'rb') as index_file:
+            magic, vertex_count, count, names_size = _HEADER.unpack(
+                index_file.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError('Arquivo de landmarks inválido: %s' % path)
+            names = index_file.read(names_size).decode('utf-8')
+            names = names.split('\n') if vertex_count else []
+            landmarks = array('I')
+            landmarks.fromfile(index_file, count)
+            tables = []
+            for _ in range(2 * count):
+                table = array('f')
+                table.fromfile(index_file, vertex_count)
+                tables.append(table)
+        return cls(names, list(landmarks), tables[:count], tables[count:])
+
+    def attach(self, graph):
+        """ Associa o índice aos identificadores internos de um grafo.
+
+        Deve ser chamado antes de bound(). Gera ValueError caso o índice
+        tenha sido criado para um grafo com outros vértices.
+
+        Parâmetros:
+        - graph : grafo em que as consultas serão feitas.
+        """
+        if len(self.names) != len(graph) or \
+                any(name not in graph for name in self.names):
+            raise ValueError('O índice de landmarks não corresponde ao grafo.')
+        vertices = [graph.vertex_id(name) for name in self.names]
+        self._forward = [_to_vertex_table(graph, vertices, table)
+                         for table in self.forward]
+        self._backward = [_to_vertex_table(graph, vertices, table)
+                          for table in self.backward]
+        return self
+
+    def bound(self, goal):
+        """ Retorna a função h(vertex) com o limite inferior de d(vertex, goal).
+
+        Parâmetros:
+        - goal : identificador interno do vértice objetivo.
+        """
+        terms = []
+        for forward, backward in zip(self._forward, self._backward):
+            terms.append((forward, backward, forward[goal], backward[goal]))
+
+        def estimate(vertex):
+            best = 0.0
+            for forward, backward, to_goal, from_goal in terms:
+                from_landmark = forward[vertex]
+                # Distâncias infinitas não fornecem limite (evitamos inf-inf):
+                if to_goal != INFINITY and from_landmark != INFINITY:
+                    value = to_goal - from_landmark - _ROUNDING_SLACK * \
+                        (to_goal + from_landmark)
+                    if value > best:
+                        best = value
+                to_landmark = backward[vertex]
+                if to_landmark != INFINITY and from_goal != INFINITY:
+                    value = to_landmark - from_goal - _ROUNDING_SLACK * \
+                        (to_landmark + from_goal)
+                    if value > best:
+                        best = value
+            return best
+        return estimate
+
+
+def _next_landmark(graph, vertices, nearest, landmarks):
+    """ Retorna a posição (em vertices) do próximo landmark, ou None caso
+    não reste nenhum candidato.
+
+    Enquanto houver vértices que nenhum landmark alcança (todos, no início,
+    ou os de outro componente de um grafo desconexo), o escolhido é, entre
+    eles, o mais distante do primeiro; depois, é o vértice mais distante do
+    landmark mais próximo.
+
+    Parâmetros:
+    - graph : grafo com a interface de vizinhança.
+    - vertices : identificadores internos dos vértices, na ordem das tabelas.
+    - nearest : distância de cada vértice ao landmark mais próximo.
+    - landmarks : posições dos landmarks já escolhidos.
+    """
+    unreached = [index for index, distance in enumerate(nearest)
+                 if distance == INFINITY]
+    if unreached:
+        distances = dijkstra(graph, vertices[unreached[0]])[0]
+        return unreached[_farthest([distances[vertices[index]]
+                                    for index in unreached], ())]
+    return _farthest(nearest, landmarks)
+
+
+def _farthest(distances, excluded):
+    """ Retorna a posição da maior distância finita, ignorando excluded, ou
+    None caso não haja nenhuma.
+    """
+    best, best_distance = None, -1.0
+    for index, distance in enumerate(distances):
+        if distance != INFINITY and distance > best_distance \
+                and index not in excluded:
+            best, best_distance = index, distance
+    return best
+
+
+def _to_vertex_table(graph, vertices, values):
+    """ Reindexa uma tabela ordenada por nome pelos vértices do grafo. """
+    # Em um CompactGraph os nomes já estão na ordem dos identificadores e a
+    # própria tabela em float32 pode ser usada diretamente:
+    if vertices == list(range(len(vertices))):
+        return values
+    table = vertex_table(graph, INFINITY)
+    for vertex, value in zip(vertices, values):
+        table[vertex] = value
+    return table
+
+
+if __name__ == '__main__':
+    # Pré-processamento offline: python -m lib.landmarks
+    from lib.compact_graph import CompactGraph
+    Config = __import__('config')
+    graph = CompactGraph()
+    graph.create_from_csv(Config.distances_path)
+    LandmarkIndex.build(graph, Config.LANDMARK_COUNT).save(
+        Config.landmarks_path)
+    print('Índice de landmarks gravado em', Config.landmarks_path)
@@ -1,79 +1,168 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
 
-import collections
-from weakref import proxy
+from collections.abc import MutableSet, Set
+from itertools import compress
 
-class Link(object):
-    __slots__ = 'prev', 'next', 'key', '__weakref__'
 
-class OrderedSet(collections.MutableSet):
-    'Set the remembers the order elements were added'
-    # Big-O running times for all methods are the same as for regular sets.
-    # The internal self.__map dictionary maps keys to links in a doubly linked list.
-    # The circular doubly linked list starts and ends with a sentinel element.
-    # The sentinel element never gets deleted (this simplifies the algorithm).
-    # The prev/next links are weakref proxies (to prevent circular references).
-    # Individual links are kept alive by the hard reference in self.__map.
-    # Those hard references disappear when a key is deleted from an OrderedSet.
+class OrderedSet(MutableSet):
+    """ Conjunto que lembra a ordem em que os elementos foram adicionados.
+
+    Os elementos são as chaves de um dicionário (que preserva a ordem de
+    inserção), de modo que add, discard e a verificação de pertinência têm o
+    mesmo custo das de um set, sem objetos auxiliares por elemento.
+
+    Parâmetros:
+    - iterable : elementos iniciais, opcional.
+    """
+
+    __slots__ = ('_map',)
 
     def __init__(self, iterable=None):
-        self.__root = root = Link()         # sentinel node for doubly linked list
-        root.prev = root.next = root
-        self.__map = {}                     # key --> link
-        if iterable is not None:
-            self |= iterable
+        self._map = dict.fromkeys(iterable) if iterable is not None else {}
 
     def __len__(self):
-        return len(self.__map)
+        return len(self._map)
 
     def __contains__(self, key):
-        return key in self.__map
+        return key in self._map
 
     def add(self, key):
-        # Store new key in a new link at the end of the linked list
-        if key not in self.__map:
-            self.__map[key] = link = Link()            
-            root = self.__root
-            last = root.prev
-            link.prev, link.next, link.key = last, root, key
-            last.next = root.prev = proxy(link)
+        self._map[key] = None
 
     def discard(self, key):
-        # Remove an existing item using self.__map to find the link which is
-        # then removed by updating the links in the predecessor and successors.        
-        if key in self.__map:        
-            link = self.__map.pop(key)
-            link.prev.next = link.next
-            link.next.prev = link.prev
+        self._map.pop(key, None)
 
     def __iter__(self):
-        # Traverse the linked list in order.
-        root = self.__root
-        curr = root.next
-        while curr is not root:
-            yield curr.key
-            curr = curr.next
+        return iter(self._map)
 
     def __reversed__(self):
-        # Traverse the linked list in reverse order.
-        root = self.__root
-        curr = root.prev
-        while curr is not root:
-            yield curr.key
-            curr = curr.prev
+        return reversed(self._map)
 
     def pop(self, last=True):
-        if not self:
+        if not self._map:
             raise KeyError('set is empty')
-        key = next(reversed(self)) if last else next(iter(self))
-        self.discard(key)
+        key = next(reversed(self._map)) if last else next(iter(self._map))
+        del self._map[key]
         return key
 
+    def clear(self):
+        self._map.clear()
+
     def __repr__(self):
         if not self:
             return '%s()' % (self.__class__.__name__,)
         return '%s(%r)' % (self.__class__.__name__, list(self))
 
     def __eq__(self, other):
-        if isinstance(other, OrderedSet):
+        if isinstance(other, (OrderedSet, VisitedView)):
             return len(self) == len(other) and list(self) == list(other)
-        return not self.isdisjoint(other)
\ No newline at end of file
+        return Set.__eq__(self, other)
+
+    __hash__ = None
+
+
+class BitSet(MutableSet):
+    """ Conjunto de inteiros entre 0 e size - 1 guardado em um bytearray,
+    um byte por elemento, indicado para os identificadores dos vértices de
+    um CompactGraph.
+
+    A pertinência é uma leitura em marks, que as buscas podem acessar
+    diretamente; a iteração é feita em ordem crescente.
+
+    Parâmetros:
+    - size : quantidade de valores possíveis (len(graph)).
+    - iterable : elementos iniciais, opcional.
+    """
+
+    __slots__ = ('marks', '_count')
+
+    def __init__(self, size, iterable=None):
+        self.marks = bytearray(size)
+        self._count = 0
+        if iterable is not None:
+            for value in iterable:
+                self.add(value)
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, value):
+        return 0 <= value < len(self.marks) and self.marks[value] != 0
+
+    def add(self, value):
+        if not self.marks[value]:
+            self.marks[value] = 1
+            self._count += 1
+
+    def discard(self, value):
+        if 0 <= value < len(self.marks) and self.marks[value]:
+            self.marks[value] = 0
+            self._count -= 1
+
+    def __iter__(self):
+        return compress(range(len(self.marks)), self.marks)
+
+    def __repr__(self):
+        return '%s(%d, %r)' % (self.__class__.__name__, len(self.marks),
+                               list(self))
+
+
+class VisitedView(Set):
+    """ Vértices visitados por uma busca, na ordem de visita, sem cópias.
+
+    As buscas guardam apenas a lista dos identificadores internos na ordem
+    em que foram visitados (sem repetições). A tradução para nomes é feita
+    durante a iteração, e o conjunto usado na verificação de pertinência só
+    é montado na primeira vez em que ela é pedida (por exemplo, pela
+    interface ao destacar a rota), de modo que as consultas que só precisam
+    de len() não pagam por nenhum dos dois.
+
+    Parâmetros:
+    - order : lista de vértices visitados, na ordem de visita.
+    - names : lista identificador -> nome (CompactGraph.names), ou None
+      quando os vértices já são nomes.
+    - ids : dicionário nome -> identificador (CompactGraph.ids).
+    """
+
+    __slots__ = ('_order', '_names', '_ids', '_members')
+
+    def __init__(self, order, names=None, ids=None):
+        self._order = order
+        self._names = names
+        self._ids = ids
+        self._members = None
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        if self._names is None:
+            return iter(self._order)
+        return map(self._names.__getitem__, self._order)
+
+    def __reversed__(self):
+        if self._names is None:
+            return reversed(self._order)
+        return map(self._names.__getitem__, reversed(self._order))
+
+    def __contains__(self, name):
+        if self._members is None:
+            if self._names is None:
+                self._members = set(self._order)
+            else:
+                self._members = BitSet(len(self._names), self._order)
+        if self._names is None:
+            return name in self._members
+        vertex = self._ids.get(name)
+        return vertex is not None and vertex in self._members
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, list(self))
+
+    def __eq__(self, other):
+        if isinstance(other, (OrderedSet, VisitedView)):
+            return len(self) == len(other) and list(self) == list(other)
+        return Set.__eq__(self, other)
+
+    __hash__ = None
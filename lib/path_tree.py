@@ -0,0 +1,355 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+from bisect import bisect_left, insort
+from collections import deque, OrderedDict
+from heapq import heappush, heappop
+from lib.compact_graph import CompactGraph
+from lib.dijkstra import dijkstra, build_path, vertex_table, INFINITY
+from lib.ordered_set import VisitedView
+
+
+class ShortestPathTree:
+    """ Árvore de caminhos mínimos de uma única origem.
+
+    A árvore é calculada uma única vez por origem: com Dijkstra (menor
+    distância) ou com uma busca em amplitude (menor número de passos). Cada
+    destino é respondido depois apenas seguindo os pais até a origem.
+
+    Como a busca completa fixa os vértices na mesma ordem que a busca
+    interrompida no destino, o resultado de cada destino é idêntico ao de
+    uniform_cost_search (weighted=True) ou bfs (weighted=False), exceto
+    quando o destino é a própria origem, cujo caminho é apenas [origem].
+
+    Depois de alterações nas arestas do grafo, update() corrige a árvore
+    de Dijkstra apenas nos vértices afetados (SSSP dinâmico). Após uma
+    correção, um destino com mais de um caminho mínimo pode receber outro
+    caminho de mesmo custo.
+
+    Parâmetros:
+    - graph : grafo com a interface de vizinhança.
+    - origin : nome do vértice de origem.
+    - weighted : True para distâncias, False para número de passos.
+    """
+
+    def __init__(self, graph, origin, weighted=True):
+        self.graph = graph
+        self.weighted = weighted
+        self.origin = graph.vertex_id(origin)
+        self._build()
+
+    def _build(self):
+        """ Calcula a árvore completa a partir da origem. """
+        self.version = getattr(self.graph, 'version', None)
+        if self.weighted:
+            self.distances, self.parents, order = dijkstra(self.graph,
+                                                           self.origin)
+            # O Dijkstra fixa os vértices em ordem de (distância, vértice);
+            # a lista ordenada dessas chaves dá a posição de cada vértice na
+            # ordem de visita e pode ser corrigida sem refazer a busca:
+            self.keys = [(self.distances[vertex], vertex) for vertex in order]
+        else:
+            self._bfs_tree()
+            self.position = vertex_table(self.graph, None)
+            for index, vertex in enumerate(self.order):
+                self.position[vertex] = index
+
+    def _bfs_tree(self):
+        """ Busca em amplitude completa, guardando os pais, a profundidade e
+        a ordem de descoberta de cada vértice.
+        """
+        graph, origin = self.graph, self.origin
+        self.parents = vertex_table(graph, None)
+        self.distances = vertex_table(graph, None)
+        self.distances[origin] = 0
+        self.order = [origin]
+        queue = deque([origin])
+        while queue:
+            vertex = queue.popleft()
+            depth = self.distances[vertex] + 1
+            for neighbour in graph.neighbours(vertex):
+                if self.distances[neighbour] is None:
+                    self.distances[neighbour] = depth
+                    self.parents[neighbour] = vertex
+                    self.order.append(neighbour)
+                    queue.append(neighbour)
+
+    def _position(self, vertex):
+        """ Retorna a posição do vértice na ordem de visita, ou None caso ele
+        seja inalcançável.
+        """
+        if not self.weighted:
+            return self.position[vertex]
+        distance = self.distances[vertex]
+        if distance == INFINITY:
+            return None
+        return bisect_left(self.keys, (distance, vertex))
+
+    def update(self, changes, reverse=None):
+        """ Corrige a árvore depois de alterações nas arestas do grafo.
+
+        Os vértices cujo caminho na árvore passa por uma aresta que ficou
+        mais longa (ou foi removida) perdem a distância e são recalculados a
+        partir dos vizinhos de entrada não afetados; as arestas que ficaram
+        mais curtas (ou foram criadas) apenas propagam a melhora. Os dois
+        casos terminam em um mesmo Dijkstra restrito aos vértices alterados.
+
+        A árvore de amplitude não depende das distâncias e só é refeita
+        quando arestas são criadas ou removidas.
+
+        Parâmetros:
+        - changes : lista de EdgeChange (Graph.changes_since).
+        - reverse : grafo invertido já atualizado, usado para encontrar os
+          vizinhos de entrada (criado a partir do grafo se necessário).
+        """
+        self.version = getattr(self.graph, 'version', None)
+        if not self.weighted:
+            if any(change.old is None or change.new is None
+                   for change in changes):
+                self._build()
+            return
+        graph, distances, parents = self.graph, self.distances, self.parents
+        touched = dict()    # Vértice -> distância antes da correção.
+        heap = []
+        # Alterações repetidas da mesma aresta são reduzidas a uma só, da
+        # distância original até a final:
+        edges = dict()
+        for change in changes:
+            key = (graph.vertex_id(change.origin),
+                   graph.vertex_id(change.destiny))
+            old = edges[key][0] if key in edges else change.old
+            edges[key] = (old, change.new)
+
+        # Vértices cuja aresta da árvore ficou mais longa ou foi removida:
+        roots = [destiny for (origin, destiny), (old, new) in edges.items()
+                 if old is not None and (new is None or new > old) and
+                 parents[destiny] == origin]
+        affected = self._subtrees(roots)
+        if affected:
+            for vertex in affected:
+                touched[vertex] = distances[vertex]
+                distances[vertex] = INFINITY
+                parents[vertex] = None
+            if reverse is None:
+                reverse = graph.reversed()
+            # Cada vértice afetado recomeça pelo melhor vizinho de entrada
+            # que manteve a distância:
+            for vertex in affected:
+                name = graph.vertex_name(vertex)
+                for neighbour, weight in reverse.arcs(
+                        reverse.vertex_id(name)):
+                    neighbour = graph.vertex_id(reverse.vertex_name(neighbour))
+                    if neighbour in affected:
+                        continue
+                    new_distance = distances[neighbour] + weight
+                    if new_distance < distances[vertex]:
+                        distances[vertex] = new_distance
+                        parents[vertex] = neighbour
+                if distances[vertex] < INFINITY:
+                    heappush(heap, (distances[vertex], vertex))
+
+        # Arestas que ficaram mais curtas ou foram criadas:
+        for (origin, destiny), (old, new) in edges.items():
+            if new is None or (old is not None and new >= old) or \
+                    origin in affected:
+                continue    # As afetadas são relaxadas ao fixar a origem.
+            new_distance = distances[origin] + new
+            if new_distance < distances[destiny]:
+                touched.setdefault(destiny, distances[destiny])
+                distances[destiny] = new_distance
+                parents[destiny] = origin
+                heappush(heap, (new_distance, destiny))
+
+        # Dijkstra restrito aos vértices cuja distância mudou:
+        while heap:
+            distance, vertex = heappop(heap)
+            if distance > distances[vertex]:
+                continue    # Entrada obsoleta.
+            for neighbour, weight in graph.arcs(vertex):
+                new_distance = distance + weight
+                if new_distance < distances[neighbour]:
+                    touched.setdefault(neighbour, distances[neighbour])
+                    distances[neighbour] = new_distance
+                    parents[neighbour] = vertex
+                    heappush(heap, (new_distance, neighbour))
+
+        # Reposicionamos na ordem de visita apenas os vértices alterados:
+        keys = self.keys
+        for vertex, old_distance in touched.items():
+            if old_distance < INFINITY:
+                del keys[bisect_left(keys, (old_distance, vertex))]
+        for vertex in touched:
+            if distances[vertex] < INFINITY:
+                insort(keys, (distances[vertex], vertex))
+
+    def _subtrees(self, roots):
+        """ Retorna o conjunto de vértices das subárvores com as raízes
+        informadas, seguindo as arestas do grafo que são arestas da árvore.
+        """
+        graph, parents = self.graph, self.parents
+        affected = set()
+        stack = [root for root in roots if self.distances[root] < INFINITY]
+        while stack:
+            vertex = stack.pop()
+            if vertex in affected:
+                continue
+            affected.add(vertex)
+            for neighbour in graph.neighbours(vertex):
+                if parents[neighbour] == vertex:
+                    stack.append(neighbour)
+        return affected
+
+    def path_to(self, goal):
+        """ Retorna o caminho (em nomes) da origem até goal, ou None caso goal
+        seja inalcançável.
+
+        Parâmetros:
+        - goal : nome do vértice objetivo.
+        """
+        goal = self.graph.vertex_id(goal)
+        if self._position(goal) is None:
+            return None
+        path = build_path(self.parents, self.origin, goal)
+        return [self.graph.vertex_name(vertex) for vertex in path]
+
+    def cost_to(self, goal):
+        """ Retorna a distância (ou número de passos) até goal, ou None caso
+        goal seja inalcançável.
+
+        Parâmetros:
+        - goal : nome do vértice objetivo.
+        """
+        goal = self.graph.vertex_id(goal)
+        if self._position(goal) is None:
+            return None
+        return self.distances[goal]
+
+    def result(self, goal):
+        """ Retorna o resultado no mesmo formato da busca equivalente:
+        (visitados, caminho, custo) com Dijkstra ou (visitados, caminho) com
+        amplitude.
+
+        Parâmetros:
+        - goal : nome do vértice objetivo.
+        """
+        vertex = self.graph.vertex_id(goal)
+        position = self._position(vertex)
+        if self.weighted:
+            keys = self.keys if position is None else self.keys[:position + 1]
+            visited = [key[1] for key in keys]
+        elif position is None:
+            visited = list(self.order)  # A árvore pode ser atualizada depois.
+        elif vertex == self.origin:
+            visited = self.order[:position + 1]
+        else:
+            # A busca em amplitude para ao descobrir o objetivo, que não
+            # chega a ser marcado como visitado:
+            visited = self.order[:position]
+        if isinstance(self.graph, CompactGraph):
+            visited = VisitedView(visited, self.graph.names, self.graph.ids)
+        else:
+            visited = VisitedView(visited)
+        path = self.path_to(goal)
+        if self.weighted:
+            return (visited, path, self.cost_to(goal))
+        return (visited, path)
+
+
+class PathTreeCache:
+    """ Mantém em memória as árvores das últimas origens consultadas.
+
+    As árvores são descartadas quando o grafo é trocado ou modificado
+    (graph.version), como em QueryCache.
+
+    Parâmetros:
+    - size : número máximo de árvores guardadas.
+    """
+
+    def __init__(self, size=8):
+        self.size = size
+        self._trees = OrderedDict()
+        self._reverse = None    # Grafo invertido usado nas correções.
+
+    def _reverse_graph(self, graph):
+        """ Retorna o grafo invertido na versão atual do grafo, aplicando as
+        alterações registradas desde a última correção (ou invertendo o
+        grafo inteiro, se elas não forem conhecidas).
+        """
+        version = graph.version
+        if self._reverse is not None and self._reverse[0] is graph:
+            _, reverse_version, reverse = self._reverse
+            changes = graph.changes_since(reverse_version)
+            if changes is not None:
+                for change in changes:
+                    if change.old is None:
+                        reverse.add_edge(change.destiny, change.origin,
+                                         change.new)
+                    elif change.new is None:
+                        reverse.remove_edge(change.destiny, change.origin)
+                    else:
+                        reverse.set_edge_weight(change.destiny,
+                                                change.origin, change.new)
+                self._reverse = (graph, version, reverse)
+                return reverse
+        self._reverse = (graph, version, graph.reversed())
+        return self._reverse[2]
+
+    def get(self, graph, origin, weighted=True):
+        """ Retorna a árvore da origem, calculando-a se necessário.
+
+        Se o grafo foi alterado com a interface de arestas de Graph
+        (set_edge_weight, add_edge, remove_edge), a árvore guardada é
+        corrigida com ShortestPathTree.update em vez de recalculada.
+
+        Parâmetros:
+        - graph : grafo da consulta.
+        - origin : nome do vértice de origem.
+        - weighted : True para distâncias, False para número de passos.
+        """
+        key = (origin, weighted)
+        tree = self._trees.get(key)
+        version = getattr(graph, 'version', None)
+        if tree is not None and tree.graph is graph:
+            changes = None if tree.version == version else \
+                _changes_since(graph, tree.version)
+            if changes is not None:
+                tree.update(changes, self._reverse_graph(graph)
+                            if weighted else None)
+            if tree.version == version:
+                self._trees.move_to_end(key)
+                return tree
+        tree = ShortestPathTree(graph, origin, weighted)
+        self._trees[key] = tree
+        while len(self._trees) > self.size:
+            self._trees.popitem(last=False)
+        return tree
+
+    def clear(self):
+        """ Descarta todas as árvores guardadas. """
+        self._trees.clear()
+        self._reverse = None
+
+
+def _changes_since(graph, version):
+    """ Retorna as alterações de arestas do grafo desde a versão informada,
+    ou None caso o grafo não as registre.
+    """
+    changes_since = getattr(graph, 'changes_since', None)
+    return None if changes_since is None else changes_since(version)
+
+
+def route_many(graph, origin, goals, weighted=True):
+    """ Calcula as rotas de uma origem para vários destinos com uma única
+    busca completa.
+
+    Retorna uma lista de tuplas (caminho, custo), na ordem de goals, com
+    (None, None) para os destinos inalcançáveis.
+
+    Parâmetros:
+    - graph : grafo com a interface de vizinhança.
+    - origin : nome do vértice de origem.
+    - goals : nomes dos vértices de destino.
+    - weighted : True para distâncias, False para número de passos.
+    """
+    tree = ShortestPathTree(graph, origin, weighted)
+    return [(tree.path_to(goal), tree.cost_to(goal)) for goal in goals]
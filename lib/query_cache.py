@@ -0,0 +1,129 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+from collections import OrderedDict
+
+
+class QueryCache:
+    """ Cache LRU de resultados de busca.
+
+    A chave de cada resultado é (método, origem, destino, limite). O cache
+    guarda o grafo e a versão (graph.version) dos resultados armazenados e é
+    esvaziado automaticamente quando o grafo é trocado ou modificado.
+
+    Em grafos não direcionados (toda aresta possui a volta com a mesma
+    distância), uma consulta destino -> origem de um método listado em
+    symmetric é respondida invertendo o caminho já guardado. Os vértices
+    visitados retornados são os da busca original.
+
+    Parâmetros:
+    - size : número máximo de resultados guardados.
+    - symmetric : métodos cujo caminho invertido também é uma resposta
+      válida (por exemplo, os que retornam caminhos ótimos).
+    """
+
+    def __init__(self, size=128, symmetric=()):
+        self.size = size
+        self.symmetric = frozenset(symmetric)
+        self.hits = 0
+        self.reverse_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._graph = None
+        self._version = None
+        self._undirected = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, graph, method, origin, goal, lim):
+        """ Retorna o resultado guardado para a consulta ou None.
+
+        Parâmetros:
+        - graph : grafo em que a consulta será feita.
+        - method : identificador do método de busca.
+        - origin : vértice inicial.
+        - goal : vértice objetivo.
+        - lim : limite de passos do método.
+        """
+        self._check(graph)
+        key = (method, origin, goal, lim)
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+        if method in self.symmetric and self._is_undirected(graph):
+            reverse_key = (method, goal, origin, lim)
+            result = self._entries.get(reverse_key)
+            if result is not None:
+                self._entries.move_to_end(reverse_key)
+                self.hits += 1
+                self.reverse_hits += 1
+                return _flipped(result)
+        self.misses += 1
+        return None
+
+    def put(self, graph, method, origin, goal, lim, result):
+        """ Guarda o resultado de uma consulta, descartando o resultado usado
+        há mais tempo caso o cache esteja cheio.
+
+        Parâmetros:
+        - graph : grafo em que a consulta foi feita.
+        - method, origin, goal, lim : mesma chave de get().
+        - result : tupla retornada pela função de busca.
+        """
+        if self.size <= 0 or result is None:
+            return
+        self._check(graph)
+        key = (method, origin, goal, lim)
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """ Descarta todos os resultados guardados. """
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._undirected = None
+
+    def stats(self):
+        """ Retorna os contadores do cache em um dicionário. """
+        return {'size': len(self._entries), 'capacity': self.size,
+                'hits': self.hits, 'reverse_hits': self.reverse_hits,
+                'misses': self.misses, 'evictions': self.evictions,
+                'invalidations': self.invalidations}
+
+    def _check(self, graph):
+        """ Esvazia o cache caso o grafo tenha sido trocado ou modificado. """
+        version = getattr(graph, 'version', None)
+        if graph is not self._graph or version != self._version:
+            self.clear()
+            self._graph, self._version = graph, version
+
+    def _is_undirected(self, graph):
+        """ Verifica (uma vez por versão do grafo) se toda aresta possui a
+        aresta de volta com a mesma distância.
+        """
+        if self._undirected is None:
+            edges = dict()
+            for name in graph:
+                vertex = graph.vertex_id(name)
+                for neighbour, distance in graph.arcs(vertex):
+                    edges[(vertex, neighbour)] = distance
+            self._undirected = all(
+                edges.get((neighbour, vertex)) == distance
+                for (vertex, neighbour), distance in edges.items())
+        return self._undirected
+
+
+def _flipped(result):
+    """ Inverte o caminho de um resultado (visitados, caminho, ...). """
+    if result[1] is None:
+        return result
+    return (result[0], result[1][::-1]) + tuple(result[2:])
@@ -0,0 +1,207 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import pygame
+from lib.spatial import SpatialGrid, segment_box
+
+# Acima deste número de regiões alteradas a tela é redesenhada inteira.
+MAX_DIRTY_RECTS = 32
+# Máximo de textos guardados no cache de superfícies.
+TEXT_CACHE_SIZE = 4096
+
+
+class MapRenderer:
+    """ Desenha o mapa em camadas, atualizando apenas o que mudou.
+
+    - Camada estática: imagem do mapa e, quando visíveis, as arestas em
+      preto. É composta uma única vez e refeita apenas quando o grafo muda
+      ou quando as arestas são mostradas/ocultadas.
+    - Camada de destaques: cópia da camada estática com as arestas
+      destacadas (cores de set_edge_colors), refeita apenas quando os
+      destaques mudam, isto é, a cada nova rota.
+    - Sobreposições: textos e municípios (pontos e nomes, com as cores de
+      set_city_colors), desenhados por cima da camada de destaques.
+
+    As linhas são sempre desenhadas por inteiro nas camadas, pois o pygame
+    rasteriza de outra forma uma linha espessa cortada por set_clip. A cada
+    chamada de draw() apenas as regiões que mudaram são recompostas, e a
+    lista dessas regiões é retornada para ser passada a
+    pygame.display.update(). As superfícies dos nomes são renderizadas uma
+    única vez por (fonte, texto, cor).
+
+    Parâmetros:
+    - screen : superfície da janela.
+    - background : imagem de fundo, já redimensionada para a janela.
+    - label_font : fonte dos nomes dos municípios.
+    - cities : municípios do mapa (com name, pos e rect).
+    - edge_index : índice espacial (SpatialGrid) das arestas do mapa.
+    - line_width : espessura das linhas das arestas.
+    - dot_radius : raio dos pontos dos municípios.
+    - colors : (fundo, cor padrão das arestas e dos municípios).
+    """
+
+    def __init__(self, screen, background, label_font, cities, edge_index,
+                 line_width, dot_radius, colors):
+        self.screen = screen
+        self.background = background
+        self.label_font = label_font
+        self.edge_index = edge_index
+        self.line_width = line_width
+        self.dot_radius = dot_radius
+        self.fill_color, self.default_color = colors
+        self.viewport = screen.get_rect()
+        self._texts_cache = dict()
+        self._base = None           # Camada estática.
+        self._highlights = None     # Camada de destaques.
+        self._show_edges = False
+        self._edge_colors = dict()
+        self._city_colors = dict()
+        self._texts = list()        # (superfície, posição) dos textos.
+        self._dirty = [self.viewport]
+        # Índice das áreas ocupadas por cada município (ponto e nome), usado
+        # para redesenhar os municípios de uma região alterada. Os municípios
+        # são sempre desenhados na mesma ordem, para que nomes sobrepostos
+        # fiquem iguais em redesenhos parciais e completos:
+        self.city_index = SpatialGrid(edge_index.cell_size)
+        self._city_order = dict()
+        for city in cities:
+            self._city_order[city] = len(self._city_order)
+            self.city_index.insert(city, self._city_bounds(city))
+
+    def render_text(self, font, text, color):
+        """ Retorna a superfície de um texto, renderizando-a apenas na
+        primeira vez em que é pedida.
+        """
+        key = (font, text, color)
+        surface = self._texts_cache.get(key)
+        if surface is None:
+            if len(self._texts_cache) >= TEXT_CACHE_SIZE:
+                self._texts_cache.clear()
+            surface = self._texts_cache[key] = font.render(text, True, color)
+        return surface
+
+    def _label_position(self, city):
+        return (city.pos[0] - len(city.name) * 3, city.pos[1])
+
+    def _city_bounds(self, city):
+        """ Retorna o retângulo ocupado pelo ponto e pelo nome do município.
+        """
+        radius = self.dot_radius
+        dot = pygame.Rect(city.pos[0] - radius, city.pos[1] - radius,
+                          2 * radius + 1, 2 * radius + 1)
+        label = self.render_text(self.label_font, city.name,
+                                 self.default_color).get_rect(
+                                     topleft=self._label_position(city))
+        return dot.union(label)
+
+    def _edge_bounds(self, edge):
+        return pygame.Rect(segment_box(edge.origin_pos, edge.destiny_pos,
+                                       self.line_width))
+
+    def invalidate(self):
+        """ Descarta a camada estática (por exemplo, depois de alterações nas
+        arestas do grafo) e agenda o redesenho da tela inteira.
+        """
+        self._base = self._highlights = None
+        self._dirty = [self.viewport]
+
+    def show_edges(self, visible):
+        """ Mostra ou oculta as arestas da camada estática. """
+        if visible != self._show_edges:
+            self._show_edges = visible
+            self.invalidate()
+
+    def set_edge_colors(self, colors):
+        """ Define as arestas destacadas.
+
+        Parâmetros:
+        - colors : dicionário aresta -> cor; as arestas são desenhadas na
+          ordem do dicionário.
+        """
+        colors = dict(colors)
+        if list(colors.items()) != list(self._edge_colors.items()):
+            changed = set(colors) | set(self._edge_colors)
+            self._dirty.extend(map(self._edge_bounds, changed))
+            self._edge_colors = colors
+            self._highlights = None
+
+    def set_city_colors(self, colors):
+        """ Define os municípios destacados; os demais usam a cor padrão.
+
+        Parâmetros:
+        - colors : dicionário município -> cor.
+        """
+        changed = set(colors.items()) ^ set(self._city_colors.items())
+        self._dirty.extend(self._city_bounds(city) for city, _ in changed)
+        self._city_colors = dict(colors)
+
+    def set_texts(self, texts):
+        """ Define os textos desenhados sobre o mapa.
+
+        Parâmetros:
+        - texts : lista de tuplas (fonte, texto, cor, posição).
+        """
+        texts = [(self.render_text(font, text, color), position)
+                 for font, text, color, position in texts]
+        if texts != self._texts:
+            self._dirty.extend(surface.get_rect(topleft=position)
+                               for surface, position in self._texts + texts)
+            self._texts = texts
+
+    def draw(self):
+        """ Recompõe as regiões alteradas desde a última chamada e retorna a
+        lista de retângulos a serem atualizados na janela.
+        """
+        if self._base is None:
+            self._build_base()
+        if self._highlights is None:
+            self._build_highlights()
+        dirty = [rect.clip(self.viewport) for rect in self._dirty]
+        dirty = [rect for rect in dirty if rect.width and rect.height]
+        if len(dirty) > MAX_DIRTY_RECTS:
+            dirty = [self.viewport]
+        self._dirty = []
+        for rect in dirty:
+            self.screen.set_clip(rect)
+            self._compose(rect)
+        self.screen.set_clip(None)
+        return dirty
+
+    def _build_base(self):
+        """ Compõe a camada estática: fundo, mapa e arestas em preto. """
+        base = pygame.Surface(self.viewport.size).convert()
+        base.fill(self.fill_color)
+        base.blit(self.background, (0, 0))
+        if self._show_edges:
+            for edge in self.edge_index.query(self.viewport):
+                pygame.draw.line(base, self.default_color, edge.origin_pos,
+                                 edge.destiny_pos, self.line_width)
+        self._base = base
+
+    def _build_highlights(self):
+        """ Compõe a camada de destaques: camada estática e arestas
+        destacadas.
+        """
+        if not self._edge_colors:
+            self._highlights = self._base
+            return
+        highlights = self._base.copy()
+        for edge, color in self._edge_colors.items():
+            pygame.draw.line(highlights, color, edge.origin_pos,
+                             edge.destiny_pos, self.line_width)
+        self._highlights = highlights
+
+    def _compose(self, rect):
+        """ Redesenha uma região da tela: camada de destaques, textos e, por
+        cima, os municípios.
+        """
+        screen = self.screen
+        screen.blit(self._highlights, rect, rect)
+        for surface, position in self._texts:
+            screen.blit(surface, position)
+        for city in sorted(self.city_index.query(rect),
+                           key=self._city_order.__getitem__):
+            color = self._city_colors.get(city, self.default_color)
+            pygame.draw.circle(screen, color, city.pos, self.dot_radius)
+            screen.blit(self.render_text(self.label_font, city.name, color),
+                        self._label_position(city))
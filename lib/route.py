@@ -0,0 +1,50 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+from lib.search import edge_key
+
+
+class Route:
+    """ Resultado de uma busca preparado para ser destacado no mapa.
+
+    Além dos dados retornados pela busca, guarda conjuntos que permitem
+    verificar em O(1) se um município ou uma aresta faz parte da rota:
+    - visited_vertices : municípios visitados pela busca;
+    - path_edges : chaves (edge_key) das arestas entre municípios
+      consecutivos do caminho;
+    - visited_edges : chaves das arestas que ligam um município do caminho
+      a um município visitado, exceto as do próprio caminho.
+
+    Parâmetros:
+    - graph : grafo em que a busca foi feita (vértices identificados pelos
+      nomes, como em Graph).
+    - result : tupla (visitados, caminho) ou (visitados, caminho, custo)
+      retornada pelos métodos de busca.
+    """
+
+    __slots__ = ('visited', 'path', 'cost', 'visited_vertices',
+                 'path_edges', 'visited_edges')
+
+    def __init__(self, graph, result):
+        self.visited = list(result[0])
+        self.path = result[1]
+        self.cost = result[2] if len(result) > 2 else None
+        self.visited_vertices = set(self.visited)
+        self.path_edges = set()
+        self.visited_edges = set()
+        if self.path is None:
+            return
+        for origin, destiny in zip(self.path, self.path[1:]):
+            self.path_edges.add(edge_key(origin, destiny))
+        for vertex in set(self.path):
+            if vertex not in graph:
+                continue
+            for neighbour in graph.neighbours(vertex):
+                if neighbour in self.visited_vertices:
+                    key = edge_key(vertex, neighbour)
+                    if key not in self.path_edges:
+                        self.visited_edges.add(key)
+
+    @property
+    def found(self):
+        return self.path is not None
@@ -0,0 +1,705 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import csv
+from lib.ordered_set import VisitedView
+from lib.dijkstra import (dijkstra, astar, bidirectional_dijkstra, build_path,
+                          vertex_table, vertex_marks, INFINITY)
+from collections import deque, namedtuple
+from functools import partial
+
+#########
+# GRAFO #
+#########
+
+# Alteração de uma aresta feita por Graph.set_edge_weight, add_edge ou
+# remove_edge. old é None quando a aresta foi criada e new é None quando
+# ela foi removida.
+EdgeChange = namedtuple('EdgeChange', ['origin', 'destiny', 'old', 'new'])
+
+CHANGE_LOG_SIZE = 4096  # Alterações de arestas guardadas por Graph.
+
+
+class Graph(dict):
+    """ Representa um grafo.
+
+    Esta classe é uma implementação de um dicionário,
+    ou seja, possui as mesmas funcionalidades de um
+    objeto do tipo dict().
+
+    O atributo version é incrementado a cada modificação do dicionário,
+    permitindo que estruturas derivadas (como o cache de consultas) saibam
+    quando devem ser descartadas. Alterações feitas diretamente nas listas
+    de vizinhos devem ser seguidas de uma chamada a touch().
+
+    As alterações feitas com set_edge_weight, add_edge e remove_edge também
+    são registradas (as últimas CHANGE_LOG_SIZE), e changes_since() permite
+    que as estruturas derivadas se atualizem aresta a aresta em vez de
+    serem reconstruídas.
+    """
+
+    version = 0
+    _changes = None     # Registro (versão, EdgeChange), criado sob demanda.
+    _log_start = 0      # Versão a partir da qual o registro está completo.
+
+    def touch(self):
+        """ Registra que o grafo foi modificado. """
+        self.version += 1
+        # Uma modificação sem detalhes invalida o registro de alterações:
+        self._changes = None
+        self._log_start = self.version
+
+    def changes_since(self, version):
+        """ Retorna a lista de EdgeChange feitas depois da versão informada,
+        ou None caso elas não sejam conhecidas (registro descartado ou
+        modificação feita por outros métodos).
+
+        Parâmetros:
+        - version : versão do grafo vista pela estrutura derivada.
+        """
+        if version < self._log_start or version > self.version:
+            return None
+        return [change for changed, change in self._changes or ()
+                if changed > version]
+
+    def _record(self, change):
+        """ Registra a alteração de uma aresta e incrementa a versão. """
+        self.version += 1
+        if self._changes is None:
+            self._changes = deque(maxlen=CHANGE_LOG_SIZE)
+        elif len(self._changes) == self._changes.maxlen:
+            self._log_start = self._changes[0][0]
+        self._changes.append((self.version, change))
+
+    def _find_edge(self, origin, destiny):
+        """ Retorna o par [vizinho, distância] da aresta origin -> destiny,
+        gerando KeyError caso ela não exista.
+        """
+        for neighbour in self.get(origin, ()):
+            if neighbour[0] == destiny:
+                return neighbour
+        raise KeyError((origin, destiny))
+
+    def set_edge_weight(self, origin, destiny, distance):
+        """ Altera a distância da aresta origin -> destiny (apenas neste
+        sentido). Gera KeyError caso a aresta não exista.
+
+        Parâmetros:
+        - origin : vértice de origem.
+        - destiny : vértice de destino.
+        - distance : nova distância.
+        """
+        edge = self._find_edge(origin, destiny)
+        old, edge[1] = edge[1], distance
+        self._record(EdgeChange(origin, destiny, old, distance))
+
+    def add_edge(self, origin, destiny, distance):
+        """ Cria a aresta origin -> destiny, criando também os vértices que
+        ainda não existirem. Gera ValueError caso a aresta já exista.
+
+        Parâmetros:
+        - origin : vértice de origem.
+        - destiny : vértice de destino.
+        - distance : distância da aresta.
+        """
+        neighbours = dict.setdefault(self, origin, list())
+        dict.setdefault(self, destiny, list())
+        if any(neighbour[0] == destiny for neighbour in neighbours):
+            raise ValueError('A aresta %s -> %s já existe.' % (origin,
+                                                                 destiny))
+        neighbours.append([destiny, distance])
+        self._record(EdgeChange(origin, destiny, None, distance))
+
+    def remove_edge(self, origin, destiny):
+        """ Remove a aresta origin -> destiny (apenas neste sentido). Os
+        vértices são mantidos. Gera KeyError caso a aresta não exista.
+
+        Parâmetros:
+        - origin : vértice de origem.
+        - destiny : vértice de destino.
+        """
+        edge = self._find_edge(origin, destiny)
+        self[origin].remove(edge)
+        self._record(EdgeChange(origin, destiny, edge[1], None))
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.touch()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.touch()
+
+    def clear(self):
+        super().clear()
+        self.touch()
+
+    def pop(self, *args):
+        self.touch()
+        return super().pop(*args)
+
+    def popitem(self):
+        self.touch()
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        self.touch()
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.touch()
+
+    def create_from_csv(self, path):
+        """ Lê um arquivo .csv e cria os vértices do grafo.
+
+        O arquivo deve conter 3 colunas separadas por vírgulas, onde:
+        - Primeira coluna: Identificador do vértice origem;
+        - Segunda coluna: Identificador do vértice vizinho;
+        - Terceira coluna: Distância entre os dois vértices.
+
+        Parâmetros:
+        - path : caminho do arquivo .csv
+        """
+        # Lemos as distâncias entre os municípios linha a linha, sem montar
+        # uma tabela intermediária. As chaves são os municípios da primeira
+        # coluna, na ordem em que aparecem, e cada vizinho (segunda coluna) é
+        # adicionado com a sua distância (terceira coluna):
+        adjacency = dict()
+        with open(path, newline='', encoding='utf-8-sig') as csv_file:
+            reader = csv.reader(csv_file)
+            next(reader, None)  # Ignoramos o cabeçalho.
+            for row in reader:
+                if row:
+                    neighbours = adjacency.get(row[0])
+                    if neighbours is None:
+                        neighbours = adjacency[row[0]] = list()
+                    neighbours.append([row[1], float(row[2])])
+        # Inserimos tudo de uma só vez, com uma única mudança de versão:
+        dict.update(self, adjacency)
+        self.touch()
+
+    # Os métodos abaixo formam a interface de vizinhança compartilhada com
+    # CompactGraph, permitindo que as buscas aceitem os dois formatos. Aqui
+    # os vértices já são identificados pelos próprios nomes.
+
+    def vertex_id(self, name):
+        return name
+
+    def vertex_name(self, vertex):
+        return vertex
+
+    def neighbours(self, vertex):
+        return [neighbour[0] for neighbour in self[vertex]]
+
+    def arcs(self, vertex):
+        return self[vertex]
+
+    def reversed(self):
+        """ Retorna um novo grafo com o sentido de todas as arestas invertido.
+        """
+        graph = Graph((vertex, list()) for vertex in self)
+        for from_city, neighbours in self.items():
+            for to_city, distance in neighbours:
+                graph.setdefault(to_city, list()).append([from_city, distance])
+        return graph
+
+
+def edge_key(origin, destiny):
+    """ Retorna a chave de uma aresta sem sentido: a mesma tupla para
+    (origin, destiny) e (destiny, origin).
+
+    Parâmetros:
+    - origin : vértice de uma das pontas.
+    - destiny : vértice da outra ponta.
+    """
+    return (origin, destiny) if origin <= destiny else (destiny, origin)
+
+
+def search_result(graph, visited, path, probe=None):
+    """ Converte o resultado de uma busca para os nomes dos vértices.
+
+    Os vértices visitados são retornados em uma VisitedView, que traduz os
+    identificadores de um CompactGraph (ou de uma ContractionHierarchy)
+    apenas quando é percorrida; o caminho é traduzido uma única vez, ao
+    final da busca.
+
+    Este é o único ponto em que as buscas registram na sonda o caminho
+    retornado (probe.allocate_path), uma vez por consulta com caminho.
+
+    Parâmetros:
+    - graph : grafo utilizado na busca.
+    - visited : lista dos vértices visitados, na ordem de visita e sem
+      repetições.
+    - path : caminho encontrado ou None.
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional.
+    """
+    if path is not None and probe is not None:
+        probe.allocate_path()
+    names = getattr(graph, 'names', None)
+    if names is None:
+        return (VisitedView(visited), path)
+    visited = VisitedView(visited, names, graph.ids)
+    if path is not None:
+        path = [names[vertex] for vertex in path]
+    return (visited, path)
+
+
+####################################
+# NÚCLEO DAS BUSCAS NÃO INFORMADAS #
+####################################
+
+def _traverse(graph, origin, goal, fifo, lim=None, probe=None):
+    """ Percorre o grafo a partir do vértice origin até encontrar o vértice
+    goal, guardando apenas o pai de cada vértice descoberto.
+
+    A fronteira é uma deque usada como fila (amplitude) ou como pilha
+    (profundidade), e o caminho só é montado, a partir dos pais, quando o
+    objetivo é encontrado.
+
+    Retorna uma tupla com os vértices visitados, o caminho em forma de lista
+    (ou None) e se a busca foi interrompida pelo limite de passos.
+
+    Parâmetros:
+    - origin : vértice inicial
+    - goal : vértice objetivo
+    - fifo : True para fila (amplitude), False para pilha (profundidade)
+    - lim : limite de vértices expandidos (None para ilimitado)
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional
+    """
+    origin, goal = graph.vertex_id(origin), graph.vertex_id(goal)
+    parents = vertex_table(graph, None)
+    frontier = deque([origin])
+    pop = frontier.popleft if fifo else frontier.pop
+    push = frontier.append
+    if probe is not None:
+        def push(vertex):
+            frontier.append(vertex)
+            probe.push(vertex, len(frontier))
+    marks = vertex_marks(graph)
+    visited = []
+    steps = 0
+    while frontier:
+        if lim is not None and steps >= lim:
+            return search_result(graph, visited, None) + (True,)
+        vertex = pop()
+        if not marks[vertex]:   # Somente a origem não foi marcada ainda.
+            marks[vertex] = 1
+            visited.append(vertex)
+        steps += 1
+        if probe is not None:
+            probe.expand(vertex)
+        for neighbour in graph.neighbours(vertex):
+            if neighbour == goal:
+                if probe is not None:
+                    probe.goal(goal)
+                path = build_path(parents, origin, vertex) + [goal]
+                return search_result(graph, visited, path, probe) + (False,)
+            if not marks[neighbour]:
+                marks[neighbour] = 1
+                visited.append(neighbour)
+                parents[neighbour] = vertex
+                push(neighbour)
+    return search_result(graph, visited, None) + (False,)
+
+
+#######################
+# MÉTODO DE AMPLITUDE #
+#######################
+
+def bfs(graph, origin, goal, probe=None):
+    """ Visita todos os vizinhos partindo do vértice origin até encontrar o
+    vértice goal.
+
+    Retorna uma tupla com os vértices visitados e o caminho mais curto em
+    forma de lista.
+
+    Parâmetros:
+    - origin : vértice inicial
+    - goal : vértice objetivo
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional
+    """
+    return _traverse(graph, origin, goal, fifo=True, probe=probe)[:2]
+
+
+##########################
+# MÉTODO DE PROFUNDIDADE #
+##########################
+
+def dfs(graph, origin, goal, probe=None):
+    """ Inicia no vértice origin, voltando até encontrar o vértice goal.
+
+    Retorna uma tupla com os vértices visitados e o caminho mais curto em
+    forma de lista.
+
+    Parâmetros:
+    - origin : vértice inicial
+    - goal : vértice objetivo
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional
+    """
+    return _traverse(graph, origin, goal, fifo=False, probe=probe)[:2]
+
+
+###################################
+# MÉTODO DE PROFUNDIDADE LIMITADA #
+###################################
+
+def lim_dfs(graph, origin, goal, lim, probe=None):
+    """ Inicia no vértice origin, voltando até encontrar o vértice goal.
+
+    Muda o sentido da busca caso alcançe o limite de passos estabelecido.
+    Retorna uma tupla com os vértices visitados e o caminho mais curto em
+    forma de lista.
+
+    Parâmetros:
+    - origin : vértice inicial
+    - goal : vértice objetivo
+    - lim : limite de passos em um determinado sentido
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional
+    """
+    return _traverse(graph, origin, goal, fifo=False, lim=lim,
+                     probe=probe)[:2]
+
+
+####################################
+# MÉTODO DE PROFUNDIDADE ITERATIVA #
+####################################
+
+def deepening_dfs(graph, origin, goal, lim, reuse_frontier=False,
+                  passes=None, probe=None):
+    """ Busca em profundidade com limite de profundidade, repetida com o
+    limite aumentado em um nível até encontrar o vértice goal.
+
+    Cada entrada da pilha guarda a profundidade real do vértice, e um vértice
+    só é empilhado novamente quando alcançado por um caminho mais raso. As
+    passadas são feitas em um laço, sem recursão. Com reuse_frontier, cada
+    nova passada continua a partir dos vértices cortados no limite da
+    passada anterior, sem expandir de novo os níveis mais rasos.
+
+    Retorna uma tupla com os vértices visitados e o caminho encontrado em
+    forma de lista.
+
+    Parâmetros:
+    - origin : vértice inicial
+    - goal : vértice objetivo
+    - lim : limite de profundidade da primeira passada
+    - reuse_frontier : continua da fronteira da passada anterior
+    - passes : lista que recebe o número de vértices expandidos por passada
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional
+    """
+    origin, goal = graph.vertex_id(origin), graph.vertex_id(goal)
+    visited = None
+    boundary = [(origin, 0)]    # Vértices cortados pelo limite.
+    while boundary:
+        if visited is None or not reuse_frontier:
+            marks = vertex_marks(graph)
+            visited = []
+            parents = vertex_table(graph, None)
+            depths = vertex_table(graph, INFINITY)
+            depths[origin] = 0
+            stack = [(origin, 0)]
+        else:
+            stack = boundary[::-1]
+        push = stack.append
+        if probe is not None:
+            def push(entry, stack=stack):
+                stack.append(entry)
+                probe.push(entry[0], len(stack))
+        boundary = []
+        expanded = 0
+        while stack:
+            vertex, depth = stack.pop()
+            if depth > depths[vertex]:
+                continue    # Já alcançado por um caminho mais raso.
+            if not marks[vertex]:
+                marks[vertex] = 1
+                visited.append(vertex)
+            if depth >= lim:
+                boundary.append((vertex, depth))
+                continue
+            expanded += 1
+            if probe is not None:
+                probe.expand(vertex)
+            for neighbour in graph.neighbours(vertex):
+                if neighbour == goal:
+                    if passes is not None:
+                        passes.append(expanded)
+                    if probe is not None:
+                        probe.goal(goal)
+                    path = build_path(parents, origin, vertex) + [goal]
+                    return search_result(graph, visited, path, probe)
+                if depth + 1 < depths[neighbour]:
+                    depths[neighbour] = depth + 1
+                    parents[neighbour] = vertex
+                    if not marks[neighbour]:
+                        marks[neighbour] = 1
+                        visited.append(neighbour)
+                    push((neighbour, depth + 1))
+        if passes is not None:
+            passes.append(expanded)
+        lim += 1
+    return search_result(graph, visited, None)
+
+
+#####################################
+# MÉTODO DE AMPLITUDE BI-DIRECIONAL #
+#####################################
+
+def bidir_bfs(graph, origin, goal, reverse=None, probe=None):
+    """ Busca em amplitude partindo ao mesmo tempo do vértice origin e do
+    vértice goal, até que as duas buscas se encontrem.
+
+    Cada lado possui sua própria fronteira e seu próprio mapa de pais. A
+    cada passo expandimos um nível inteiro da menor fronteira, e o caminho
+    só é montado quando um vértice descoberto por um lado já foi
+    descoberto pelo outro.
+
+    Retorna uma tupla com os vértices visitados e o caminho mais curto em
+    forma de lista.
+
+    Parâmetros:
+    - origin : vértice inicial
+    - goal : vértice objetivo
+    - reverse : grafo com as arestas invertidas, usado pela busca que parte
+      de goal (por padrão o próprio grafo, que assume arestas de mão dupla)
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional
+    """
+    origin, goal = graph.vertex_id(origin), graph.vertex_id(goal)
+    if origin == goal:
+        if probe is not None:
+            probe.goal(goal)
+        return search_result(graph, [origin], [origin], probe)
+    graphs = (graph, graph if reverse is None else reverse)
+    marks = vertex_marks(graph)
+    visited = []
+    parents = (vertex_table(graph, None), vertex_table(graph, None))
+    depths = (vertex_table(graph, 0), vertex_table(graph, 0))
+    parents[0][origin] = origin
+    parents[1][goal] = goal
+    frontiers = (deque([origin]), deque([goal]))
+
+    while frontiers[0] and frontiers[1]:
+        # Expandimos sempre a menor fronteira:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        frontier = frontiers[side]
+        own_parents, own_depths = parents[side], depths[side]
+        other_parents, other_depths = parents[1 - side], depths[1 - side]
+        best, meeting = None, None
+        # Completamos o nível atual antes de escolher o melhor encontro:
+        for _ in range(len(frontier)):
+            vertex = frontier.popleft()
+            if not marks[vertex]:   # Pode ter sido visitado pelo outro lado.
+                marks[vertex] = 1
+                visited.append(vertex)
+            if probe is not None:
+                probe.expand(vertex)
+            depth = own_depths[vertex] + 1
+            for neighbour in graphs[side].neighbours(vertex):
+                if own_parents[neighbour] is not None:
+                    continue
+                own_parents[neighbour] = vertex
+                own_depths[neighbour] = depth
+                frontier.append(neighbour)
+                if probe is not None:
+                    probe.push(neighbour,
+                               len(frontiers[0]) + len(frontiers[1]))
+                if other_parents[neighbour] is not None and (
+                        best is None or depth + other_depths[neighbour] < best):
+                    best, meeting = depth + other_depths[neighbour], neighbour
+        if meeting is not None:
+            if probe is not None:
+                probe.goal(goal)
+            return search_result(graph, visited,
+                                 _join_paths(parents, origin, goal, meeting),
+                                 probe)
+    return search_result(graph, visited, None)
+
+
+def _join_paths(parents, origin, goal, meeting):
+    """ Une os caminhos origin -> meeting e meeting -> goal seguindo os mapas
+    de pais das duas buscas.
+    """
+    path = [meeting]
+    vertex = meeting
+    while vertex != origin:
+        vertex = parents[0][vertex]
+        path.append(vertex)
+    path.reverse()
+    vertex = meeting
+    while vertex != goal:
+        vertex = parents[1][vertex]
+        path.append(vertex)
+    return path
+
+
+def bidir_uniform_cost_search(graph, origin, goal, reverse=None,
+                              probe=None):
+    """ Busca de custo uniforme partindo ao mesmo tempo do vértice origin e
+    do vértice goal (Dijkstra bidirecional).
+
+    Retorna uma tupla com os vértices visitados, o caminho de menor custo em
+    forma de lista e o custo total do caminho.
+
+    Parâmetros:
+    - origin : vértice inicial
+    - goal : vértice objetivo
+    - reverse : grafo com as arestas invertidas, usado pela busca que parte
+      de goal (por padrão o próprio grafo, que assume arestas de mão dupla)
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional
+    """
+    origin, goal = graph.vertex_id(origin), graph.vertex_id(goal)
+    cost, path, settled = bidirectional_dijkstra(
+        graph, graph if reverse is None else reverse, origin, goal, probe)
+    # Um vértice pode ser fixado pelos dois lados:
+    visited, path = search_result(graph, list(dict.fromkeys(settled)), path,
+                                  probe)
+    return (visited, path, cost if path is not None else None)
+
+
+############################
+# MÉTODO DE CUSTO UNIFORME #
+############################
+
+def uniform_cost_search(graph, origin, goal, probe=None):
+    """ Expande sempre o vértice de menor custo acumulado (Dijkstra), até
+    fixar o vértice goal.
+
+    Retorna uma tupla com os vértices visitados, o caminho de menor custo em
+    forma de lista e o custo total do caminho.
+
+    Parâmetros:
+    - origin : vértice inicial
+    - goal : vértice objetivo
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional
+    """
+    origin, goal = graph.vertex_id(origin), graph.vertex_id(goal)
+    distances, predecessors, settled = dijkstra(graph, origin, goal, probe)
+    path = build_path(predecessors, origin, goal)
+    visited, path = search_result(graph, settled, path, probe)
+    return (visited, path, distances[goal] if path is not None else None)
+
+
+#############
+# MÉTODO A* #
+#############
+
+def astar_search(graph, origin, goal, heuristic, probe=None):
+    """ Expande o vértice de menor custo acumulado somado à estimativa da
+    distância restante, até fixar o vértice goal.
+
+    Retorna uma tupla com os vértices visitados, o caminho de menor custo em
+    forma de lista e o custo total do caminho.
+
+    Parâmetros:
+    - origin : vértice inicial
+    - goal : vértice objetivo
+    - heuristic : heurística admissível já calibrada para o grafo
+      (por exemplo, CoordinateHeuristic)
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional
+    """
+    origin, goal = graph.vertex_id(origin), graph.vertex_id(goal)
+    distances, predecessors, settled = astar(graph, origin, goal,
+                                             heuristic.bound(goal), probe)
+    path = build_path(predecessors, origin, goal)
+    visited, path = search_result(graph, settled, path, probe)
+    return (visited, path, distances[goal] if path is not None else None)
+
+
+###########################################
+# MÉTODO DE HIERARQUIAS DE CONTRAÇÃO (CH) #
+###########################################
+
+def ch_search(hierarchy, origin, goal, probe=None):
+    """ Sobe na hierarquia de contração a partir da origem e do destino ao
+    mesmo tempo, até que as duas buscas não possam mais melhorar o ponto de
+    encontro, e desempacota os atalhos do caminho encontrado.
+
+    Retorna uma tupla com os vértices visitados, o caminho de menor custo em
+    forma de lista e o custo total do caminho.
+
+    Parâmetros:
+    - hierarchy : hierarquia pré-processada (ContractionHierarchy)
+    - origin : vértice inicial
+    - goal : vértice objetivo
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional
+    """
+    origin, goal = hierarchy.vertex_id(origin), hierarchy.vertex_id(goal)
+    cost, path, settled = hierarchy.query(origin, goal, probe)
+    # Um vértice pode ser fixado pelos dois lados:
+    visited, path = search_result(hierarchy, list(dict.fromkeys(settled)),
+                                  path, probe)
+    return (visited, path, cost if path is not None else None)
+
+
+def matrix_search(matrix, origin, goal, probe=None):
+    """ Responde a consulta com a matriz de distâncias entre todos os pares,
+    sem nenhuma busca: o caminho é montado seguindo os próximos passos, em
+    tempo proporcional ao seu tamanho.
+
+    Retorna uma tupla com os vértices visitados (os do caminho), o caminho
+    de menor custo em forma de lista e o custo total do caminho.
+
+    Parâmetros:
+    - matrix : matriz pré-processada (lib.all_pairs.DistanceMatrix)
+    - origin : vértice inicial
+    - goal : vértice objetivo
+    - probe : sonda de instrumentação (lib.instrumentation.Probe), opcional
+    """
+    origin, goal = matrix.vertex_id(origin), matrix.vertex_id(goal)
+    cost, path = matrix.query(origin, goal)
+    visited = path if path is not None else [origin]
+    if probe is not None:
+        for vertex in visited:
+            probe.expand(vertex)
+    visited, path = search_result(matrix, list(visited), path, probe)
+    return (visited, path, cost if path is not None else None)
+
+
+#####################
+# CONSULTAS EM LOTE #
+#####################
+
+def _hierarchy_search(graph, origin, goal, hierarchy, probe=None):
+    """ Adapta ch_search para a assinatura (graph, origin, goal). """
+    return ch_search(hierarchy, origin, goal, probe)
+
+
+def _matrix_search(graph, origin, goal, matrix, probe=None):
+    """ Adapta matrix_search para a assinatura (graph, origin, goal). """
+    return matrix_search(matrix, origin, goal, probe)
+
+
+def search_methods(lim=7, reverse=None, heuristic=None, landmarks=None,
+                   hierarchy=None, matrix=None):
+    """ Retorna as funções de busca indexadas pelo nome usado nas consultas
+    em lote (lib.batch.run_batch). Todas recebem (graph, origin, goal) e,
+    opcionalmente, uma sonda de instrumentação no parâmetro probe.
+
+    Os métodos que dependem de estruturas pré-processadas só são incluídos
+    quando elas são informadas.
+
+    Parâmetros:
+    - lim : limite dos métodos de profundidade limitada e iterativa
+    - reverse : grafo invertido usado pelos métodos bidirecionais
+    - heuristic : heurística do método A*
+    - landmarks : índice de landmarks do método ALT
+    - hierarchy : hierarquia de contração do método CH
+    - matrix : matriz de distâncias entre todos os pares (método matrix)
+    """
+    methods = {'bfs': bfs,
+               'dfs': dfs,
+               'lim_dfs': partial(lim_dfs, lim=lim),
+               'deepening_dfs': partial(deepening_dfs, lim=lim),
+               'bidir_bfs': partial(bidir_bfs, reverse=reverse),
+               'uniform_cost_search': uniform_cost_search,
+               'bidir_uniform_cost_search': partial(
+                   bidir_uniform_cost_search, reverse=reverse)}
+    if heuristic is not None:
+        methods['astar'] = partial(astar_search, heuristic=heuristic)
+    if landmarks is not None:
+        methods['alt'] = partial(astar_search, heuristic=landmarks)
+    if hierarchy is not None:
+        methods['ch'] = partial(_hierarchy_search, hierarchy=hierarchy)
+    if matrix is not None:
+        methods['matrix'] = partial(_matrix_search, matrix=matrix)
+    return methods
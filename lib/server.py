@@ -0,0 +1,417 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import asyncio
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_all_start_methods, get_context
+from os import cpu_count
+from threading import Thread
+from urllib.parse import parse_qsl, urlsplit
+from lib.batch import BatchResult, result_dict
+from lib.instrumentation import (DeadlineExceeded, DeadlineProbe,
+                                 SearchMetrics, run_query)
+
+MAX_BODY_SIZE = 1 << 20     # Maior corpo de requisição aceito, em bytes.
+DEFAULT_TIMEOUT = 10.0      # Prazo padrão (e máximo) de uma consulta, em s.
+
+_STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                405: 'Method Not Allowed', 500: 'Internal Server Error',
+                504: 'Gateway Timeout'}
+_ROUTES = ('/route', '/metrics', '/reload')
+_TIMEOUT_ERROR = 'tempo esgotado'   # Erro das consultas fora do prazo.
+
+_worker_states = dict()     # Geração -> (grafo, funções de busca).
+
+
+class RouteServer:
+    """ Servidor HTTP/JSON de rotas, feito apenas com a biblioteca padrão.
+
+    As buscas são executadas em um conjunto de processos (ou de threads),
+    e o laço de eventos só lê as requisições e escreve as respostas, de modo
+    que uma busca demorada não impede o atendimento de outros clientes.
+    Rotas:
+    - GET /route?origin=...&goal=...&method=...&timeout=... (ou POST com um
+      objeto JSON com as mesmas chaves): executa uma consulta e retorna o
+      resultado no formato de BatchResult;
+    - GET /metrics : métricas das consultas e do servidor no formato de
+      texto do Prometheus;
+    - POST /reload : carrega o grafo novamente e passa a usá-lo.
+
+    Consultas idênticas (origem, destino, método) em andamento são atendidas
+    por uma única busca, desde que o prazo dela não termine antes do prazo
+    da nova requisição; caso contrário, uma nova busca, com o prazo maior, é
+    iniciada e passa a receber as requisições seguintes. Cada requisição
+    espera, no máximo, até o fim do seu próprio prazo. Ao término do prazo a
+    busca é interrompida pela DeadlineProbe (lib.instrumentation) e a
+    resposta tem o código 504.
+
+    A recarga monta o novo grafo e o novo conjunto de processos sem
+    interromper o atendimento e só então os troca, de uma vez. As consultas
+    já iniciadas terminam com o grafo antigo. Como o servidor já tem threads
+    em execução quando recarrega, os processos são criados com os métodos
+    'forkserver' ou 'spawn', e nunca com 'fork'.
+
+    Parâmetros:
+    - loader : função sem parâmetros que retorna uma tupla (grafo, funções
+      de busca), usada na carga inicial e em cada recarga.
+    - workers : número de processos (None usa todos os núcleos).
+    - threads : usa threads em vez de processos.
+    - timeout : prazo padrão e máximo de cada consulta, em segundos.
+    """
+
+    def __init__(self, loader, workers=None, threads=False,
+                 timeout=DEFAULT_TIMEOUT):
+        self.loader = loader
+        self.workers = workers or cpu_count() or 1
+        self.threads = threads
+        self.timeout = timeout
+        self.metrics = SearchMetrics()
+        self.requests = dict()      # (rota, código) -> total de respostas.
+        self.coalesced = 0          # Requisições atendidas por outra busca.
+        self.timeouts = 0           # Consultas interrompidas pelo prazo.
+        self.reloads = 0
+        self._generation = 0
+        # (geração, nomes dos métodos, executor, número de vértices):
+        self._state = None
+        self._inflight = dict()     # Chave da consulta -> (futuro, prazo).
+        self._reload_lock = None
+
+    def load(self):
+        """ Carrega o grafo pela primeira vez (bloqueante). """
+        self._state = self._build(*self.loader())
+
+    async def reload(self):
+        """ Carrega o grafo novamente, sem bloquear o laço de eventos, e
+        troca o grafo em uso. Retorna a nova geração.
+        """
+        if self._reload_lock is None:
+            self._reload_lock = asyncio.Lock()
+        async with self._reload_lock:
+            loop = asyncio.get_running_loop()
+            graph, methods = await loop.run_in_executor(None, self.loader)
+            state = await loop.run_in_executor(None, self._build, graph,
+                                               methods)
+            old, self._state = self._state, state
+            self.reloads += 1
+            if old is not None:
+                _retire(old)
+            return state[0]
+
+    def _build(self, graph, methods):
+        """ Cria o executor de uma nova geração do grafo. """
+        self._generation += 1
+        generation = self._generation
+        if self.threads:
+            _init_worker(generation, graph, methods)
+            executor = ThreadPoolExecutor(self.workers)
+        else:
+            executor = ProcessPoolExecutor(
+                self.workers, mp_context=_pool_context(),
+                initializer=_init_worker,
+                initargs=(generation, graph, methods))
+        return (generation, frozenset(methods), executor, len(graph))
+
+    def close(self):
+        """ Encerra o executor em uso. """
+        if self._state is not None:
+            self._state[2].shutdown(wait=False, cancel_futures=True)
+            _worker_states.pop(self._state[0], None)
+            self._state = None
+
+    async def query(self, origin, goal, method, timeout=None):
+        """ Executa uma consulta no executor e retorna um BatchResult.
+
+        Lança asyncio.TimeoutError quando o prazo termina antes do
+        resultado.
+
+        Parâmetros:
+        - origin : nome do vértice inicial.
+        - goal : nome do vértice objetivo.
+        - method : nome do método de busca.
+        - timeout : prazo da consulta em segundos (no máximo self.timeout).
+        """
+        if timeout is None or timeout > self.timeout:
+            timeout = self.timeout
+        deadline = time.time() + timeout
+        generation, _, executor, _ = self._state
+        key = (generation, origin, goal, method)
+        future, shared_deadline = self._inflight.get(key, (None, 0))
+        if future is None or shared_deadline < deadline:
+            # A busca em andamento (se houver) seria interrompida antes do
+            # prazo desta requisição, então iniciamos outra:
+            future = asyncio.wrap_future(executor.submit(
+                _solve, generation, origin, goal, method, deadline))
+            self._inflight[key] = (future, deadline)
+            future.add_done_callback(
+                lambda done: self._forget(key, done))
+            future.add_done_callback(self._observe)
+        else:
+            self.coalesced += 1
+        result = await asyncio.wait_for(asyncio.shield(future),
+                                        max(deadline - time.time(), 0))
+        return result[0]
+
+    def _forget(self, key, future):
+        """ Remove uma busca terminada das buscas em andamento, se ela não
+        tiver sido substituída por outra com prazo maior.
+        """
+        if self._inflight.get(key, (None,))[0] is future:
+            del self._inflight[key]
+
+    def _observe(self, future):
+        """ Acumula as medidas de uma busca terminada. """
+        if future.cancelled() or future.exception() is not None:
+            return
+        result, stats = future.result()
+        if stats is not None:
+            self.metrics.observe(stats)
+        if result.error == _TIMEOUT_ERROR:
+            self.timeouts += 1
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        """ Atende as requisições até que a tarefa seja cancelada. """
+        if self._state is None:
+            await asyncio.get_running_loop().run_in_executor(None, self.load)
+        server = await asyncio.start_server(self._connection, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    async def _connection(self, reader, writer):
+        """ Atende as requisições de uma conexão (HTTP/1.1 com keep-alive).
+        """
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except ValueError as error:
+                    writer.write(_response(*_json(400, {'error': str(error)}),
+                                           keep_alive=False))
+                    break
+                if request is None:
+                    break
+                verb, target, headers, body, keep_alive = request
+                route = urlsplit(target).path
+                if route not in _ROUTES:
+                    route = 'other'
+                try:
+                    status, content_type, payload = await self._dispatch(
+                        verb, target, body)
+                except Exception as error:
+                    status, content_type, payload = _json(
+                        500, {'error': repr(error)})
+                key = (route, status)
+                self.requests[key] = self.requests.get(key, 0) + 1
+                writer.write(_response(status, content_type, payload,
+                                       keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError,
+                asyncio.CancelledError):
+            pass    # Conexão encerrada pelo cliente ou pelo servidor.
+        finally:
+            writer.close()
+
+    async def _dispatch(self, verb, target, body):
+        """ Encaminha a requisição e retorna (código, tipo, conteúdo). """
+        url = urlsplit(target)
+        if url.path == '/route':
+            if verb == 'GET':
+                params = dict(parse_qsl(url.query))
+            elif verb == 'POST':
+                try:
+                    params = json.loads(body or b'{}')
+                except ValueError as error:
+                    return _json(400, {'error': 'JSON inválido: %s' % error})
+                if not isinstance(params, dict):
+                    return _json(400, {'error': 'esperado um objeto JSON'})
+            else:
+                return _json(405, {'error': 'use GET ou POST'})
+            return await self._route(params)
+        if url.path == '/metrics':
+            if verb != 'GET':
+                return _json(405, {'error': 'use GET'})
+            return (200, 'text/plain; version=0.0.4; charset=utf-8',
+                    self.to_prometheus().encode('utf-8'))
+        if url.path == '/reload':
+            if verb != 'POST':
+                return _json(405, {'error': 'use POST'})
+            generation = await self.reload()
+            return _json(200, {'generation': generation,
+                               'vertices': self._state[3]})
+        return _json(404, {'error': 'rota desconhecida: %s' % url.path})
+
+    async def _route(self, params):
+        """ Atende /route a partir dos parâmetros já interpretados. """
+        origin, goal = params.get('origin'), params.get('goal')
+        method = params.get('method', 'uniform_cost_search')
+        if not isinstance(origin, str) or not isinstance(goal, str):
+            return _json(400, {'error': 'origin e goal são obrigatórios'})
+        if not isinstance(method, str) or method not in self._state[1]:
+            return _json(400, {'error': 'método desconhecido: %s' % method})
+        timeout = params.get('timeout')
+        if timeout is not None:
+            try:
+                timeout = float(timeout)
+            except (TypeError, ValueError):
+                return _json(400, {'error': 'timeout inválido'})
+        try:
+            result = await self.query(origin, goal, method, timeout)
+        except asyncio.TimeoutError:
+            result = BatchResult(origin, goal, method, None, None, 0,
+                                 _TIMEOUT_ERROR)
+        if result.error == _TIMEOUT_ERROR:
+            status = 504
+        elif result.error is not None:
+            status = 404
+        else:
+            status = 200
+        return _json(status, result_dict(result))
+
+    def to_prometheus(self):
+        """ Retorna as métricas das consultas (SearchMetrics) seguidas das
+        métricas do servidor, no formato de texto do Prometheus.
+        """
+        lines = [self.metrics.to_prometheus().rstrip('\n')]
+        for name, kind, help_text, samples in (
+                ('requests_total', 'counter', 'Respostas HTTP enviadas.',
+                 [('{route="%s",code="%d"}' % key, count) for key, count in
+                  sorted(self.requests.items())]),
+                ('coalesced_requests_total', 'counter',
+                 'Requisições atendidas por uma busca já em andamento.',
+                 [('', self.coalesced)]),
+                ('deadline_exceeded_total', 'counter',
+                 'Buscas interrompidas pelo prazo.', [('', self.timeouts)]),
+                ('inflight_queries', 'gauge', 'Buscas em andamento.',
+                 [('', len(self._inflight))]),
+                ('graph_reloads_total', 'counter', 'Recargas do grafo.',
+                 [('', self.reloads)]),
+                ('graph_generation', 'gauge', 'Geração do grafo em uso.',
+                 [('', self._state[0] if self._state else 0)])):
+            lines.append('# HELP busca_grafos_server_%s %s' % (name,
+                                                                help_text))
+            lines.append('# TYPE busca_grafos_server_%s %s' % (name, kind))
+            for labels, value in samples:
+                lines.append('busca_grafos_server_%s%s %d' % (name, labels,
+                                                              value))
+        return '\n'.join(line for line in lines if line) + '\n'
+
+
+def run_server(loader, host='127.0.0.1', port=8080, workers=None,
+               threads=False, timeout=DEFAULT_TIMEOUT):
+    """ Cria um RouteServer e o executa até uma interrupção (Ctrl+C).
+
+    Parâmetros:
+    - loader : função que retorna (grafo, funções de busca).
+    - host, port : endereço do servidor.
+    - workers, threads, timeout : como em RouteServer.
+    """
+    server = RouteServer(loader, workers, threads, timeout)
+    server.load()
+    print('Servidor em http://%s:%d' % (host, port))
+    try:
+        asyncio.run(server.serve(host, port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+##########################
+# PROCESSOS (OU THREADS) #
+##########################
+
+def _init_worker(generation, graph, methods):
+    """ Guarda o grafo e as funções de busca de uma geração. """
+    _worker_states[generation] = (graph, methods)
+
+
+def _solve(generation, origin, goal, method, deadline):
+    """ Executa uma consulta com prazo, retornando (BatchResult,
+    QueryStats).
+    """
+    graph, methods = _worker_states[generation]
+    if time.time() >= deadline:     # O prazo terminou ainda na fila.
+        return (BatchResult(origin, goal, method, None, None, 0,
+                            _TIMEOUT_ERROR), None)
+    probe = DeadlineProbe(deadline)
+    try:
+        result, stats = run_query(methods[method], graph, origin, goal,
+                                  method, probe)
+    except DeadlineExceeded:
+        return (BatchResult(origin, goal, method, None, None,
+                            probe.expanded, _TIMEOUT_ERROR), None)
+    except KeyError as error:
+        return (BatchResult(origin, goal, method, None, None, 0,
+                            'desconhecido: %s' % error), None)
+    cost = result[2] if len(result) > 2 else None
+    return (BatchResult(origin, goal, method, result[1], cost,
+                        len(result[0]), None), stats)
+
+
+def _pool_context():
+    """ Retorna o contexto de multiprocessing dos processos de busca.
+
+    Um processo com threads em execução não deve usar 'fork' (a cópia pode
+    herdar travas ocupadas por outras threads), então usamos 'forkserver'
+    quando disponível e 'spawn' nos demais casos.
+    """
+    methods = get_all_start_methods()
+    return get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def _retire(state):
+    """ Encerra o executor de uma geração substituída depois que as suas
+    buscas em andamento terminarem, sem bloquear o laço de eventos.
+    """
+    def shutdown():
+        state[2].shutdown(wait=True)
+        _worker_states.pop(state[0], None)
+    Thread(target=shutdown, daemon=True).start()
+
+
+async def _read_request(reader):
+    """ Lê uma requisição HTTP. Retorna None ao fim da conexão ou uma tupla
+    (verbo, alvo, cabeçalhos, corpo, keep_alive).
+    """
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        verb, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise ValueError('linha de requisição inválida')
+    headers = dict()
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0) or 0)
+    if length > MAX_BODY_SIZE:
+        raise ValueError('corpo muito grande')
+    body = await reader.readexactly(length) if length else b''
+    connection = headers.get('connection', '').lower()
+    if version == 'HTTP/1.0':
+        keep_alive = connection == 'keep-alive'
+    else:
+        keep_alive = connection != 'close'
+    return (verb, target, headers, body, keep_alive)
+
+
+def _json(status, data):
+    return (status, 'application/json; charset=utf-8',
+            json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+
+def _response(status, content_type, payload, keep_alive=True):
+    head = 'HTTP/1.1 %d %s\r\nContent-Type: %s\r\nContent-Length: %d\r\n' \
+        'Connection: %s\r\n\r\n' % (
+            status, _STATUS_TEXT.get(status, ''), content_type, len(payload),
+            'keep-alive' if keep_alive else 'close')
+    return head.encode('latin-1') + payload
@@ -0,0 +1,121 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+
+class SpatialGrid:
+    """ Índice espacial em grade uniforme para retângulos alinhados aos eixos.
+
+    Cada item é registrado em todas as células da grade tocadas pelo seu
+    retângulo. Uma consulta visita apenas as células cobertas pela área
+    consultada, de modo que encontrar os itens sob o ponteiro do mouse ou
+    dentro da área visível não depende do total de itens no mapa.
+
+    Os retângulos podem ser objetos com left, top, right e bottom (como o
+    Rect do pygame) ou tuplas (x, y, largura, altura). Assim como em
+    Rect.colliderect, retângulos que apenas se tocam na borda não se
+    interceptam, e retângulos vazios não interceptam nenhum outro.
+
+    Parâmetros:
+    - cell_size : lado de cada célula da grade, em pixels.
+    """
+
+    def __init__(self, cell_size=32):
+        self.cell_size = cell_size
+        self._cells = dict()    # (coluna, linha) -> itens da célula.
+        self._boxes = dict()    # Item -> (esquerda, topo, direita, base).
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def __contains__(self, item):
+        return item in self._boxes
+
+    def insert(self, item, rect):
+        """ Registra um item com o seu retângulo, substituindo o retângulo
+        anterior caso o item já esteja no índice.
+
+        Parâmetros:
+        - item : objeto (hashable) a ser indexado.
+        - rect : retângulo do item.
+        """
+        if item in self._boxes:
+            self.remove(item)
+        box = _box(rect)
+        self._boxes[item] = box
+        for cell in self._cells_of(box):
+            self._cells.setdefault(cell, dict())[item] = None
+
+    def remove(self, item):
+        """ Remove um item do índice (sem erro caso ele não exista).
+
+        Parâmetros:
+        - item : objeto registrado com insert().
+        """
+        box = self._boxes.pop(item, None)
+        if box is None:
+            return
+        for cell in self._cells_of(box):
+            items = self._cells[cell]
+            del items[item]
+            if not items:
+                del self._cells[cell]
+
+    def clear(self):
+        """ Remove todos os itens. """
+        self._cells.clear()
+        self._boxes.clear()
+
+    def query(self, rect):
+        """ Retorna a lista de itens cujo retângulo intercepta rect, na
+        ordem em que foram inseridos em cada célula.
+
+        Parâmetros:
+        - rect : área consultada (por exemplo, o retângulo do ponteiro ou a
+          área visível da janela).
+        """
+        left, top, right, bottom = _box(rect)
+        if left >= right or top >= bottom:
+            return []
+        found = dict()
+        boxes = self._boxes
+        for cell in self._cells_of((left, top, right, bottom)):
+            for item in self._cells.get(cell, ()):
+                if item in found:
+                    continue
+                item_left, item_top, item_right, item_bottom = boxes[item]
+                if item_left < right and left < item_right and \
+                        item_top < bottom and top < item_bottom and \
+                        item_left < item_right and item_top < item_bottom:
+                    found[item] = None
+        return list(found)
+
+    def _cells_of(self, box):
+        """ Percorre as células da grade cobertas por um retângulo. """
+        size = self.cell_size
+        left, top, right, bottom = box
+        for column in range(int(left // size), int(right // size) + 1):
+            for row in range(int(top // size), int(bottom // size) + 1):
+                yield (column, row)
+
+
+def segment_box(start, end, width=1):
+    """ Retorna o retângulo (x, y, largura, altura) que envolve um segmento
+    de reta desenhado com a espessura informada.
+
+    Parâmetros:
+    - start : ponto inicial (x, y).
+    - end : ponto final (x, y).
+    - width : espessura da linha, em pixels.
+    """
+    left = min(start[0], end[0]) - width
+    top = min(start[1], end[1]) - width
+    return (left, top, abs(end[0] - start[0]) + 2 * width,
+            abs(end[1] - start[1]) + 2 * width)
+
+
+def _box(rect):
+    """ Converte um retângulo em (esquerda, topo, direita, base). """
+    if hasattr(rect, 'left'):
+        return (rect.left, rect.top, rect.right, rect.bottom)
+    x, y, width, height = rect
+    return (x, y, x + width, y + height)
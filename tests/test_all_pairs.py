@@ -0,0 +1,103 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import os
+import pickle
+import random
+import tempfile
+import unittest
+from lib.all_pairs import DistanceMatrix
+from lib.compact_graph import CompactGraph
+from lib.dijkstra import dijkstra, INFINITY
+from lib.instrumentation import Probe
+from lib.search import Graph, search_methods
+
+
+def random_graph(seed, count, arcs):
+    """ Gera um grafo dirigido aleatório com pesos inteiros, em geral com
+    pares inalcançáveis.
+    """
+    rng = random.Random(seed)
+    names = ['v%d' % vertex for vertex in range(count)]
+    graph = Graph((name, list()) for name in names)
+    for _ in range(arcs):
+        origin, destiny = rng.choice(names), rng.choice(names)
+        if origin != destiny and destiny not in graph.neighbours(origin):
+            graph[origin].append([destiny, float(rng.randint(1, 10))])
+    return graph
+
+
+class DistanceMatrixTest(unittest.TestCase):
+    """ Compara as duas construções da matriz entre si e com o Dijkstra. """
+
+    def check(self, graph, matrix):
+        compact = CompactGraph.from_graph(graph)
+        self.assertEqual(matrix.names, list(compact.names))
+        for origin in range(len(compact)):
+            distances = dijkstra(compact, origin)[0]
+            for goal in range(len(compact)):
+                expected = distances[goal]
+                self.assertEqual(matrix.distances[origin, goal], expected)
+                cost, path = matrix.query(origin, goal)
+                if expected == INFINITY:
+                    self.assertIsNone(path)
+                    self.assertEqual(matrix.next_hop[origin, goal], -1)
+                    continue
+                self.assertEqual((path[0], path[-1]), (origin, goal))
+                self.assertEqual(cost, expected)
+                self.assertEqual(sum(
+                    min(weight for target, weight in compact.arcs(vertex)
+                        if target == neighbour)
+                    for vertex, neighbour in zip(path, path[1:])), expected)
+
+    def test_random_graphs(self):
+        unreachable = 0
+        for seed in range(15):
+            graph = random_graph(seed, 25, 50 + 10 * seed)
+            floyd = DistanceMatrix.floyd_warshall(graph)
+            unreachable += int((floyd.distances == INFINITY).sum())
+            self.check(graph, floyd)
+            self.check(graph, DistanceMatrix.parallel_dijkstra(graph, 1))
+        self.assertGreater(unreachable, 0)
+
+    def test_process_pool(self):
+        graph = random_graph(99, 40, 120)
+        self.check(graph, DistanceMatrix.parallel_dijkstra(graph, 2))
+
+    def test_save_load_and_search(self):
+        graph = random_graph(7, 20, 60)
+        matrix = DistanceMatrix.build(graph)
+        with tempfile.TemporaryDirectory() as directory:
+            prefix = os.path.join(directory, 'distancias')
+            DistanceMatrix.floyd_warshall(random_graph(8, 20, 60)).save(
+                prefix)
+            matrix.save(prefix)
+            # Só a geração mais recente permanece:
+            self.assertEqual(len(os.listdir(directory)), 3)
+            loaded = DistanceMatrix.load(prefix)
+            copy = pickle.loads(pickle.dumps(loaded))
+            for other in (loaded, copy):
+                self.assertEqual(other.names, matrix.names)
+                self.assertTrue((other.distances == matrix.distances).all())
+                self.assertTrue((other.next_hop == matrix.next_hop).all())
+            method = search_methods(matrix=copy)['matrix']
+            self.check_method(graph, matrix, method)
+
+    def check_method(self, graph, matrix, method):
+        for origin in graph:
+            expected = method(graph, origin, origin)
+            self.assertEqual((expected[1], expected[2]), ([origin], 0.0))
+            for goal in graph:
+                probe = Probe()
+                visited, path, cost = method(graph, origin, goal, probe=probe)
+                self.assertEqual(path, matrix.route(origin, goal))
+                if path is None:
+                    self.assertIsNone(cost)
+                    self.assertEqual(list(visited), [origin])
+                else:
+                    self.assertEqual(cost, matrix.distance(origin, goal))
+                    self.assertEqual(list(visited), path)
+                    self.assertEqual(probe.path_allocations, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import os
+import tempfile
+import unittest
+from busca_grafos import Config
+from lib.batch import read_queries, round_cost, run_batch, write_results
+from lib.compact_graph import CompactGraph
+from lib.search import search_methods
+
+
+def failing_search(graph, origin, goal, probe=None):
+    """ Método de busca que sempre falha. """
+    raise ValueError('falha proposital')
+
+
+class RunBatchTest(unittest.TestCase):
+    """ Verifica as consultas em lote e os arquivos .csv de entrada e de
+    saída.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.graph = CompactGraph()
+        cls.graph.create_from_csv(Config.distances_path)
+        cls.methods = search_methods()
+        cls.methods['failing'] = failing_search
+
+    def test_errors_do_not_abort_the_chunk(self):
+        queries = [('Bananal', 'Ubatuba', 'uniform_cost_search'),
+                   ('Bananal', 'Ubatuba', 'failing'),
+                   ('Bananal', 'Nada', 'bfs'),
+                   ('Bananal', 'Ubatuba', 'metodo'),
+                   (['lista'], 'Ubatuba', 'bfs'),
+                   ('Taubate', 'Cunha', 'bfs')]
+        for workers in (1, 2):
+            results = list(run_batch(self.graph, queries, self.methods,
+                                     workers, chunksize=len(queries)))
+            self.assertEqual([result[:3] for result in results], queries)
+            errors = [result.error for result in results]
+            self.assertIsNone(errors[0])
+            self.assertEqual(errors[1],
+                             "erro: ValueError('falha proposital')")
+            self.assertEqual(errors[2], "desconhecido: 'Nada'")
+            self.assertEqual(errors[3], "desconhecido: 'metodo'")
+            self.assertEqual(errors[4], "desconhecido: ['lista']")
+            self.assertIsNone(errors[5])
+            self.assertEqual(results[5].path[-1], 'Cunha')
+
+    def test_csv_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            queries_path = os.path.join(directory, 'consultas.csv')
+            results_path = os.path.join(directory, 'resultados.csv')
+            with open(queries_path, 'w', encoding='utf-8') as queries_file:
+                queries_file.write('origem,destino,metodo\n'
+                                   'Bananal,Ubatuba,bfs\n'
+                                   'Taubate,Cunha,\n')
+            queries = list(read_queries(queries_path, 'uniform_cost_search'))
+            self.assertEqual(queries,
+                             [('Bananal', 'Ubatuba', 'bfs'),
+                              ('Taubate', 'Cunha', 'uniform_cost_search')])
+            write_results(results_path, run_batch(self.graph, queries,
+                                                  self.methods, 1))
+            with open(results_path, encoding='utf-8') as results_file:
+                lines = results_file.read().splitlines()
+        self.assertEqual(lines[0],
+                         'origin,goal,method,path,cost,visited,error')
+        self.assertTrue(lines[1].startswith('Bananal,Ubatuba,bfs,Bananal|'))
+        self.assertTrue(lines[2].startswith(
+            'Taubate,Cunha,uniform_cost_search,Taubate|Lagoinha|Cunha,97.9,'))
+        self.assertEqual(len(lines), 3)
+
+    def test_round_cost(self):
+        self.assertEqual(round_cost(297.6999990940094), 297.7)
+        self.assertEqual(round_cost(12345.600390625), 12345.6)
+        self.assertIsNone(round_cost(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
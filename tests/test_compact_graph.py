@@ -0,0 +1,64 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+from array import array
+from busca_grafos import Config
+from lib.compact_graph import CompactGraph, _read_key
+from lib.search import Graph
+
+
+class CompactGraphTest(unittest.TestCase):
+    """ Verifica a conversão entre Graph e CompactGraph. """
+
+    def setUp(self):
+        self.graph = Graph()
+        self.graph.create_from_csv(Config.distances_path)
+
+    def test_from_graph(self):
+        compact = CompactGraph.from_graph(self.graph)
+        self.assertEqual(list(compact), list(self.graph))
+        for name, neighbours in self.graph.items():
+            self.assertEqual(
+                [[compact.vertex_name(vertex), distance]
+                 for vertex, distance in compact.arcs(
+                     compact.vertex_id(name))],
+                [[neighbour, array('f', [distance])[0]]
+                 for neighbour, distance in neighbours])
+
+    def test_from_graph_keeps_isolated_vertices(self):
+        for neighbour, _ in list(self.graph['Roseira']):
+            self.graph.remove_edge('Roseira', neighbour)
+            self.graph.remove_edge(neighbour, 'Roseira')
+        compact = CompactGraph.from_graph(self.graph)
+        self.assertEqual(len(compact), len(self.graph))
+        self.assertEqual(list(compact.arcs(compact.vertex_id('Roseira'))),
+                         [])
+
+    def test_snapshot_key_refresh(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'distancias.csv')
+            snapshot = os.path.join(directory, 'distancias.csr')
+            shutil.copyfile(Config.distances_path, source)
+            graph = CompactGraph.load_csv(source, snapshot)
+            mapped = CompactGraph.load(snapshot)
+            weights = list(mapped.weights)
+            key = _read_key(snapshot)
+            # Apenas o mtime muda: a chave é atualizada em um novo arquivo,
+            # sem alterar o que já está mapeado.
+            os.utime(source, ns=(key[0] + 10 ** 9, key[0] + 10 ** 9))
+            reloaded = CompactGraph.load_csv(source, snapshot)
+            self.assertEqual(_read_key(snapshot),
+                             (key[0] + 10 ** 9,) + key[1:])
+            self.assertEqual(list(mapped.weights), weights)
+            self.assertEqual(list(reloaded.weights), list(graph.weights))
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ['distancias.csr', 'distancias.csv'])
+            del mapped, reloaded
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import os
+import random
+import tempfile
+import unittest
+from busca_grafos import Config
+from lib.compact_graph import CompactGraph
+from lib.contraction import ContractionHierarchy
+from lib.dijkstra import dijkstra, INFINITY
+from lib.search import Graph
+
+
+def random_graph(count, arcs, seed):
+    """ Gera um grafo dirigido aleatório, com pesos inteiros entre 1 e 20
+    (muitos empates) e vértices sem saída.
+    """
+    rng = random.Random(seed)
+    names = ['v%d' % vertex for vertex in range(count)]
+    graph = Graph((name, list()) for name in names)
+    for _ in range(arcs):
+        origin, destiny = rng.choice(names), rng.choice(names)
+        if origin != destiny and destiny not in graph.neighbours(origin):
+            graph[origin].append([destiny, float(rng.randint(1, 20))])
+    return graph
+
+
+class ContractionHierarchyTest(unittest.TestCase):
+    """ Compara as consultas da hierarquia com o Dijkstra. """
+
+    def check(self, graph, hierarchy):
+        for origin in graph:
+            distances = dijkstra(graph, graph.vertex_id(origin))[0]
+            for goal in graph:
+                expected = distances[graph.vertex_id(goal)]
+                cost, path, _ = hierarchy.query(hierarchy.vertex_id(origin),
+                                                hierarchy.vertex_id(goal))
+                if expected == INFINITY:
+                    self.assertIsNone(path)
+                    continue
+                self.assertAlmostEqual(cost, expected, places=3)
+                path = [hierarchy.vertex_name(vertex) for vertex in path]
+                self.assertEqual((path[0], path[-1]), (origin, goal))
+                # O caminho desempacotado deve usar apenas arestas do grafo
+                # e ter o custo retornado:
+                total = 0.0
+                for source, target in zip(path, path[1:]):
+                    total += min(distance for neighbour, distance
+                                 in graph.arcs(graph.vertex_id(source))
+                                 if graph.vertex_name(neighbour) == target)
+                self.assertAlmostEqual(total, cost, places=3)
+
+    def test_shipped_graph(self):
+        graph = CompactGraph()
+        graph.create_from_csv(Config.distances_path)
+        self.check(graph, ContractionHierarchy.build(graph))
+
+    def test_random_directed_graphs(self):
+        for seed in range(20):
+            graph = random_graph(25, 70, seed)
+            self.check(graph, ContractionHierarchy.build(graph))
+            # Buscas de testemunha curtas criam atalhos desnecessários, que
+            # não podem mudar as respostas:
+            self.check(graph, ContractionHierarchy.build(graph, 1))
+
+    def test_save_and_load(self):
+        graph = random_graph(30, 90, 0)
+        hierarchy = ContractionHierarchy.build(graph)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'grafo.ch')
+            hierarchy.save(path)
+            self.assertEqual(os.listdir(directory), ['grafo.ch'])
+            loaded = ContractionHierarchy.load(path)
+        self.assertEqual(list(loaded.rank), list(hierarchy.rank))
+        names = list(graph)
+        self.assertEqual(loaded.names, names)
+        for origin in range(len(names)):
+            for goal in range(len(names)):
+                self.assertEqual(loaded.query(origin, goal)[:2],
+                                 hierarchy.query(origin, goal)[:2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import math
+import os
+import tempfile
+import unittest
+from lib.generators import (GENERATORS, generate, grid_graph,
+                            scale_free_graph, write_csv)
+from lib.search import Graph
+
+
+def largest_component(edges, positions):
+    """ Tamanho do maior componente conexo do grafo gerado. """
+    neighbours = {name: set() for name in positions}
+    for origin, destiny, _ in edges:
+        neighbours[origin].add(destiny)
+    seen, largest = set(), 0
+    for start in neighbours:
+        if start in seen:
+            continue
+        seen.add(start)
+        stack, size = [start], 0
+        while stack:
+            vertex = stack.pop()
+            size += 1
+            for neighbour in neighbours[vertex] - seen:
+                seen.add(neighbour)
+                stack.append(neighbour)
+        largest = max(largest, size)
+    return largest
+
+
+class GeneratorsTest(unittest.TestCase):
+    """ Verifica os grafos sintéticos usados pelo lib.benchmark. """
+
+    def check_edges(self, edges, positions):
+        pairs = {(origin, destiny): distance
+                 for origin, destiny, distance in edges}
+        self.assertEqual(len(pairs), len(edges))
+        for (origin, destiny), distance in pairs.items():
+            self.assertNotEqual(origin, destiny)
+            self.assertEqual(pairs[(destiny, origin)], distance)
+            (x1, y1), (x2, y2) = positions[origin], positions[destiny]
+            self.assertEqual(distance,
+                             round(max(math.hypot(x2 - x1, y2 - y1), 0.1),
+                                   1))
+
+    def test_deterministic(self):
+        for kind in GENERATORS:
+            first = generate(kind, 300, seed=3)
+            self.assertEqual(generate(kind, 300, seed=3), first)
+            self.assertNotEqual(generate(kind, 300, seed=4), first)
+
+    def test_grid(self):
+        edges, positions = grid_graph(7, 9)
+        self.assertEqual(len(positions), 63)
+        # Ligações horizontais e verticais, nos dois sentidos:
+        self.assertEqual(len(edges), 2 * (7 * 8 + 6 * 9))
+        self.assertEqual(largest_component(edges, positions), 63)
+        self.check_edges(edges, positions)
+        self.assertEqual(len(generate('grid', 500)[1]), 22 * 22)
+
+    def test_geometric(self):
+        edges, positions = generate('geometric', 500, seed=1)
+        self.assertEqual(len(positions), 500)
+        self.check_edges(edges, positions)
+        self.assertTrue(4 <= len(edges) / len(positions) <= 8)
+        self.assertGreater(largest_component(edges, positions), 400)
+
+    def test_scale_free(self):
+        edges, positions = scale_free_graph(400, links_per_vertex=3)
+        self.assertEqual(len(positions), 400)
+        # Cada vértice, exceto os 3 iniciais, cria 3 ligações:
+        self.assertEqual(len(edges), 2 * 3 * (400 - 3))
+        self.assertEqual(largest_component(edges, positions), 400)
+        self.check_edges(edges, positions)
+
+    def test_write_csv(self):
+        edges, positions = generate('scale_free', 50)
+        with tempfile.TemporaryDirectory() as directory:
+            distances_path = os.path.join(directory, 'distancias.csv')
+            write_csv(edges, positions, distances_path,
+                      os.path.join(directory, 'municipios.csv'))
+            graph = Graph()
+            graph.create_from_csv(distances_path)
+        self.assertEqual(sorted(graph), sorted(positions))
+        self.assertEqual(sum(len(graph[name]) for name in graph), len(edges))
+
+
+if __name__ == '__main__':
+    unittest.main()
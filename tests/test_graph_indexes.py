@@ -0,0 +1,58 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import unittest
+from busca_grafos import (Config, GraphIndexes, load_positions, astar_search,
+                          bidir_bfs, bidir_uniform_cost_search, bfs,
+                          ch_search, uniform_cost_search)
+from lib.search import Graph
+
+
+class GraphIndexesTest(unittest.TestCase):
+    """ Verifica que as estruturas derivadas usadas pela interface
+    acompanham as alterações nas arestas do grafo.
+    """
+
+    def setUp(self):
+        self.graph = Graph()
+        self.graph.create_from_csv(Config.distances_path)
+        self.indexes = GraphIndexes(self.graph,
+                                    load_positions(Config.positions_path))
+
+    def check(self, origin, goal):
+        graph, indexes = self.graph, self.indexes
+        expected = uniform_cost_search(graph, origin, goal)[2]
+        for result in (
+                astar_search(graph, origin, goal, indexes.heuristic),
+                astar_search(graph, origin, goal, indexes.landmarks),
+                ch_search(indexes.hierarchy, origin, goal),
+                bidir_uniform_cost_search(graph, origin, goal,
+                                          indexes.reverse)):
+            self.assertAlmostEqual(result[2], expected, places=3)
+        self.assertEqual(
+            len(bidir_bfs(graph, origin, goal, indexes.reverse)[1]),
+            len(bfs(graph, origin, goal)[1]))
+
+    def test_rebuilt_after_edge_changes(self):
+        graph, indexes = self.graph, self.indexes
+        # Alterações feitas antes da primeira consulta, para que nenhum
+        # arquivo pré-processado seja lido ou gravado:
+        graph.set_edge_weight('Bananal', 'Sao Jose do Barreiro', 400.0)
+        reverse = indexes.reverse
+        self.assertIs(indexes.reverse, reverse)
+        self.check('Bananal', 'Caraguatatuba')
+        # Um atalho que nenhuma estrutura antiga conhece (as distâncias
+        # diminuem) e a remoção de uma aresta do caminho mínimo:
+        graph.add_edge('Bananal', 'Caraguatatuba', 10.0)
+        self.assertIsNot(indexes.reverse, reverse)
+        self.check('Bananal', 'Caraguatatuba')
+        self.assertEqual(uniform_cost_search(graph, 'Bananal',
+                                             'Caraguatatuba')[2], 10.0)
+        graph.remove_edge('Bananal', 'Caraguatatuba')
+        graph.remove_edge('Taubate', 'Redencao da Serra')
+        self.check('Bananal', 'Caraguatatuba')
+        self.check('Caraguatatuba', 'Bananal')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import unittest
+from busca_grafos import Config, load_positions
+from lib.compact_graph import CompactGraph
+from lib.dijkstra import astar, dijkstra
+from lib.heuristics import CoordinateHeuristic
+from lib.landmarks import LandmarkIndex
+
+
+class CoordinateHeuristicTest(unittest.TestCase):
+    """ Verifica a heurística de coordenadas com os arquivos do projeto. """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.graph = CompactGraph()
+        cls.graph.create_from_csv(Config.distances_path)
+        cls.positions = load_positions(Config.positions_path)
+
+    def test_consistent(self):
+        graph = self.graph
+        heuristic = CoordinateHeuristic(graph, self.positions)
+        self.assertTrue(heuristic.shortcuts)
+        for goal in range(len(graph)):
+            estimate = heuristic.bound(goal)
+            self.assertEqual(estimate(goal), 0.0)
+            for vertex in range(len(graph)):
+                for neighbour, distance in graph.arcs(vertex):
+                    self.assertLessEqual(estimate(vertex),
+                                         distance + estimate(neighbour))
+
+    def test_optimal(self):
+        graph = self.graph
+        for landmarks in (None, LandmarkIndex.build(graph, 4).attach(graph)):
+            heuristic = CoordinateHeuristic(graph, self.positions, landmarks)
+            for origin in range(len(graph)):
+                expected = dijkstra(graph, origin)[0]
+                for goal in range(len(graph)):
+                    distances = astar(graph, origin, goal,
+                                      heuristic.bound(goal))[0]
+                    self.assertAlmostEqual(distances[goal], expected[goal],
+                                           places=6)
+
+    def test_fewer_settled_than_uniform_cost(self):
+        graph = self.graph
+        origin = graph.vertex_id('Bananal')
+        goal = graph.vertex_id('Caraguatatuba')
+        uniform = len(dijkstra(graph, origin, goal)[2])
+        heuristic = CoordinateHeuristic(graph, self.positions)
+        self.assertLess(len(astar(graph, origin, goal,
+                                  heuristic.bound(goal))[2]), uniform)
+        landmarks = LandmarkIndex.build(graph, Config.LANDMARK_COUNT)
+        heuristic = CoordinateHeuristic(graph, self.positions,
+                                        landmarks.attach(graph))
+        self.assertLessEqual(2 * len(astar(graph, origin, goal,
+                                           heuristic.bound(goal))[2]),
+                             uniform)
+
+    def test_missing_position(self):
+        graph = self.graph
+        positions = dict(self.positions)
+        del positions['Cunha']
+        landmarks = LandmarkIndex.build(graph, 4).attach(graph)
+        for index in (None, landmarks):
+            heuristic = CoordinateHeuristic(graph, positions, index)
+            for goal in range(len(graph)):
+                estimate = heuristic.bound(goal)
+                expected = index.bound(goal) if index is not None \
+                    else lambda vertex: 0.0
+                for vertex in range(len(graph)):
+                    self.assertEqual(estimate(vertex), expected(vertex))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import gzip
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from busca_grafos import Config
+from lib import ingest
+from lib.compact_graph import CompactGraph
+
+
+class IngestTest(unittest.TestCase):
+    """ Verifica que a ingestão em blocos grava o mesmo snapshot que
+    CompactGraph.load_csv.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def expected(self, source):
+        snapshot = self.path('esperado.csr')
+        CompactGraph.load_csv(source, snapshot)
+        with open(snapshot, 'rb') as snapshot_file:
+            return snapshot_file.read()
+
+    def ingested(self, source, **options):
+        snapshot = self.path('ingerido.csr')
+        ingest.ingest_csv(source, snapshot, **options)
+        with open(snapshot, 'rb') as snapshot_file:
+            return snapshot_file.read()
+
+    def write_random_csv(self, seed):
+        """ Grava arestas aleatórias com vizinhos repetidos, vértices que
+        aparecem como destino antes de aparecerem como origem e vértices
+        que só aparecem como destino.
+        """
+        rng = random.Random(seed)
+        source = self.path('arestas.csv')
+        with open(source, 'w', encoding='utf-8') as csv_file:
+            csv_file.write('From,To,Distance\n')
+            for _ in range(500):
+                csv_file.write('v%d,v%d,%.1f\n' % (
+                    rng.randrange(60), rng.randrange(80),
+                    rng.uniform(0.1, 100)))
+        return source
+
+    def test_shipped_graph(self):
+        source = self.path('distancias.csv')
+        shutil.copyfile(Config.distances_path, source)
+        self.assertEqual(self.ingested(source), self.expected(source))
+        self.assertEqual(self.ingested(source, chunk_rows=7),
+                         self.expected(source))
+
+    def test_random_edges_in_many_runs(self):
+        fan_in = ingest.MERGE_FAN_IN
+        ingest.MERGE_FAN_IN = 3     # Força intercalações intermediárias.
+        try:
+            for seed in range(5):
+                source = self.write_random_csv(seed)
+                expected = self.expected(source)
+                for chunk_rows in (1, 13, 10000):
+                    self.assertEqual(self.ingested(source,
+                                                   chunk_rows=chunk_rows),
+                                     expected)
+        finally:
+            ingest.MERGE_FAN_IN = fan_in
+
+    def test_gzip(self):
+        source = self.write_random_csv(0)
+        compressed = source + '.gz'
+        with open(source, 'rb') as text, gzip.open(compressed, 'wb') as output:
+            shutil.copyfileobj(text, output)
+        graph = ingest.ingest_csv(compressed, self.path('ingerido.csr'),
+                                  chunk_rows=50)
+        expected = CompactGraph()
+        expected.create_from_csv(source)
+        self.assertEqual(graph.names, expected.names)
+        self.assertEqual(list(graph.offsets), list(expected.offsets))
+        self.assertEqual(list(graph.targets), list(expected.targets))
+        self.assertEqual(list(graph.weights), list(expected.weights))
+        del graph
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import unittest
+from busca_grafos import (Config, SEARCH_METHODS, load_positions)
+from lib.all_pairs import DistanceMatrix
+from lib.compact_graph import CompactGraph
+from lib.contraction import ContractionHierarchy
+from lib.heuristics import CoordinateHeuristic
+from lib.instrumentation import Probe
+from lib.landmarks import LandmarkIndex
+from lib.search import Graph, search_methods
+
+
+class ProbeTest(unittest.TestCase):
+    """ Verifica as medidas registradas pelas buscas na sonda. """
+
+    def methods(self, graph):
+        landmarks = LandmarkIndex.build(graph, 4).attach(graph)
+        heuristic = CoordinateHeuristic(
+            graph, load_positions(Config.positions_path), landmarks)
+        return search_methods(7, graph.reversed(), heuristic, landmarks,
+                              ContractionHierarchy.build(graph),
+                              DistanceMatrix.build(graph))
+
+    def test_one_path_allocation_per_query(self):
+        for graph in (Graph(), CompactGraph()):
+            graph.create_from_csv(Config.distances_path)
+            methods = self.methods(graph)
+            self.assertEqual(sorted(methods), sorted(SEARCH_METHODS))
+            for name, method in methods.items():
+                for origin, goal in (('Bananal', 'Caraguatatuba'),
+                                     ('Ubatuba', 'Ubatuba')):
+                    probe = Probe()
+                    result = method(graph, origin, goal, probe=probe)
+                    self.assertEqual(probe.path_allocations,
+                                     0 if result[1] is None else 1,
+                                     (type(graph).__name__, name, origin))
+
+    def test_no_path_no_allocation(self):
+        graph = CompactGraph()
+        graph.create_from_csv(Config.distances_path)
+        probe = Probe()
+        # O limite de um passo não alcança o destino:
+        result = search_methods(1)['lim_dfs'](graph, 'Bananal',
+                                              'Caraguatatuba', probe=probe)
+        self.assertIsNone(result[1])
+        self.assertEqual(probe.path_allocations, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import random
+import unittest
+from busca_grafos import Config
+from lib.k_paths import (ALTERNATIVE_METHODS, alternative_routes,
+                         k_shortest_paths)
+from lib.search import Graph
+
+
+def random_graph(rng, count, arcs, symmetric=False):
+    """ Gera um grafo aleatório com pesos inteiros (muitos empates), de mão
+    dupla quando symmetric é verdadeiro.
+    """
+    names = ['v%d' % vertex for vertex in range(count)]
+    graph = Graph((name, list()) for name in names)
+    for _ in range(arcs):
+        origin, destiny = rng.choice(names), rng.choice(names)
+        if origin == destiny or destiny in graph.neighbours(origin):
+            continue
+        weight = float(rng.randint(1, 10))
+        graph[origin].append([destiny, weight])
+        if symmetric:
+            graph[destiny].append([origin, weight])
+    return graph
+
+
+def path_cost(graph, path):
+    return sum(min(weight for neighbour, weight in graph[origin]
+                   if neighbour == destiny)
+               for origin, destiny in zip(path, path[1:]))
+
+
+def simple_path_costs(graph, origin, goal):
+    """ Custos de todos os caminhos sem repetição de vértices entre origin e
+    goal, em ordem crescente (enumeração exaustiva).
+    """
+    costs = []
+
+    def visit(vertex, visited, cost):
+        if vertex == goal:
+            costs.append(cost)
+            return
+        for neighbour, weight in graph[vertex]:
+            if neighbour not in visited:
+                visited.add(neighbour)
+                visit(neighbour, visited, cost + weight)
+                visited.discard(neighbour)
+    visit(origin, {origin}, 0.0)
+    return sorted(costs)
+
+
+class KShortestPathsTest(unittest.TestCase):
+    """ Compara o algoritmo de Yen com a enumeração de todos os caminhos. """
+
+    def check(self, graph, reverse, origin, goal, k):
+        paths = k_shortest_paths(graph, origin, goal, k, reverse)
+        expected = simple_path_costs(graph, origin, goal)[:k]
+        self.assertEqual([cost for _, cost in paths], expected)
+        self.assertEqual(len(set(tuple(path) for path, _ in paths)),
+                         len(paths))
+        for path, cost in paths:
+            self.assertEqual((path[0], path[-1]), (origin, goal))
+            self.assertEqual(len(set(path)), len(path))
+            self.assertEqual(path_cost(graph, path), cost)
+
+    def test_random_graphs_against_enumeration(self):
+        rng = random.Random(25)
+        for case in range(40):
+            symmetric = case % 2 == 0
+            graph = random_graph(rng, 8, 22, symmetric)
+            reverse = graph.reversed() if case % 4 == 1 else None
+            names = list(graph)
+            for _ in range(4):
+                origin, goal = rng.sample(names, 2)
+                self.check(graph, reverse, origin, goal, 6)
+
+    def test_map(self):
+        graph = Graph()
+        graph.create_from_csv(Config.distances_path)
+        paths = k_shortest_paths(graph, 'Bananal', 'Caraguatatuba', 5,
+                                 graph.reversed())
+        self.assertEqual(len(paths), 5)
+        costs = [cost for _, cost in paths]
+        self.assertEqual(costs, sorted(costs))
+        for path, cost in paths:
+            self.assertAlmostEqual(path_cost(graph, path), cost)
+
+    def test_default_reverse(self):
+        graph = Graph([('a', [['b', 1.0]]), ('b', [['c', 1.0]]), ('c', [])])
+        self.assertEqual(k_shortest_paths(graph, 'a', 'c', 3),
+                         [(['a', 'b', 'c'], 2.0)])
+        for method in ALTERNATIVE_METHODS:
+            self.assertEqual(alternative_routes(graph, 'a', 'c', 3, method),
+                             [(['a', 'b', 'c'], 2.0)])
+
+    def test_no_path(self):
+        graph = Graph([('a', [['b', 1.0]]), ('b', []), ('c', [])])
+        self.assertEqual(k_shortest_paths(graph, 'a', 'c', 3,
+                                          graph.reversed()), [])
+        self.assertEqual(k_shortest_paths(graph, 'a', 'b', 0,
+                                          graph.reversed()), [])
+
+
+class AlternativeRoutesTest(unittest.TestCase):
+    """ Verifica os limites das rotas alternativas em todos os métodos. """
+
+    def test_limits(self):
+        rng = random.Random(7)
+        for _ in range(20):
+            graph = random_graph(rng, 10, 30, symmetric=True)
+            origin, goal = rng.sample(list(graph), 2)
+            shortest = simple_path_costs(graph, origin, goal)
+            for method in ALTERNATIVE_METHODS:
+                routes = alternative_routes(graph, origin, goal, 3, method)
+                if not shortest:
+                    self.assertEqual(routes, [])
+                    continue
+                self.assertEqual(routes[0][1], shortest[0])
+                self.assertLessEqual(len(routes), 3)
+                costs = [cost for _, cost in routes]
+                self.assertEqual(costs, sorted(costs))
+                for path, cost in routes:
+                    self.assertEqual((path[0], path[-1]), (origin, goal))
+                    self.assertEqual(len(set(path)), len(path))
+                    self.assertEqual(path_cost(graph, path), cost)
+                    self.assertLessEqual(cost, 1.4 * shortest[0])
+
+    def test_unknown_method(self):
+        graph = Graph([('a', [['b', 1.0]]), ('b', [['a', 1.0]])])
+        with self.assertRaises(ValueError):
+            alternative_routes(graph, 'a', 'b', method='desconhecido')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import os
+import tempfile
+import unittest
+from lib.landmarks import LandmarkIndex
+from lib.search import Graph
+
+
+class LandmarkIndexTest(unittest.TestCase):
+    """ Verifica a escolha e a gravação dos landmarks. """
+
+    def setUp(self):
+        # Dois componentes e um vértice isolado:
+        self.graph = Graph({'a': [['b', 1.0]], 'b': [['a', 1.0]],
+                            'c': [['d', 2.0]], 'd': [['c', 2.0]], 'e': []})
+
+    def test_disconnected(self):
+        # Cada componente deve receber um landmark:
+        component = {'a': 0, 'b': 0, 'c': 1, 'd': 1, 'e': 2}
+        index = LandmarkIndex.build(self.graph, 3)
+        self.assertEqual(sorted(component[index.names[landmark]]
+                                for landmark in index.landmarks), [0, 1, 2])
+
+    def test_save_and_load(self):
+        index = LandmarkIndex.build(self.graph, len(self.graph))
+        self.assertEqual(sorted(index.landmarks), list(range(5)))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'grafo.alt')
+            index.save(path)
+            self.assertEqual(os.listdir(directory), ['grafo.alt'])
+            loaded = LandmarkIndex.load(path)
+        self.assertEqual(loaded.names, index.names)
+        self.assertEqual(loaded.landmarks, index.landmarks)
+        self.assertEqual(loaded.forward, index.forward)
+        self.assertEqual(loaded.backward, index.backward)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import unittest
+from busca_grafos import Config
+from lib.compact_graph import CompactGraph
+from lib.dijkstra import vertex_marks
+from lib.ordered_set import BitSet, OrderedSet, VisitedView
+from lib.search import Graph, bfs, deepening_dfs, dfs
+
+
+class OrderedSetTest(unittest.TestCase):
+    """ Verifica a ordem de inserção e as operações de OrderedSet. """
+
+    def test_insertion_order(self):
+        items = OrderedSet('abracadabra')
+        self.assertEqual(list(items), ['a', 'b', 'r', 'c', 'd'])
+        self.assertEqual(list(reversed(items)), ['d', 'c', 'r', 'b', 'a'])
+        items.add('b')      # Um elemento repetido não muda de posição.
+        items.add('z')
+        self.assertEqual(list(items), ['a', 'b', 'r', 'c', 'd', 'z'])
+        self.assertEqual(len(items), 6)
+        self.assertIn('r', items)
+        self.assertNotIn('x', items)
+        self.assertEqual(repr(items),
+                         "OrderedSet(['a', 'b', 'r', 'c', 'd', 'z'])")
+        self.assertEqual(repr(OrderedSet()), 'OrderedSet()')
+
+    def test_discard_and_pop(self):
+        items = OrderedSet([3, 1, 4, 5, 9])
+        items.discard(4)
+        items.discard(7)    # Elementos ausentes são ignorados.
+        self.assertEqual(list(items), [3, 1, 5, 9])
+        self.assertEqual(items.pop(), 9)
+        self.assertEqual(items.pop(last=False), 3)
+        self.assertEqual(list(items), [1, 5])
+        items.add(3)
+        self.assertEqual(list(items), [1, 5, 3])
+        with self.assertRaises(KeyError):
+            items.remove(4)
+        items.clear()
+        with self.assertRaises(KeyError):
+            items.pop()
+
+    def test_comparison_and_operators(self):
+        self.assertEqual(OrderedSet('abc'), OrderedSet('abc'))
+        self.assertNotEqual(OrderedSet('abc'), OrderedSet('cba'))
+        # Com outros conjuntos, a ordem não importa:
+        self.assertEqual(OrderedSet('abc'), set('cba'))
+        self.assertEqual(list(OrderedSet('abc') | OrderedSet('dca')),
+                         ['a', 'b', 'c', 'd'])
+        self.assertEqual(list(OrderedSet('abcd') - {'b'}), ['a', 'c', 'd'])
+        self.assertEqual(OrderedSet('abcd') & OrderedSet('db'), {'b', 'd'})
+
+
+class BitSetTest(unittest.TestCase):
+    """ Verifica BitSet e a compatibilidade com vertex_marks. """
+
+    def test_operations(self):
+        bits = BitSet(10, [7, 2, 7, 5])
+        self.assertEqual(len(bits), 3)
+        self.assertEqual(list(bits), [2, 5, 7])
+        self.assertIn(5, bits)
+        self.assertNotIn(3, bits)
+        self.assertNotIn(-1, bits)
+        self.assertNotIn(10, bits)
+        bits.discard(5)
+        bits.discard(5)
+        bits.discard(42)    # Fora do intervalo: ignorado.
+        self.assertEqual(list(bits), [2, 7])
+        self.assertEqual(len(bits), 2)
+        self.assertEqual(bits, {2, 7})
+        self.assertEqual(repr(bits), 'BitSet(10, [2, 7])')
+
+    def test_marks_match_vertex_marks(self):
+        graph = CompactGraph()
+        graph.create_from_csv(Config.distances_path)
+        marks = vertex_marks(graph)
+        bits = BitSet(len(graph))
+        self.assertEqual(type(bits.marks), type(marks))
+        self.assertEqual(bits.marks, marks)
+        # Marcas escritas diretamente (como fazem as buscas) e por add()
+        # têm o mesmo formato:
+        for vertex in (0, 3, len(graph) - 1):
+            marks[vertex] = 1
+            bits.add(vertex)
+        self.assertEqual(bits.marks, marks)
+        self.assertEqual(list(bits), [vertex for vertex in range(len(graph))
+                                      if marks[vertex]])
+
+
+class VisitedViewTest(unittest.TestCase):
+    """ Verifica VisitedView e os visitados das buscas nos dois formatos de
+    grafo.
+    """
+
+    def test_translation(self):
+        names = ['a', 'b', 'c', 'd']
+        view = VisitedView([2, 0, 3], names, {name: vertex for vertex, name
+                                               in enumerate(names)})
+        self.assertEqual(len(view), 3)
+        self.assertEqual(list(view), ['c', 'a', 'd'])
+        self.assertEqual(list(reversed(view)), ['d', 'a', 'c'])
+        self.assertIn('a', view)
+        self.assertNotIn('b', view)
+        self.assertNotIn('x', view)
+        self.assertEqual(view, OrderedSet('cad'))
+        self.assertNotEqual(view, OrderedSet('acd'))
+        self.assertEqual(view, {'a', 'c', 'd'})
+        plain = VisitedView(['c', 'a', 'd'])
+        self.assertEqual(plain, view)
+        self.assertIn('d', plain)
+
+    def test_searches_agree_on_both_graphs(self):
+        graph, compact = Graph(), CompactGraph()
+        graph.create_from_csv(Config.distances_path)
+        compact.create_from_csv(Config.distances_path)
+        for search in (bfs, dfs, lambda graph, origin, goal:
+                       deepening_dfs(graph, origin, goal, 7)):
+            for origin, goal in (('Bananal', 'Caraguatatuba'),
+                                 ('Ubatuba', 'Queluz')):
+                expected = search(graph, origin, goal)
+                result = search(compact, origin, goal)
+                self.assertEqual(result[1], expected[1])
+                self.assertEqual(result[0], expected[0])
+                self.assertEqual(len(set(result[0])), len(result[0]))
+                self.assertIn(origin, result[0])
+                self.assertEqual(set(result[0]), set(expected[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import random
+import unittest
+from lib.dijkstra import dijkstra, INFINITY
+from lib.path_tree import PathTreeCache
+from lib.search import Graph, bfs
+
+
+def random_graph(rng, count, arcs):
+    """ Gera um grafo dirigido aleatório com pesos inteiros (muitos
+    empates).
+    """
+    names = ['v%d' % vertex for vertex in range(count)]
+    graph = Graph((name, list()) for name in names)
+    for _ in range(arcs):
+        origin, destiny = rng.choice(names), rng.choice(names)
+        if origin != destiny and destiny not in graph.neighbours(origin):
+            graph[origin].append([destiny, float(rng.randint(1, 10))])
+    return graph
+
+
+def random_change(rng, graph):
+    """ Aplica ao grafo um aumento, uma redução, uma inserção ou uma remoção
+    de aresta, sorteada.
+    """
+    names = list(graph)
+    edges = [(origin, neighbour) for origin in names
+             for neighbour, _ in graph[origin]]
+    kind = rng.randrange(4)
+    if kind == 2 or not edges:
+        origin, destiny = rng.choice(names), rng.choice(names)
+        if origin != destiny and destiny not in graph.neighbours(origin):
+            graph.add_edge(origin, destiny, float(rng.randint(1, 10)))
+        return
+    origin, destiny = rng.choice(edges)
+    if kind == 3:
+        graph.remove_edge(origin, destiny)
+        return
+    weight = next(distance for neighbour, distance in graph[origin]
+                  if neighbour == destiny)
+    if kind == 0:
+        weight += rng.randint(1, 10)
+    else:
+        weight = max(1.0, weight - rng.randint(1, 10))
+    graph.set_edge_weight(origin, destiny, weight)
+
+
+class ShortestPathTreeUpdateTest(unittest.TestCase):
+    """ Compara as árvores corrigidas por update() com um cálculo completo
+    depois de alterações aleatórias nas arestas.
+    """
+
+    def check_weighted(self, graph, tree):
+        distances = dijkstra(graph, tree.origin)[0]
+        for vertex in graph:
+            expected = distances[vertex]
+            if expected == INFINITY:
+                self.assertIsNone(tree.cost_to(vertex))
+                self.assertIsNone(tree.path_to(vertex))
+                continue
+            self.assertEqual(tree.cost_to(vertex), expected)
+            # O caminho deve usar arestas existentes e ter o custo mínimo:
+            path = tree.path_to(vertex)
+            self.assertEqual((path[0], path[-1]), (tree.origin, vertex))
+            total = 0.0
+            for origin, destiny in zip(path, path[1:]):
+                total += next(distance for neighbour, distance
+                              in graph[origin] if neighbour == destiny)
+            self.assertEqual(total, expected)
+        # A ordem de visita deve ser a de um Dijkstra completo:
+        self.assertEqual(tree.keys, sorted(
+            (distances[vertex], vertex) for vertex in graph
+            if distances[vertex] < INFINITY))
+
+    def check_unweighted(self, graph, tree):
+        self.assertEqual(tree.cost_to(tree.origin), 0)
+        for vertex in graph:
+            if vertex == tree.origin:
+                continue    # bfs procura um ciclo até a própria origem.
+            path = bfs(graph, tree.origin, vertex)[1]
+            if path is None:
+                self.assertIsNone(tree.cost_to(vertex))
+            else:
+                self.assertEqual(tree.cost_to(vertex), len(path) - 1)
+                self.assertEqual(len(tree.path_to(vertex)), len(path))
+
+    def test_random_changes(self):
+        rng = random.Random(0)
+        for _ in range(40):
+            graph = random_graph(rng, rng.randint(5, 30), rng.randint(5, 90))
+            cache = PathTreeCache()
+            origins = rng.sample(list(graph), min(3, len(graph)))
+            for _ in range(15):
+                # Lotes de uma a cinco alterações entre as consultas, para
+                # que a mesma aresta possa mudar mais de uma vez:
+                for _ in range(rng.randint(1, 5)):
+                    random_change(rng, graph)
+                for origin in origins:
+                    self.check_weighted(graph, cache.get(graph, origin))
+                    self.check_unweighted(graph, cache.get(graph, origin,
+                                                           False))
+
+    def test_update_reuses_tree(self):
+        rng = random.Random(1)
+        graph = random_graph(rng, 20, 60)
+        cache = PathTreeCache()
+        tree = cache.get(graph, 'v0')
+        random_change(rng, graph)
+        self.assertIs(cache.get(graph, 'v0'), tree)
+        self.check_weighted(graph, tree)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import asyncio
+import time
+import unittest
+from busca_grafos import Config
+from lib.instrumentation import DeadlineExceeded
+from lib.search import Graph, search_methods, uniform_cost_search
+from lib.server import RouteServer
+
+SLOW_SEARCH_DELAY = 0.3     # Duração da busca lenta, em segundos.
+
+
+def slow_search(graph, origin, goal, probe):
+    """ Busca de custo uniforme que demora SLOW_SEARCH_DELAY segundos e
+    respeita o prazo da DeadlineProbe ao final.
+    """
+    time.sleep(SLOW_SEARCH_DELAY)
+    if time.time() >= probe.deadline:
+        raise DeadlineExceeded(origin)
+    return uniform_cost_search(graph, origin, goal, probe=probe)
+
+
+def load():
+    graph = Graph()
+    graph.create_from_csv(Config.distances_path)
+    methods = search_methods()
+    methods['slow'] = slow_search
+    return graph, methods
+
+
+class RouteServerTest(unittest.TestCase):
+    """ Verifica os prazos das consultas agrupadas e a recarga do grafo. """
+
+    def test_coalesced_requests_keep_their_own_deadline(self):
+        server = RouteServer(load, workers=2, threads=True)
+        server.load()
+
+        async def run():
+            short = asyncio.ensure_future(server.query(
+                'Bananal', 'Caraguatatuba', 'slow', 0.1))
+            await asyncio.sleep(0)
+            long = asyncio.ensure_future(server.query(
+                'Bananal', 'Caraguatatuba', 'slow', 5.0))
+            again = asyncio.ensure_future(server.query(
+                'Bananal', 'Caraguatatuba', 'slow', 1.0))
+            return await asyncio.gather(short, long, again,
+                                        return_exceptions=True)
+        try:
+            short, long, again = asyncio.run(run())
+        finally:
+            server.close()
+        self.assertIsInstance(short, asyncio.TimeoutError)
+        for result in (long, again):
+            self.assertIsNone(result.error)
+            self.assertIsNotNone(result.cost)
+        # Só a terceira requisição pôde usar a busca de outra:
+        self.assertEqual(server.coalesced, 1)
+        self.assertFalse(server._inflight)
+
+    def test_reload_with_processes(self):
+        server = RouteServer(load, workers=1)
+        server.load()
+
+        async def run():
+            before = await server.query('Bananal', 'Caraguatatuba',
+                                        'uniform_cost_search')
+            generation = await server.reload()
+            after = await server.query('Bananal', 'Caraguatatuba',
+                                       'uniform_cost_search')
+            return before, generation, after
+        try:
+            before, generation, after = asyncio.run(run())
+        finally:
+            server.close()
+        self.assertEqual(generation, 2)
+        self.assertIsNone(after.error)
+        self.assertEqual(before.cost, after.cost)
+        self.assertEqual(before.path, after.path)
+
+
+if __name__ == '__main__':
+    unittest.main()